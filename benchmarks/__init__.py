@@ -0,0 +1,5 @@
+"""
+Benchmarks - Đo hiệu năng mô phỏng, inference, render và lưu dữ liệu
+
+Chạy headless: python -m benchmarks.run
+"""
@@ -0,0 +1,312 @@
+"""
+Các benchmark case. Mỗi case nhận `quick` (bool) và trả về dict
+{tên metric: (giá trị, đơn vị, higher_is_better)}.
+
+Case nào thiếu điều kiện (vd chưa có model .pkl) thì raise SkipBenchmark.
+"""
+import os
+import random
+import shutil
+import tempfile
+from time import perf_counter
+
+import neat
+import numpy as np
+import pygame
+
+from config.settings import SCREEN_WIDTH, SCREEN_HEIGHT
+
+
+class SkipBenchmark(Exception):
+    """Case không chạy được trong môi trường hiện tại."""
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def _latency_metrics(prefix, samples_ms, unit='ms'):
+    scale = 1000.0 if unit == 'us' else 1.0
+    return {
+        f'{prefix}_p50': (_percentile(samples_ms, 0.5) * scale, unit, False),
+        f'{prefix}_p99': (_percentile(samples_ms, 0.99) * scale, unit, False),
+    }
+
+
+def _load_neat_config():
+    from src.ai_handler import get_config_path
+    return neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                       neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                       get_config_path())
+
+
+def _random_genomes(config, n, seed=0):
+    """n genome khởi tạo ngẫu nhiên (tái lập được theo seed)."""
+    state = random.getstate()
+    random.seed(seed)
+    # Population tự khởi tạo genome (và innovation tracker của neat-python >= 1.0)
+    genomes = list(neat.Population(config).population.values())
+    random.setstate(state)
+    return genomes[:n]
+
+
+# ── Mô phỏng ────────────────────────────────────────────
+
+def _run_genomes(genomes, config, fast_forward=True):
+    """Gọi đúng ai_handler.eval_genome cho từng genome (các course NEAT_COURSE_SEEDS).
+    Trả về (tổng frame theo telemetry, list fitness, thời gian giây)."""
+    from config.settings import NEAT_COURSE_SEEDS
+    from src.ai_handler import eval_genome
+    from src.shared_course import get_course
+    from src import telemetry
+
+    for seed in NEAT_COURSE_SEEDS or ():
+        get_course(seed)  # course tính sẵn, không tính vào thời gian
+    steps_before = telemetry.get_steps()
+    start = perf_counter()
+    fitnesses = [eval_genome(genome, config, fast_forward=fast_forward) for genome in genomes]
+    elapsed = perf_counter() - start
+    return telemetry.get_steps() - steps_before, fitnesses, elapsed
+
+
+def bench_eval_genome(quick=False):
+    """Số frame mô phỏng/giây của ai_handler.eval_genome (DinoEnv + activate + fast-forward)."""
+    config = _load_neat_config()
+    frames, _, elapsed = _run_genomes(_random_genomes(config, 10 if quick else 40), config)
+    return {
+        'eval_genome_frames_per_s': (frames / elapsed, 'frames/s', True),
+        'eval_genome_frames': (frames, 'frames', None),
+    }
+
+
+def bench_fast_forward(quick=False):
+    """eval_genome có / không có DinoEnv.fast_forward trên cùng genome (kết quả phải giống hệt)."""
+    config = _load_neat_config()
+    genomes = _random_genomes(config, 20 if quick else 80)
+    frames, slow_fit, slow_s = _run_genomes(genomes, config, fast_forward=False)
+    ff_frames, ff_fit, ff_s = _run_genomes(genomes, config, fast_forward=True)
+    if ff_frames != frames or ff_fit != slow_fit:
+        raise RuntimeError("fast_forward cho kết quả khác step() từng frame")
+    return {
+        'step_only_frames_per_s': (frames / slow_s, 'frames/s', True),
+        'fast_forward_frames_per_s': (frames / ff_s, 'frames/s', True),
+        'fast_forward_speedup': (slow_s / ff_s, 'x', True),
+    }
+
+
+def _run_frame_skip(genomes, config, k, swept):
+    """Policy chạy mỗi k frame. swept=True: DinoEnv(frame_skip=k); False: step() k lần
+    ở 60 Hz với cùng action (tham chiếu). Trả về (tổng frame, list kết quả, giây)."""
+    from src.dino_env import DinoEnv, NEAT_MARGINS, action_from_output
+
+    frames, results = 0, []
+    start = perf_counter()
+    for genome in genomes:
+        net = neat.nn.FeedForwardNetwork.create(genome, config)
+        env = DinoEnv(seed=genome.key, margins=NEAT_MARGINS, auto_reset=False,
+                      frame_skip=k if swept else 1)
+        inputs = env.observe()
+        done = False
+        while not done:
+            action = action_from_output(net.activate(inputs))
+            for _ in range(1 if swept else k):
+                inputs, _, done, info = env.step(action)
+                if done:
+                    break
+        frames += env.steps
+        results.append((env.steps, env.score, info['collided']))
+    return frames, results, perf_counter() - start
+
+
+def bench_frame_skip(quick=False):
+    """DinoEnv(frame_skip=4) (swept AABB) so với step() 4 lần ở 60 Hz; kết quả phải giống hệt."""
+    config = _load_neat_config()
+    genomes = _random_genomes(config, 20 if quick else 80)
+    frames, ref, ref_s = _run_frame_skip(genomes, config, 4, False)
+    sw_frames, swept, sw_s = _run_frame_skip(genomes, config, 4, True)
+    if sw_frames != frames or swept != ref:
+        raise RuntimeError("frame_skip cho kết quả khác step() từng frame")
+    return {
+        'frame_skip4_reference_frames_per_s': (frames / ref_s, 'frames/s', True),
+        'frame_skip4_swept_frames_per_s': (frames / sw_s, 'frames/s', True),
+    }
+
+
+def bench_env_step(quick=False):
+    """Số bước/giây của DinoEnv không có network (chỉ physics + collision)."""
+    from src.dino_env import DinoEnv, ACTION_NONE
+
+    env = DinoEnv(seed=0)
+    n = 20000 if quick else 100000
+    start = perf_counter()
+    for _ in range(n):
+        env.step(ACTION_NONE)
+    return {'env_steps_per_s': (n / (perf_counter() - start), 'steps/s', True)}
+
+
+# ── Inference ───────────────────────────────────────────
+
+def bench_neat_activate(quick=False):
+    """Số lần gọi FeedForwardNetwork.activate/giây."""
+    config = _load_neat_config()
+    net = neat.nn.FeedForwardNetwork.create(_random_genomes(config, 1)[0], config)
+    inputs = [0.5, 0.0, 1.0, 0.2, 0.0, 0.0, 0.0, 0.5]
+    n = 20000 if quick else 200000
+    start = perf_counter()
+    for _ in range(n):
+        net.activate(inputs)
+    return {'neat_activate_calls_per_s': (n / (perf_counter() - start), 'calls/s', True)}
+
+
+def bench_predict_action(quick=False):
+    """Độ trễ predict_action của supervised model đã lưu."""
+    from src.supervised_trainer import load_models, predict_action
+
+    jump_data, duck_data = load_models()
+    if jump_data is None or duck_data is None:
+        raise SkipBenchmark("chưa có jump_model.pkl / duck_model.pkl")
+    rng = random.Random(0)
+    samples = []
+    for _ in range(200 if quick else 2000):
+        inputs = [rng.random() for _ in range(6)]
+        start = perf_counter()
+        predict_action(jump_data['model'], jump_data['scaler'],
+                       duck_data['model'], duck_data['scaler'], inputs)
+        samples.append((perf_counter() - start) * 1000)
+    return _latency_metrics('predict_action', samples, unit='us')
+
+
+# ── Render ──────────────────────────────────────────────
+
+def _time_draw(game, step, frames):
+    """Chạy game `frames` frame, chỉ đo thời gian draw()."""
+    samples = []
+    for _ in range(frames):
+        step()
+        start = perf_counter()
+        game.draw()
+        samples.append((perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_game_manager_draw(quick=False):
+    """GameManager.draw ms/frame (AI mode, không nhảy)."""
+    from src.game_manager import GameManager
+
+    random.seed(0)
+    game = GameManager(pygame.display.get_surface(), is_ai_mode=True)
+
+    def step():
+        if game.game_over:
+            game.reset()
+        game.update(action=(0.0, 0.0, 0.0))
+
+    return _latency_metrics('game_manager_draw', _time_draw(game, step, 120 if quick else 600))
+
+
+def bench_lane_game_draw(quick=False):
+    """LaneGame.draw ms/frame (1 lane, chưa blit lên màn hình)."""
+    from src.lane_game import LaneGame
+
+    random.seed(0)
+    lane = LaneGame()
+
+    def step():
+        if lane.game_over:
+            lane.reset()
+        lane.update(action=(0.0, 0.0, 0.0))
+
+    return _latency_metrics('lane_game_draw', _time_draw(lane, step, 120 if quick else 600))
+
+
+def bench_menu_background(quick=False):
+    """Thời gian tạo gradient nền menu (cache miss) và Menu.draw ms/frame."""
+    from src import menu
+
+    cold = []
+    for _ in range(5 if quick else 20):
+        menu._clear_background_cache()
+        start = perf_counter()
+        menu._get_menu_background()
+        cold.append((perf_counter() - start) * 1000)
+
+    m = menu.Menu(pygame.display.get_surface())
+    warm = []
+    for _ in range(60 if quick else 300):
+        start = perf_counter()
+        m.draw()
+        warm.append((perf_counter() - start) * 1000)
+
+    metrics = _latency_metrics('menu_bg_generate', cold)
+    metrics.update(_latency_metrics('menu_draw', warm))
+    return metrics
+
+
+# ── Lưu dữ liệu ─────────────────────────────────────────
+
+DATASET_SIZES = (1000, 10000, 50000)
+SESSION_SAMPLES = 500
+
+
+def _fake_records(rng, n):
+    from src.sample_log import SAMPLE_DTYPE
+    records = np.zeros(n, dtype=SAMPLE_DTYPE)
+    records['inputs'] = rng.random((n, 6))
+    records['action_jump'] = rng.random(n) < 0.1
+    records['game_speed_raw'] = 7.0
+    return records
+
+
+def bench_save_session_data(quick=False):
+    """record_sample + save_session_data (chỉ sample log) khi dataset đã có N mẫu."""
+    from src.data_collector import DataCollector
+    from src.sample_log import append_samples
+
+    rng = np.random.default_rng(0)
+    sizes = DATASET_SIZES[:2] if quick else DATASET_SIZES
+    tmp_dir = tempfile.mkdtemp(prefix='dino_bench_')
+    metrics = {}
+    try:
+        for size in sizes:
+            log_path = os.path.join(tmp_dir, f'training_data_{size}.bin')
+            append_samples(_fake_records(rng, size), log_path)
+            collector = DataCollector(data_path=os.path.join(tmp_dir, 'missing.json'),
+                                      log_path=log_path)
+            collector.use_database = False
+            session = _fake_records(rng, SESSION_SAMPLES)
+            start = perf_counter()
+            for r in session:
+                collector.session.append(r['inputs'], r['action_jump'], r['action_duck'],
+                                         r['source'], r['score'], r['game_speed_raw'])
+            append_us = (perf_counter() - start) * 1e6 / SESSION_SAMPLES
+            start = perf_counter()
+            collector.save_session_data()
+            metrics[f'save_session_data_{size}_ms'] = ((perf_counter() - start) * 1000, 'ms', False)
+        metrics['session_append_us'] = (append_us, 'us', False)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return metrics
+
+
+# Thứ tự chạy
+CASES = {
+    'eval_genome': bench_eval_genome,
+    'fast_forward': bench_fast_forward,
+    'frame_skip': bench_frame_skip,
+    'env_step': bench_env_step,
+    'neat_activate': bench_neat_activate,
+    'predict_action': bench_predict_action,
+    'game_manager_draw': bench_game_manager_draw,
+    'lane_game_draw': bench_lane_game_draw,
+    'menu_background': bench_menu_background,
+    'save_session_data': bench_save_session_data,
+}
+
+
+def init_headless():
+    """Khởi tạo pygame với driver dummy (không cần màn hình/âm thanh)."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
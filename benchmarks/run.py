@@ -0,0 +1,157 @@
+"""
+Benchmark runner - Chạy các case trong benchmarks/cases.py, lưu kết quả JSON
+và so sánh với baseline.
+
+Chạy:
+    python -m benchmarks.run                          # chạy tất cả, ghi benchmarks/latest.json
+    python -m benchmarks.run --only eval_genome --quick
+    python -m benchmarks.run --save-baseline          # ghi thêm benchmarks/baseline.json
+    python -m benchmarks.run --compare                # so với benchmarks/baseline.json
+    python -m benchmarks.run --compare old.json --threshold 0.15
+
+Với --compare, exit code = 1 nếu có metric chậm hơn baseline quá threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'latest.json')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_THRESHOLD = 0.10   # chậm hơn 10% được xem là regression
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(names=None, quick=False):
+    """Chạy các case, trả về dict kết quả có thể ghi ra JSON."""
+    import pygame
+    from benchmarks.cases import CASES, SkipBenchmark, init_headless
+
+    init_headless()
+    results, skipped = {}, {}
+    for name, case in CASES.items():
+        if names and name not in names:
+            continue
+        print(f"[{name}] ...", flush=True)
+        try:
+            metrics = case(quick=quick)
+        except SkipBenchmark as e:
+            print(f"  skipped: {e}")
+            skipped[name] = str(e)
+            continue
+        for metric, (value, unit, higher_is_better) in metrics.items():
+            results[metric] = {'value': value, 'unit': unit,
+                               'higher_is_better': higher_is_better, 'case': name}
+            print(f"  {metric:<34} {value:>14.3f} {unit}")
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'quick': quick,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def save_results(report, path):
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved: {path}")
+        return True
+    except IOError as e:
+        print(f"Error saving results: {e}")
+        return False
+
+
+def load_results(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError) as e:
+        print(f"Error loading {path}: {e}")
+        return None
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """In bảng so sánh, trả về danh sách metric bị regression."""
+    regressions = []
+    base_results = baseline.get('results', {})
+    print(f"\nCompare with baseline ({baseline.get('meta', {}).get('commit')}, "
+          f"{baseline.get('meta', {}).get('timestamp')}):")
+    for metric, cur in current['results'].items():
+        base = base_results.get(metric)
+        if base is None:
+            print(f"  {metric:<34} {'(new)':>10}")
+            continue
+        if cur['higher_is_better'] is None or not base['value']:
+            continue
+        # change > 0 nghĩa là tốt hơn, bất kể chiều của metric
+        change = (cur['value'] - base['value']) / base['value']
+        if not cur['higher_is_better']:
+            change = -change
+        status = ''
+        if change < -threshold:
+            status = 'REGRESSION'
+            regressions.append(metric)
+        elif change > threshold:
+            status = 'improved'
+        print(f"  {metric:<34} {base['value']:>12.3f} -> {cur['value']:>12.3f} {cur['unit']:<9}"
+              f" {change:+7.1%}  {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DinoRacer benchmark suite (headless)")
+    parser.add_argument('--only', nargs='+', help="Chỉ chạy các case này")
+    parser.add_argument('--quick', action='store_true', help="Ít vòng lặp hơn (smoke run)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="File JSON kết quả")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help=f"Ghi kết quả thành baseline ({DEFAULT_BASELINE})")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, default=None,
+                        help="So sánh với file baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--list', action='store_true', help="Liệt kê các case")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        from benchmarks.cases import CASES
+        for name, case in CASES.items():
+            print(f"{name:<20} {case.__doc__}")
+        return 0
+
+    report = run_benchmarks(args.only, args.quick)
+    save_results(report, args.output)
+    if args.save_baseline:
+        save_results(report, DEFAULT_BASELINE)
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        if baseline is None:
+            return 2
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -65,6 +65,39 @@ SPEED_INCREASE_AMOUNT = 0.3   # Tăng tốc chậm hơn
 # File lưu trữ
 HIGHSCORE_FILE = "highscore.json"
 BEST_GENOME_FILE = "best_genome.pkl"
+GENOME_REGISTRY_DIR = "genomes"   # hall-of-fame: top-K genome + network đã compile
+GENOME_REGISTRY_TOP_K = 10
+CHECKPOINT_DIR = "checkpoints"        # checkpoint population NEAT (resume training)
+CHECKPOINT_INTERVAL = 5               # generation giữa 2 lần checkpoint
+CHECKPOINT_INTERVAL_SECONDS = 300     # hoặc sau chừng này giây, tùy cái nào đến trước
+CHECKPOINT_KEEP = 5                   # giữ N checkpoint mới nhất mỗi trainer
+TELEMETRY_ENABLED = True              # ghi metric từng generation ra runs/*.jsonl
+TELEMETRY_DIR = "runs"
+NEAT_SCHEMA = 'neat_v1'               # schema input của genome NEAT: 'neat_v1' (8) / 'neat_v2' (10), khớp num_inputs trong neat-config.txt
+NEAT_COURSE_SEEDS = (0, 1, 2)         # các course cố định khi eval genome, fitness lấy trung bình (None = ngẫu nhiên mỗi lần)
+FITNESS_CACHE_SIZE = 4096             # số genome nhớ fitness (LRU), 0 = tắt
+NOVELTY_ENABLED = False               # novelty search (hoặc: python -m src.ai_handler --novelty)
+NOVELTY_WEIGHT = 0.3                  # tỉ trọng novelty khi blend với fitness
+NOVELTY_K = 15                        # số hàng xóm gần nhất
+NOVELTY_ARCHIVE_MAX = 50000           # số descriptor tối đa trong archive (ghi đè cũ nhất)
+NOVELTY_ADD_PER_GEN = 8               # số genome mới lạ nhất thêm vào archive mỗi generation
+DISTRIBUTED_PORT = 5555               # cổng mặc định của coordinator eval phân tán
+DISTRIBUTED_BATCH_SIZE = 8            # số genome mỗi batch gửi cho worker
+DISTRIBUTED_TIMEOUT = 120             # giây chờ kết quả 1 batch trước khi coi worker đã chết
+DISTRIBUTED_AUTHKEY = "dinoracer"     # khóa mặc định, chỉ cho 127.0.0.1 (ngoài loopback: đặt env DINORACER_AUTHKEY)
+BC_INIT_EPOCHS = 400                  # số bước Adam khi fit population ban đầu vào dữ liệu người chơi
+BC_INIT_LR = 0.05                     # learning rate Adam của warm start
+BC_INIT_KEEP = 1                      # số genome giữ nguyên bản đã fit (còn lại được mutate)
+BC_COMPARE_THRESHOLD = 500            # ngưỡng fitness khi so sánh warm start với random start
+SAMPLE_LOG_FILE = "training_data.bin" # log nhị phân mẫu training (src/sample_log.py)
+SESSION_BUFFER_CAPACITY = 4096        # số mẫu cấp phát trước cho session của DataCollector
+DATAGEN_SAMPLE_RATE = 0.1             # tỉ lệ frame được ghi thành mẫu khi sinh dữ liệu AI
+DATAGEN_CHUNK_EPISODES = 20           # số episode mỗi task gửi cho worker process
+POLICY_TABLE_FILE = "policy_table_{policy}.npz"  # bảng tra quyết định AI (src/policy_table.py)
+POLICY_TABLE_EPISODES = 20            # số episode đo độ khớp của bảng với policy gốc
+COMPACT_DATA_FILE = "training_data_compact.npz"  # dữ liệu training đã gộp (src/data_compaction.py)
+COMPACT_QUANT_LEVELS = 200            # số mức lượng tử hóa mỗi feature khi gộp mẫu trùng
+COMPACT_RESERVOIR_PER_CLASS = 5000    # số dòng tối đa mỗi (nguồn, action) trong tập compact
 
 # ==================== GAME CONSTANTS ====================
 # Combo system
@@ -107,3 +140,8 @@ ACHIEVEMENT_POPUP_DURATION = 180  # 3 seconds at 60fps
 
 # Game over flash
 GAME_OVER_FLASH_FRAMES = 30
+
+# Replay - ghi input mỗi lượt chơi (seed + bit input theo frame)
+REPLAY_RECORDING = True
+REPLAY_DIR = "replays"
+REPLAY_MAX_FILES = 50   # giữ lại N replay mới nhất
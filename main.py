@@ -29,7 +29,18 @@ try:
 except Exception as e:
     print(f"Database initialization skipped: {e}")
 
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="DinoRacer")
+    parser.add_argument('--resume', metavar='CHECKPOINT',
+                        help="Train NEAT tiếp từ checkpoint (đường dẫn hoặc 'latest')")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
 def main():
+    args = parse_args()
+
     # 1. Khởi tạo Pygame MỘT LẦN DUY NHẤT ở đầu chương trình
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
@@ -112,11 +123,11 @@ def main():
             print("\nChon loai AI:")
             print("1. NEAT (khuyen nghi - da duoc train)")
             print("2. Supervised (can train tu PVP truoc)")
-            ai_choice = input("Nhap lua chon (1-2): ").strip()
+            print("3. NEAT - bang tra (nhe, cho may yeu)")
+            print("4. Supervised - bang tra")
+            ai_choice = input("Nhap lua chon (1-4): ").strip()
 
-            ai_type = 'neat'
-            if ai_choice == '2':
-                ai_type = 'supervised'
+            ai_type = {'2': 'supervised', '3': 'neat_table', '4': 'supervised_table'}.get(ai_choice, 'neat')
 
             game = GameManager(screen)
             game.run_pve_mode(ai_type=ai_type)
@@ -138,16 +149,17 @@ def main():
             print("Bắt đầu NEAT Visual Training... (ESC để dừng, S để skip gen)")
             try:
                 from src.neat_visual import run_neat_visual
-                winner, config = run_neat_visual(screen, get_config_path(), generations=50)
+                winner, config = run_neat_visual(screen, get_config_path(), generations=50,
+                                                 resume=args.resume)
                 if winner:
                     from src.ai_handler import save_genome
-                    save_genome(winner)
+                    save_genome(winner, register=False)
                     print("\nTraining xong! Chạy AI tốt nhất...")
                     run_best_genome_display(winner, config)
             except Exception as e:
                 print(f"Lỗi Visual Training: {e}")
                 # Fallback về silent training
-                winner = run_neat_training(generations=20)
+                winner = run_neat_training(generations=20, resume=args.resume)
                 if winner:
                     config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
                                         neat.DefaultSpeciesSet, neat.DefaultStagnation,
@@ -157,13 +169,13 @@ def main():
         elif choice == 'Supervised Training':
             print("Bắt đầu Supervised Learning training...")
             try:
-                from src.supervised_trainer import train_supervised, get_data_stats
+                from src.supervised_trainer import train_incremental, get_data_stats
                 stats = get_data_stats()
                 print(f"Dữ liệu hiện có: {stats['total']} mẫu (Human: {stats['human']}, AI: {stats['ai']})")
                 if stats['total'] < 10:
                     print("Chưa đủ dữ liệu! Hãy chơi PVP mode để thu thập dữ liệu trước.")
                 else:
-                    success = train_supervised()
+                    success = train_incremental()
                     if success:
                         print("Training Supervised hoàn tất! Models đã lưu.")
             except Exception as e:
@@ -5,13 +5,10 @@ import os
 import pickle
 import neat
 from config.settings import (
-    BEST_GENOME_FILE,
+    BEST_GENOME_FILE, NEAT_COURSE_SEEDS, NEAT_SCHEMA, NOVELTY_ENABLED,
     SCREEN_WIDTH, SCREEN_HEIGHT, FPS,
-    GROUND_Y, INITIAL_SCORE, SPEED_INCREASE_INTERVAL, SPEED_INCREASE_AMOUNT,
-    MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX,
 )
-from src.dino import Dino
-from src.obstacle import create_obstacle
+from src.features import extract, feature_size, NEAT_V1
 from src.highscore import load_highscore, save_highscore
 from src.assets_loader import play_sound
 
@@ -24,158 +21,267 @@ def get_genome_path():
     return os.path.join(os.path.dirname(__file__), '..', BEST_GENOME_FILE)
 
 
-def save_genome(genome):
+# Cache neat.Config (parse neat-config.txt chỉ 1 lần)
+_neat_config = None
+
+
+def get_neat_config():
+    global _neat_config
+    if _neat_config is None:
+        _neat_config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                   neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                   get_config_path())
+    return _neat_config
+
+
+def check_schema(config, schema=NEAT_SCHEMA):
+    """True nếu num_inputs của neat-config.txt khớp schema (in lỗi nếu không)."""
+    num_inputs = config.genome_config.num_inputs
+    if num_inputs == feature_size(schema):
+        return True
+    print(f"neat-config.txt có num_inputs = {num_inputs} nhưng NEAT_SCHEMA = {schema} "
+          f"cần {feature_size(schema)} input")
+    return False
+
+
+def save_genome(genome, generation=None, register=True):
+    """Lưu best_genome.pkl và đưa genome vào hall-of-fame (genome_registry).
+    register=False khi RegistryReporter đã đăng ký genome trong lúc train."""
     try:
         with open(get_genome_path(), "wb") as f:
             pickle.dump(genome, f)
-        return True
     except (IOError, pickle.PickleError):
         return False
+    if not register:
+        return True
+    try:
+        from src.genome_registry import register_genome
+        register_genome(genome, get_neat_config(), generation=generation)
+    except Exception as e:
+        print(f"Không lưu được genome vào registry: {e}")
+    return True
 
 
 def load_genome():
+    """Genome champion của registry (nếu cùng NEAT_SCHEMA với neat-config.txt),
+    nếu không thì đọc best_genome.pkl."""
+    try:
+        from src.genome_registry import get_entry, load_registered_genome
+        entry = get_entry()
+        if entry is not None and entry.get('schema', NEAT_V1) == NEAT_SCHEMA:
+            genome = load_registered_genome(entry['id'])
+            if genome is not None:
+                return genome, get_neat_config()
+    except Exception:
+        pass
     path = get_genome_path()
     try:
-        if os.path.exists(path):
+        if os.path.exists(path) and check_schema(get_neat_config()):
             with open(path, "rb") as f:
                 genome = pickle.load(f)
-            config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                                 neat.DefaultSpeciesSet, neat.DefaultStagnation,
-                                 get_config_path())
-            return genome, config
+            return genome, get_neat_config()
     except Exception:
         pass
     return None, None
 
 
-def _get_inputs_from_lane(lane):
+def load_network():
+    """(network, schema) của champion cho AI lane: bản đã compile trong registry
+    (vài ms, schema theo entry), fallback về FeedForwardNetwork từ best_genome.pkl
+    (NEAT_SCHEMA). Trả về (None, None) nếu chưa có AI."""
+    try:
+        from src.genome_registry import get_entry, load_network as load_compiled
+        entry = get_entry()
+        if entry is not None:
+            net = load_compiled(entry['id'])
+            if net is not None:
+                return net, entry.get('schema', NEAT_V1)
+    except Exception as e:
+        print(f"Không load được network từ registry: {e}")
+    genome, config = load_genome()
+    if genome is None:
+        return None, None
+    return neat.nn.FeedForwardNetwork.create(genome, config), NEAT_SCHEMA
+
+
+def _get_inputs_from_lane(lane, schema=NEAT_SCHEMA):
     """Lấy inputs từ LaneGame object (dùng cho PVE mode)."""
-    return _get_inputs(lane.dino, lane.obstacles, lane.game_speed)
-
-
-def _get_inputs(dino, obstacles, game_speed):
-    """Cải thiện inputs cho AI - thêm nhiều features hơn"""
-    nearest = None
-    second_nearest = None
-    min_dist = float('inf')
-    second_dist = float('inf')
-
-    for obs in obstacles:
-        if obs.x > dino.x:
-            dist = obs.x - dino.x
-            if dist < min_dist:
-                second_dist = min_dist
-                second_nearest = nearest
-                min_dist = dist
-                nearest = obs
-            elif dist < second_dist:
-                second_dist = dist
-                second_nearest = obs
-
-    # Nếu không có obstacle
-    if nearest is None:
-        return [1.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-
-    from src.obstacle import Cactus, Bird
-
-    # Tính toán các inputs
-    # 1. Khoảng cách đến obstacle gần nhất (normalized)
-    dist1 = min(min_dist / 500, 1.0)
-
-    # 2. Loại obstacle gần nhất (0 = Cactus, 1 = Bird)
-    type1 = 0.0 if isinstance(nearest, Cactus) else 1.0
-
-    # 3. Chiều cao của Bird (0 = thấp, 1 = cao, 2 = rất cao)
-    if isinstance(nearest, Bird):
-        bird_height = nearest.y
-        height_ratio = (GROUND_Y - bird_height) / 130  # 130 = max height diff
-        type1 = 0.3 + height_ratio * 0.7  # Map to 0.3-1.0 range
-
-    # 4. Khoảng cách đến obstacle thứ 2
-    dist2 = min(second_dist / 500, 1.0) if second_nearest else 1.0
-
-    # 5. Tốc độ game (normalized)
-    speed_norm = (game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN)
-
-    # 6. Độ cao hiện tại của dino (0 = ground, 1 = cao nhất)
-    height_norm = min((GROUND_Y - dino.y) / 100, 1.0)
-
-    # 7. Đang nhảy hay không
-    is_jumping = 1.0 if dino.is_jumping else 0.0
-
-    # 8. Đang cúi hay không
-    is_ducking = 1.0 if dino.is_ducking else 0.0
-
-    return [dist1, type1, dist2, speed_norm, height_norm, is_jumping, is_ducking, 0.5]
+    return _get_inputs(lane.dino, lane.obstacles, lane.game_speed, schema)
+
+
+def _get_inputs(dino, obstacles, game_speed, schema=NEAT_SCHEMA):
+    """Inputs cho NEAT genome theo schema (mặc định NEAT_SCHEMA)."""
+    return extract(dino, obstacles, game_speed, schema)
+
+
+def _course_envs(course_seeds, schema):
+    """DinoEnv cho từng course của course_seeds (None = 1 course ngẫu nhiên)."""
+    from src.dino_env import DinoEnv, NEAT_MARGINS
+    from src.shared_course import get_course
+    # Thêm margin để AI không bị penalty quá nặng
+    return [DinoEnv(seed=seed, margins=NEAT_MARGINS, auto_reset=False, schema=schema,
+                    course=get_course(seed))
+            for seed in (course_seeds if course_seeds is not None else (None,))]
+
+
+def _run_course(net, env, fast_forward):
+    """Chơi hết 1 course, trả về fitness."""
+    from src.dino_env import action_from_output
+    from src.telemetry import add_steps
+    inputs = env.observe()
+    done = False
+    while not done:
+        action = action_from_output(net.activate(inputs))
+        # Bỏ qua các frame có cùng inputs (kết quả giống hệt step từng frame)
+        if fast_forward and env.fast_forward(action):
+            inputs = env.observe()
+            done = env.steps >= env.max_steps
+            continue
+        inputs, _, done, _ = env.step(action)
+    add_steps(env.steps)
+    return env.fitness()
+
+
+def eval_genome(genome, config, course_seeds=NEAT_COURSE_SEEDS, schema=NEAT_SCHEMA,
+                fast_forward=True):
+    """Fitness trung bình của genome trên các course của course_seeds.
+    fast_forward=False: step() từng frame (benchmark so sánh, kết quả giống hệt)."""
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+    envs = _course_envs(course_seeds, schema)
+    return sum(_run_course(net, env, fast_forward) for env in envs) / len(envs)
 
 
-def eval_genome(genome, config):
+def eval_genome_behavior(genome, config, course_seeds=NEAT_COURSE_SEEDS, schema=NEAT_SCHEMA):
+    """Như eval_genome, trả về thêm behaviour descriptor (gộp mọi course) cho novelty search."""
+    from src.dino_env import ACTION_JUMP, action_from_output
+    from src.novelty import behavior_descriptor
+    from src.telemetry import add_steps
     net = neat.nn.FeedForwardNetwork.create(genome, config)
-    dino = Dino()
-    obstacles = []
-    score = INITIAL_SCORE
-    game_speed = OBSTACLE_SPEED_MIN
-    last_obstacle_x = SCREEN_WIDTH
-
-    for _ in range(5000):
-        inputs = _get_inputs(dino, obstacles, game_speed)
-        output = net.activate(inputs)
-        jump, duck, _ = output
-        if jump > 0.5:
-            dino.jump()
-        dino.set_duck(duck > 0.5)  # AI dùng set_duck thay vì duck
-        dino.update(jump_held=False)  # AI không giữ phím
-
-        if last_obstacle_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
-            obs = create_obstacle(SCREEN_WIDTH + 50, min(game_speed, OBSTACLE_SPEED_MAX))
-            obstacles.append(obs)
-            last_obstacle_x = obs.x
-
-        for obs in obstacles:
-            obs.update()
-            if obs.x < dino.x and not obs.passed:
-                obs.passed = True
-                score += 1
-
-        obstacles = [o for o in obstacles if not o.is_off_screen()]
-        if obstacles:
-            last_obstacle_x = max(o.x for o in obstacles)
-
-        game_speed = min(
-            OBSTACLE_SPEED_MIN + (score // SPEED_INCREASE_INTERVAL) * SPEED_INCREASE_AMOUNT,
-            OBSTACLE_SPEED_MAX
-        )
-
-        dino_rect = dino.get_rect()
-        # Thêm margin để AI không bị penalty quá nặng
-        margin = 4
-        for obs in obstacles:
-            if dino_rect.inflate(-margin, -margin).colliderect(obs.get_rect().inflate(-margin, -margin)):
-                # Cải thiện fitness: thưởng nhiều hơn khi sống lâu ở tốc độ cao
-                speed_bonus = (game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN)
-                final_fitness = score * 10 * (1 + speed_bonus)
-                return final_fitness
-
-    # Cải thiện fitness: thưởng nhiều hơn khi sống lâu ở tốc độ cao
-    speed_bonus = (game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN)
-    final_fitness = score * 10 * (1 + speed_bonus)
-    return final_fitness
+    envs = _course_envs(course_seeds, schema)
+    counts = [0, 0, 0, 0]
+    jump_dists = []
+    for env in envs:
+        inputs = env.observe()
+        done = False
+        while not done:
+            action = action_from_output(net.activate(inputs))
+            skipped = env.fast_forward(action)
+            if skipped:
+                counts[action] += skipped
+                inputs = env.observe()
+                done = env.steps >= env.max_steps
+                continue
+            counts[action] += 1
+            # inputs[5] = đang nhảy (neat_v1 / neat_v2); chỉ ghi lúc bắt đầu nhảy (dist1 = inputs[0])
+            if action & ACTION_JUMP and not inputs[5]:
+                jump_dists.append(inputs[0])
+            inputs, _, done, _ = env.step(action)
+        add_steps(env.steps)
+    fitness = sum(env.fitness() for env in envs) / len(envs)
+    return fitness, behavior_descriptor(counts, jump_dists, sum(env.steps for env in envs),
+                                        sum(env.max_steps for env in envs))
+
+
+# Hàm eval mà worker phân tán được phép gọi (theo tên)
+EVAL_FUNCS = {f.__name__: f for f in (eval_genome, eval_genome_behavior)}
+
+# Coordinator của src.distributed khi train phân tán (None = eval tại chỗ)
+_coordinator = None
+
+
+def _evaluate_all(genomes, config, eval_func):
+    """Kết quả eval_func cho từng genome (qua fitness cache), phân tán nếu có coordinator."""
+    if _coordinator is not None:
+        return _coordinator.map([g for _, g in genomes], config, eval_func.__name__)
+    from src.fitness_cache import get_fitness_cache
+    cache = get_fitness_cache()
+    return [cache.evaluate(genome, config, eval_func) for _, genome in genomes]
 
 
 def eval_genomes(genomes, config):
-    for genome_id, genome in genomes:
-        genome.fitness = eval_genome(genome, config)
-
-
-def run_neat_training(generations=50):
-    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                         neat.DefaultSpeciesSet, neat.DefaultStagnation,
-                         get_config_path())
-    population = neat.Population(config)
+    for (genome_id, genome), fitness in zip(genomes, _evaluate_all(genomes, config, eval_genome)):
+        genome.fitness = fitness
+
+
+def eval_genomes_novelty(genomes, config):
+    """eval_genomes cho novelty search: fitness = blend fitness gốc + novelty."""
+    from src.novelty import get_archive
+    from src.telemetry import set_metric
+    descriptors = []
+    for (genome_id, genome), result in zip(genomes, _evaluate_all(genomes, config, eval_genome_behavior)):
+        genome.fitness, desc = result
+        descriptors.append(desc)
+    archive = get_archive()
+    novelty = archive.score([g for _, g in genomes], descriptors)
+    set_metric('best_raw_fitness', max(g.raw_fitness for _, g in genomes))
+    set_metric('novelty_mean', float(novelty.mean()))
+    set_metric('archive_size', len(archive))
+
+
+def run_neat_training(generations=50, resume=None, novelty=NOVELTY_ENABLED,
+                      coordinator=None, local_workers=0, warm_start=False):
+    """Train NEAT headless. resume: đường dẫn checkpoint hoặc 'latest'.
+    novelty: bật novelty search (archive được lưu kèm checkpoint).
+    coordinator: 'host:port' để eval phân tán qua worker TCP (src.distributed);
+    local_workers: số worker process tự chạy trên máy này.
+    warm_start: population mới được fit vào dữ liệu người chơi (src.bc_init)."""
+    global _coordinator
+    from src.genome_registry import RegistryReporter
+    from src.checkpoint import AsyncCheckpointer, resolve_checkpoint, restore_population
+    from src.telemetry import create_reporter
+    from src.fitness_cache import get_fitness_cache
+    from src import novelty as novelty_search
+    config = get_neat_config()
+    if not check_schema(config):
+        return None
+    population = None
+    if resume:
+        path = resolve_checkpoint(resume, 'neat')
+        if path:
+            population, extra = restore_population(path, config)
+            if extra and extra.get('novelty_archive') is not None:
+                novelty_search.set_archive(extra['novelty_archive'])
+        else:
+            print("Không tìm thấy checkpoint, train từ đầu")
+    if population is None:
+        population = neat.Population(config)
+        if warm_start:
+            from src.bc_init import warm_start_population
+            warm_start_population(population, config)
+    extra_state = (lambda: {'novelty_archive': novelty_search.get_archive()}) if novelty else None
+    checkpointer = AsyncCheckpointer('neat', extra_state=extra_state)
+    checkpointer.best_genome = population.best_genome
     population.add_reporter(neat.StdOutReporter(True))
     population.add_reporter(neat.StatisticsReporter())
-    winner = population.run(eval_genomes, generations)
-    if winner and save_genome(winner):
+    population.add_reporter(RegistryReporter(config))
+    population.add_reporter(checkpointer)
+    population.add_reporter(get_fitness_cache())
+    if coordinator:
+        from src.distributed import Coordinator
+        try:
+            _coordinator = Coordinator(coordinator, local_workers=local_workers)
+        except ValueError as e:
+            print(e)
+            return None
+        population.add_reporter(_coordinator)
+    telemetry = create_reporter('neat', config, resumed_from=resume, novelty=novelty,
+                                distributed=bool(coordinator), warm_start=warm_start)
+    if telemetry:
+        population.add_reporter(telemetry)
+    try:
+        winner = population.run(eval_genomes_novelty if novelty else eval_genomes, generations)
+    except KeyboardInterrupt:
+        print("\nTraining dừng sớm, lưu checkpoint...")
+        checkpointer.save_population(population)
+        winner = population.best_genome
+    finally:
+        checkpointer.wait()
+        if telemetry:
+            telemetry.close()
+        if _coordinator is not None:
+            _coordinator.close()
+            _coordinator = None
+    if winner and save_genome(winner, register=False):
         print(f"Đã lưu AI vào {get_genome_path()}")
     return winner
 
@@ -208,3 +314,23 @@ def run_best_genome_display(genome, config):
         clock.tick(FPS)
 
     return genome
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="NEAT training headless")
+    parser.add_argument('--generations', type=int, default=50)
+    parser.add_argument('--resume', metavar='CHECKPOINT',
+                        help="File checkpoint hoặc 'latest'")
+    parser.add_argument('--novelty', action='store_true', default=NOVELTY_ENABLED,
+                        help="Novelty search: blend fitness với độ mới lạ của hành vi")
+    parser.add_argument('--coordinator', metavar='HOST:PORT',
+                        help="Eval phân tán: chờ worker (python -m src.distributed worker HOST:PORT)")
+    parser.add_argument('--local-workers', type=int, default=0,
+                        help="Số worker process tự chạy trên máy này (cần --coordinator)")
+    parser.add_argument('--warm-start', action='store_true',
+                        help="Fit population ban đầu vào dữ liệu người chơi (behaviour cloning)")
+    args = parser.parse_args()
+    run_neat_training(args.generations, resume=args.resume, novelty=args.novelty,
+                      coordinator=args.coordinator, local_workers=args.local_workers,
+                      warm_start=args.warm_start)
@@ -3,6 +3,7 @@ Assets Loader - Tải sprites, sprite sheets và âm thanh
 """
 import os
 import pygame
+from src.profiler import get_profiler
 
 # Đường dẫn thư mục assets/images (dùng cho load_sprite_sheet)
 current_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "images")
@@ -83,7 +84,8 @@ def get_sheet(filename, num_frames, target_w, target_h):
     """Lấy frames từ sprite sheet, cache kết quả."""
     key = (filename, num_frames, target_w, target_h)
     if key not in _sheet_cache:
-        _sheet_cache[key] = load_sprite_sheet_sized(filename, num_frames, target_w, target_h)
+        with get_profiler().section('assets'):
+            _sheet_cache[key] = load_sprite_sheet_sized(filename, num_frames, target_w, target_h)
     return _sheet_cache[key]
 
 
@@ -93,9 +95,10 @@ def load_image(path, scale=None):
     full = os.path.join(current_path, path)
     try:
         if os.path.exists(full):
-            img = pygame.image.load(full).convert_alpha()
-            if scale:
-                img = pygame.transform.scale(img, scale)
+            with get_profiler().section('assets'):
+                img = pygame.image.load(full).convert_alpha()
+                if scale:
+                    img = pygame.transform.scale(img, scale)
             return img
     except pygame.error:
         pass
@@ -0,0 +1,262 @@
+"""
+BC Init - Khởi tạo population NEAT bằng behaviour cloning
+
+Thay vì bắt đầu từ genome ngẫu nhiên, fit trọng số của topology ban đầu
+(neat-config: num_hidden = 4, initial_connection = full_nodirect, tanh) vào dữ
+liệu người chơi đã thu thập (training_data / training_data.json: inputs ->
+jump/duck) bằng Adam full-batch trên numpy, rồi mutate bản đã fit thành
+generation đầu đa dạng.
+
+Dữ liệu thu thập theo schema collector_v1 (6 feature) nên được đổi sang neat_v1:
+type1 của bird lấy độ cao trung bình của BIRD_HEIGHTS, dist2 = 1 (không lưu).
+
+Chạy:
+    python -m src.ai_handler --warm-start                    # train NEAT từ population đã fit
+    python -m src.bc_init                                    # chỉ fit, in accuracy
+    python -m src.bc_init --compare --generations 30 --runs 3   # số generation tới ngưỡng: random vs BC
+"""
+import argparse
+import copy
+import random
+import time
+
+import neat
+import numpy as np
+
+from config.settings import (
+    GROUND_Y, BC_INIT_EPOCHS, BC_INIT_LR, BC_INIT_KEEP, BC_COMPARE_THRESHOLD, NEAT_SCHEMA,
+)
+from src.features import FEATURE_SCHEMAS, NEAT_V1, BIRD_HEIGHT_RANGE
+from src.obstacle import BIRD_HEIGHTS
+
+# Hệ số trong tanh_activation của neat-python: tanh(2.5 * z)
+_TANH_SCALE = 2.5
+_BIRD_TYPE1 = float(np.mean([0.3 + (GROUND_Y - y) / BIRD_HEIGHT_RANGE * 0.7 for y in BIRD_HEIGHTS]))
+
+
+def collector_to_neat_v1(X):
+    """Mảng (N, 6) collector_v1 -> (N, 8) neat_v1."""
+    X = np.asarray(X, dtype=np.float64)
+    n = len(X)
+    out = np.empty((n, len(FEATURE_SCHEMAS[NEAT_V1])))
+    out[:, 0] = X[:, 0]                                   # dist1
+    out[:, 1] = np.where(X[:, 1] > 0.5, _BIRD_TYPE1, 0.0)  # type1
+    out[:, 2] = 1.0                                       # dist2
+    out[:, 3:7] = X[:, 2:6]                               # speed, height, jumping, ducking
+    out[:, 7] = 0.5                                       # bias
+    return out
+
+
+def load_dataset():
+    """(X neat_v1, Y) với Y (N, 3) = jump, duck, nothing; None nếu thiếu dữ liệu."""
+    from src.supervised_trainer import load_training_data
+    X, y_jump, y_duck = load_training_data()
+    if X is None or len(X) < 10:
+        return None
+    y_jump = np.asarray(y_jump, dtype=np.float64)
+    y_duck = np.asarray(y_duck, dtype=np.float64)
+    if not y_jump.any():
+        # Fit vào dữ liệu toàn "không làm gì" cho ra genome không bao giờ nhảy
+        print("Dữ liệu người chơi không có mẫu nhảy")
+        return None
+    nothing = 1.0 - np.maximum(y_jump, y_duck)
+    return collector_to_neat_v1(X), np.stack([y_jump, y_duck, nothing], axis=1)
+
+
+def _balanced_weights(Y):
+    """Weight từng ô (N, 3) cân bằng 2 class của mỗi output (jump hiếm hơn nhiều)."""
+    W = np.ones_like(Y)
+    for j in range(Y.shape[1]):
+        pos = Y[:, j] > 0.5
+        n_pos = pos.sum()
+        if 0 < n_pos < len(Y):
+            W[pos, j] = len(Y) / (2 * n_pos)
+            W[~pos, j] = len(Y) / (2 * (len(Y) - n_pos))
+    return W
+
+
+def _forward(X, params):
+    W1, b1, W2, b2 = params
+    h = np.tanh(_TANH_SCALE * (X @ W1 + b1))
+    return h, np.tanh(_TANH_SCALE * (h @ W2 + b2))
+
+
+def fit_network(X, Y, hidden=4, epochs=BC_INIT_EPOCHS, lr=BC_INIT_LR, weight_max=30.0, seed=0):
+    """Fit mạng input -> hidden (tanh) -> output (tanh) giống network NEAT ban đầu.
+
+    Output được kéo về 1 (có action) / 0 (không) để ngưỡng 0.5 của
+    action_from_output nằm giữa 2 class. Trả về ((W1, b1, W2, b2), accuracy).
+    """
+    rng = np.random.default_rng(seed)
+    n, n_in = X.shape
+    # Khởi tạo nhỏ: tanh(2.5 z) bão hòa sớm, hidden unit bão hòa không học được
+    params = [rng.normal(0, 0.1, (n_in, hidden)), np.zeros(hidden),
+              rng.normal(0, 0.1, (hidden, Y.shape[1])), np.zeros(Y.shape[1])]
+    weights = _balanced_weights(Y) / n
+    m = [np.zeros_like(p) for p in params]
+    v = [np.zeros_like(p) for p in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for t in range(1, epochs + 1):
+        h, o = _forward(X, params)
+        # d(loss)/dz với loss = sum(w * (o - y)^2)
+        dz2 = 2 * weights * (o - Y) * _TANH_SCALE * (1 - o * o)
+        dz1 = (dz2 @ params[2].T) * _TANH_SCALE * (1 - h * h)
+        grads = (X.T @ dz1, dz1.sum(axis=0), h.T @ dz2, dz2.sum(axis=0))
+        for i, g in enumerate(grads):
+            m[i] = beta1 * m[i] + (1 - beta1) * g
+            v[i] = beta2 * v[i] + (1 - beta2) * g * g
+            step = lr * (m[i] / (1 - beta1 ** t)) / (np.sqrt(v[i] / (1 - beta2 ** t)) + eps)
+            params[i] = np.clip(params[i] - step, -weight_max, weight_max)
+    _, o = _forward(X, params)
+    accuracy = {name: float(((o[:, j] > 0.5) == (Y[:, j] > 0.5)).mean())
+                for j, name in enumerate(('jump', 'duck'))}
+    return tuple(params), accuracy
+
+
+def apply_weights(genome, config, params):
+    """Ghi trọng số đã fit vào genome có topology ban đầu (input -> hidden -> output)."""
+    W1, b1, W2, b2 = params
+    gc = config.genome_config
+    outputs = list(gc.output_keys)
+    hidden = sorted(k for k in genome.nodes if k not in outputs)
+    if len(hidden) != W1.shape[1] or len(gc.input_keys) != W1.shape[0]:
+        raise ValueError("genome không có topology ban đầu "
+                         f"({len(gc.input_keys)} input, {W1.shape[1]} hidden)")
+    layers = ((gc.input_keys, hidden, W1, hidden, b1), (hidden, outputs, W2, outputs, b2))
+    for sources, targets, W, nodes, b in layers:
+        for a, src in enumerate(sources):
+            for c, dst in enumerate(targets):
+                conn = genome.connections.get((src, dst))
+                if conn is None:
+                    raise ValueError(f"genome thiếu connection {src} -> {dst}")
+                conn.weight = float(W[a, c])
+                conn.enabled = True
+        for c, key in enumerate(nodes):
+            node = genome.nodes[key]
+            node.bias = float(b[c])
+            node.response = 1.0
+            node.activation = 'tanh'
+            node.aggregation = 'sum'
+
+
+def warm_start_population(population, config, dataset=None, keep=BC_INIT_KEEP, seed=0):
+    """Ghi trọng số fit từ dữ liệu người chơi vào population mới tạo.
+
+    keep genome đầu giữ nguyên bản đã fit, số còn lại được mutate 1 lần
+    (trọng số, bias, cấu trúc) để generation đầu đa dạng; sau đó chia lại species.
+    Trả về accuracy của bản đã fit, hoặc None nếu không warm start được.
+    """
+    if NEAT_SCHEMA != NEAT_V1:
+        # land / clear1 của neat_v2 không suy ra được từ dữ liệu collector_v1
+        print(f"Warm start chỉ hỗ trợ NEAT_SCHEMA = {NEAT_V1}, dùng population ngẫu nhiên")
+        return None
+    dataset = dataset if dataset is not None else load_dataset()
+    if dataset is None:
+        print("Không đủ dữ liệu người chơi để warm start, dùng population ngẫu nhiên")
+        return None
+    X, Y = dataset
+    params, accuracy = fit_network(X, Y, hidden=config.genome_config.num_hidden,
+                                   weight_max=config.genome_config.weight_max_value, seed=seed)
+    try:
+        for i, genome in enumerate(population.population.values()):
+            apply_weights(genome, config, params)
+            if i >= keep:
+                genome.mutate(config.genome_config)
+    except ValueError as e:
+        print(f"Không warm start được: {e}")
+        return None
+    population.species = config.species_set_type(config.species_set_config, population.reporters)
+    population.species.speciate(config, population.population, population.generation)
+    print(f"Warm start từ {len(X)} mẫu: accuracy jump {accuracy['jump']:.3f}, "
+          f"duck {accuracy['duck']:.3f}")
+    return accuracy
+
+
+class _ThresholdReporter(neat.reporting.BaseReporter):
+    """Ghi generation đầu tiên có best fitness >= threshold."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.generation = 0
+        self.reached = None
+        self.best = 0.0
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.best = max(self.best, best_genome.fitness)
+        if self.reached is None and best_genome.fitness >= self.threshold:
+            self.reached = self.generation
+
+
+def generations_to_threshold(config, generations, threshold, warm, seed=0, dataset=None):
+    """Chạy NEAT (không checkpoint/telemetry) tới khi best fitness >= threshold.
+    Trả về (generation đạt ngưỡng hoặc None, số giây, best fitness)."""
+    from src.ai_handler import eval_genomes
+    from src.fitness_cache import get_fitness_cache
+    get_fitness_cache().clear()
+    # Population.run dừng ngay generation đạt ngưỡng
+    config = copy.copy(config)
+    config.fitness_threshold = threshold
+    config.no_fitness_termination = False
+    random.seed(seed)
+    start = time.perf_counter()
+    population = neat.Population(config)
+    if warm:
+        warm_start_population(population, config, dataset, seed=seed)
+    reporter = _ThresholdReporter(threshold)
+    population.add_reporter(reporter)
+    population.run(eval_genomes, generations)
+    return reporter.reached, time.perf_counter() - start, reporter.best
+
+
+def compare_starts(config, generations=30, threshold=BC_COMPARE_THRESHOLD, runs=3):
+    """So sánh số generation (và thời gian) tới ngưỡng fitness: random vs warm start."""
+    dataset = load_dataset()
+    if dataset is None:
+        print("Không đủ dữ liệu người chơi để so sánh")
+        return None
+    results = {'random': [], 'warm': []}
+    for seed in range(runs):
+        for name in results:
+            reached, seconds, best = generations_to_threshold(
+                config, generations, threshold, name == 'warm', seed, dataset)
+            results[name].append(reached)
+            shown = reached if reached is not None else f">{generations - 1}"
+            print(f"seed {seed} {name:6}: generation {shown} ({seconds:.1f}s, best {best:.0f})")
+    for name, reached in results.items():
+        hit = [r for r in reached if r is not None]
+        mean = f"{np.mean(hit):.1f}" if hit else "-"
+        print(f"{name:6}: đạt ngưỡng {threshold} ở {len(hit)}/{runs} run, "
+              f"trung bình generation {mean}")
+    return results
+
+
+def main(argv=None):
+    from src.ai_handler import get_neat_config
+    parser = argparse.ArgumentParser(description="Behaviour cloning cho population NEAT ban đầu")
+    parser.add_argument('--compare', action='store_true',
+                        help="So sánh số generation tới ngưỡng: random vs warm start")
+    parser.add_argument('--generations', type=int, default=30)
+    parser.add_argument('--threshold', type=float, default=BC_COMPARE_THRESHOLD)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args(argv)
+    config = get_neat_config()
+    if args.compare:
+        compare_starts(config, args.generations, args.threshold, args.runs)
+        return
+    dataset = load_dataset()
+    if dataset is None:
+        print("Không đủ dữ liệu người chơi")
+        return
+    X, Y = dataset
+    start = time.perf_counter()
+    _, accuracy = fit_network(X, Y, hidden=config.genome_config.num_hidden,
+                              weight_max=config.genome_config.weight_max_value)
+    print(f"Fit {len(X)} mẫu trong {time.perf_counter() - start:.2f}s: "
+          f"accuracy jump {accuracy['jump']:.3f}, duck {accuracy['duck']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
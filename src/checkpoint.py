@@ -0,0 +1,238 @@
+"""
+Checkpoint - Lưu và khôi phục toàn bộ trạng thái NEAT training
+
+Mỗi checkpoint chứa population, species, innovation tracker, trạng thái
+random và genome tốt nhất, đủ để train tiếp đúng như chưa từng dừng.
+
+AsyncCheckpointer là reporter NEAT: cuối generation nó pickle trạng thái
+ngay trong thread training (snapshot nhất quán, ~10ms), còn phần nén + ghi
+file chạy trong background thread nên training không phải chờ. Chỉ giữ
+CHECKPOINT_KEEP file mới nhất cho mỗi trainer.
+
+Resume:
+    python -m src.ai_handler --resume latest
+    python main.py --resume checkpoints/neat_visual-00012.ckpt
+
+Kiểm tra save -> restore -> train tiếp (fitness giả, không chạy game):
+    python -m src.checkpoint --check
+"""
+import argparse
+import glob
+import os
+import pickle
+import random
+import threading
+import time
+import zlib
+
+import neat
+
+from itertools import count
+
+from config.settings import (
+    CHECKPOINT_DIR, CHECKPOINT_INTERVAL, CHECKPOINT_INTERVAL_SECONDS, CHECKPOINT_KEEP,
+)
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_EXT = '.ckpt'
+
+
+def get_checkpoint_dir():
+    return os.path.join(os.path.dirname(__file__), '..', CHECKPOINT_DIR)
+
+
+def list_checkpoints(prefix=None):
+    """Các file checkpoint, cũ nhất trước (theo mtime)."""
+    pattern = f'{prefix}-*{CHECKPOINT_EXT}' if prefix else f'*{CHECKPOINT_EXT}'
+    return sorted(glob.glob(os.path.join(get_checkpoint_dir(), pattern)), key=os.path.getmtime)
+
+
+def resolve_checkpoint(path, prefix=None):
+    """'latest' -> checkpoint mới nhất (của prefix nếu có), còn lại giữ nguyên."""
+    if path != 'latest':
+        return path
+    files = list_checkpoints(prefix) or list_checkpoints()
+    return files[-1] if files else None
+
+
+class AsyncCheckpointer(neat.reporting.BaseReporter):
+    """Reporter NEAT: checkpoint định kỳ, ghi file trong background thread.
+
+    extra_state: hàm trả về dict trạng thái riêng của trainer (được lưu kèm
+    và trả lại khi restore).
+    """
+
+    def __init__(self, prefix='neat', interval=CHECKPOINT_INTERVAL,
+                 interval_seconds=CHECKPOINT_INTERVAL_SECONDS, keep=CHECKPOINT_KEEP,
+                 extra_state=None):
+        self.prefix = prefix
+        self.interval = interval
+        self.interval_seconds = interval_seconds
+        self.keep = keep
+        self.extra_state = extra_state
+        self.generation = 0
+        self.best_genome = None
+        self.last_generation = None
+        self.last_time = time.time()
+        self.last_path = None
+        self._thread = None
+
+    # ── Reporter hooks ──────────────────────────────────
+
+    def start_generation(self, generation):
+        self.generation = generation
+        if self.last_generation is None:
+            self.last_generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        if self.best_genome is None or best_genome.fitness > self.best_genome.fitness:
+            self.best_genome = best_genome
+
+    def end_generation(self, config, population, species_set):
+        # population/species_set lúc này là của generation kế tiếp
+        next_generation = self.generation + 1
+        due = next_generation - self.last_generation >= self.interval
+        if self.interval_seconds is not None and time.time() - self.last_time >= self.interval_seconds:
+            due = True
+        if due:
+            self.save(config, population, species_set, next_generation)
+
+    # ── Lưu ─────────────────────────────────────────────
+
+    def save_population(self, population):
+        """Checkpoint ngay từ neat.Population (dùng khi dừng bằng ESC / Ctrl+C)."""
+        if population.best_genome is not None and (
+                self.best_genome is None or population.best_genome.fitness > self.best_genome.fitness):
+            self.best_genome = population.best_genome
+        return self.save(population.config, population.population, population.species,
+                         population.generation)
+
+    def save(self, config, population, species_set, generation):
+        """Snapshot đồng bộ rồi ghi file bất đồng bộ. Trả về đường dẫn file."""
+        # species_set giữ ReporterSet (có cả reporter này) -> tách ra khi pickle
+        reporters = species_set.reporters
+        species_set.reporters = None
+        try:
+            data = {
+                'version': CHECKPOINT_VERSION,
+                'generation': generation,
+                'population': population,
+                'species': species_set,
+                'innovation_tracker': getattr(config.genome_config, 'innovation_tracker', None),
+                'best_genome': self.best_genome,
+                'random_state': random.getstate(),
+                'extra': self.extra_state() if self.extra_state else None,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PickleError, TypeError, AttributeError) as e:
+            print(f"Error creating checkpoint: {e}")
+            return None
+        finally:
+            species_set.reporters = reporters
+
+        path = os.path.join(get_checkpoint_dir(), f'{self.prefix}-{generation:05d}{CHECKPOINT_EXT}')
+        # Chờ lần ghi trước (nếu còn) để file luôn theo thứ tự generation
+        self.wait()
+        self._thread = threading.Thread(target=self._write, args=(path, blob),
+                                        name='neat-checkpoint')
+        self._thread.start()
+        self.last_generation = generation
+        self.last_time = time.time()
+        self.last_path = path
+        return path
+
+    def _write(self, path, blob):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(blob, 6))
+            os.replace(tmp, path)
+            print(f"Checkpoint: {os.path.basename(path)}")
+        except (IOError, OSError) as e:
+            print(f"Error saving checkpoint {path}: {e}")
+            return
+        for old in list_checkpoints(self.prefix)[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def wait(self):
+        """Đợi background thread ghi xong (gọi trước khi thoát)."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def restore_population(path, config):
+    """Tạo lại neat.Population từ checkpoint.
+
+    Trả về (population, extra) hoặc (None, None) nếu lỗi.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.loads(zlib.decompress(f.read()))
+    except (IOError, OSError, zlib.error, pickle.PickleError, EOFError, AttributeError) as e:
+        print(f"Error loading checkpoint {path}: {e}")
+        return None, None
+    if not isinstance(data, dict) or data.get('version') != CHECKPOINT_VERSION:
+        print(f"Checkpoint {path}: định dạng không hỗ trợ")
+        return None, None
+
+    population = neat.Population(config, (data['population'], data['species'], data['generation']))
+    # neat-python 0.92 không gắn lại reporters cho species set (đã bỏ khi pickle)
+    # và đánh số genome mới lại từ 1
+    population.species.reporters = population.reporters
+    population.reproduction.genome_indexer = count(max(population.population) + 1)
+    # Innovation number phải nối tiếp, nếu không crossover sẽ ghép sai gene
+    tracker = data['innovation_tracker']
+    if tracker is not None:
+        population.reproduction.innovation_tracker = tracker
+        config.genome_config.innovation_tracker = tracker
+    population.best_genome = data['best_genome']
+    random.setstate(data['random_state'])
+    print(f"Resume từ {os.path.basename(path)} (generation {data['generation']})")
+    return population, data['extra']
+
+
+def _check_eval(genomes, config):
+    for _, genome in genomes:
+        genome.fitness = sum(c.weight for c in genome.connections.values() if c.enabled)
+
+
+def check_resume(config, generations=2):
+    """Train vài generation, restore từ checkpoint cuối rồi train tiếp.
+    Trả về True nếu resume chạy được."""
+    prefix = 'resume_check'
+    checkpointer = AsyncCheckpointer(prefix=prefix, interval=1, interval_seconds=None, keep=1)
+    try:
+        population = neat.Population(config)
+        population.add_reporter(checkpointer)
+        population.run(_check_eval, generations)
+        checkpointer.wait()
+        restored, _ = restore_population(checkpointer.last_path, config)
+        if restored is None:
+            return False
+        restored.run(_check_eval, generations)
+        print(f"Resume OK: generation {restored.generation}")
+        return True
+    except Exception as e:
+        print(f"Resume lỗi: {type(e).__name__}: {e}")
+        return False
+    finally:
+        checkpointer.wait()
+        for path in list_checkpoints(prefix):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checkpoint NEAT")
+    parser.add_argument('--check', action='store_true',
+                        help="Kiểm tra save -> restore -> train tiếp với neat-config hiện tại")
+    args = parser.parse_args()
+    if args.check:
+        from src.ai_handler import get_neat_config
+        raise SystemExit(0 if check_resume(get_neat_config()) else 1)
+    parser.print_help()
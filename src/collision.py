@@ -0,0 +1,184 @@
+"""
+Collision - Kiểm tra va chạm dino/obstacle không tạo pygame.Rect mỗi frame
+
+Kết quả giống hệt dino.get_rect().inflate(-dm, -dm).colliderect(
+obs.get_rect().inflate(-om, -om)): pygame.Rect cắt phần thập phân về 0 (int())
+và inflate(-m) dịch vào m // 2, thu nhỏ m.
+
+Hitbox của obstacle (top, bottom, offset, width đã trừ margin) được tính một lần
+và lưu trên obstacle; mỗi frame chỉ còn cộng int(obs.x).
+Obstacle phải theo thứ tự x tăng dần (ObstacleQueue) để broadphase dừng sớm.
+
+Swept AABB (sweep_intervals / time_of_impact): obstacle đi ngang tuyến tính,
+dino đi theo cung nhảy. Sau n lần update() khi đang nhảy:
+    y_n = y + n * vel_y + gravity * n * (n + 1) / 2    (chặn ở ground)
+nên khoảng thời gian 2 hitbox chồng nhau giải được bằng phương trình bậc 1 / 2.
+DinoEnv(frame_skip > 1) dùng nó làm broadphase: chỉ kiểm tra find_collision ở
+các frame con nằm trong khoảng này, kết quả giống hệt kiểm tra từng frame.
+"""
+import math
+
+from config.settings import COLLISION_MARGIN, DUCK_HEIGHT_RATIO
+
+# Margin mặc định của các mode chơi (dino thu 2*margin, obstacle thu margin)
+DINO_MARGIN = COLLISION_MARGIN * 2
+OBSTACLE_MARGIN = COLLISION_MARGIN
+
+
+def obstacle_hitbox(obs, margin):
+    """(margin, y, top, bottom, left_offset, width) đã inflate, cache trên obstacle.
+
+    Cache theo (margin, y) vì lane game chỉnh lại y ngay sau khi spawn.
+    """
+    hb = obs._hitbox
+    if hb is None or hb[0] != margin or hb[1] != obs.y:
+        half = margin // 2
+        top = int(obs.y) + half
+        hb = (margin, obs.y, top, top + obs.height - margin, half, obs.width - margin)
+        obs._hitbox = hb
+    return hb
+
+
+def dino_hitbox(dino, margin=DINO_MARGIN):
+    """(left, top, right, bottom) của dino sau khi inflate(-margin, -margin)."""
+    h = int(dino.height * DUCK_HEIGHT_RATIO) if dino.is_ducking else dino.height
+    half = margin // 2
+    top = int(dino.y + (dino.height - h)) + half
+    left = int(dino.x) + half
+    return left, top, left + dino.width - margin, top + h - margin
+
+
+def find_collision(dino, obstacles, dino_margin=DINO_MARGIN, obstacle_margin=OBSTACLE_MARGIN):
+    """Trả về obstacle đầu tiên va chạm với dino, hoặc None."""
+    half = dino_margin // 2
+    h = int(dino.height * DUCK_HEIGHT_RATIO) if dino.is_ducking else dino.height
+    d_top = int(dino.y + (dino.height - h)) + half
+    d_bottom = d_top + h - dino_margin
+    d_left = int(dino.x) + half
+    d_right = d_left + dino.width - dino_margin
+
+    for obs in obstacles:
+        hb = obs._hitbox
+        if hb is None or hb[0] != obstacle_margin or hb[1] != obs.y:
+            hb = obstacle_hitbox(obs, obstacle_margin)
+        o_left = int(obs.x) + hb[4]
+        # Broadphase: các obstacle sau đều nằm xa hơn về bên phải
+        if o_left >= d_right:
+            return None
+        if d_left < o_left + hb[5] and d_top < hb[3] and hb[2] < d_bottom:
+            return obs
+    return None
+
+
+# ── Swept AABB ──────────────────────────────────────────
+
+# Nới hitbox khi sweep: int() của pygame.Rect lệch < 1px so với tọa độ thực
+SWEEP_SLACK = 2
+
+
+def _roots(a, b, c):
+    """Nghiệm (r1 <= r2) của a*t^2 + b*t + c = 0, hoặc None."""
+    if a == 0:
+        if b == 0:
+            return None
+        r = -c / b
+        return r, r
+    disc = b * b - 4 * a * c
+    if disc <= 0:
+        return None
+    sq = math.sqrt(disc)
+    r1, r2 = (-b - sq) / (2 * a), (-b + sq) / (2 * a)
+    return (r1, r2) if r1 <= r2 else (r2, r1)
+
+
+def dino_arc(dino, jump_held=False):
+    """(y, vel_y, gravity, ground_level) cho chuyển động dọc của dino từ frame tới.
+    Trên ground: vel_y = gravity = 0."""
+    ground_level = dino.ground_y - dino.height
+    if not dino.is_jumping:
+        return dino.y, 0.0, 0.0, ground_level
+    return dino.y, dino.vel_y, dino.current_gravity(jump_held), ground_level
+
+
+def arc_lands_within(arc, frames):
+    """True nếu cung nhảy chạm ground trong frames frame tới."""
+    y, vel, g, ground = arc
+    return g > 0 and y + frames * vel + g * frames * (frames + 1) / 2 >= ground
+
+
+def _vertical_intervals(arc, lo, hi, t_min, t_max):
+    """Các khoảng t trong [t_min, t_max] mà lo < y(t) < hi, y(t) là cung nhảy chặn ở ground."""
+    y, vel, g, ground = arc
+    if g == 0:
+        return [(t_min, t_max)] if lo < min(y, ground) < hi else []
+    if ground <= lo:
+        return []
+    # y(t) = a t^2 + b t + y (khớp đúng y_n tại t nguyên)
+    a, b = g / 2, vel + g / 2
+    # Điều kiện trên: min(y(t), ground) < hi
+    if ground < hi:
+        upper = (t_min, t_max)
+    else:
+        r = _roots(a, b, y - hi)
+        if r is None:
+            return []
+        upper = (max(t_min, r[0]), min(t_max, r[1]))
+        if upper[0] > upper[1]:
+            return []
+    # Điều kiện dưới: y(t) > lo, ngoài khoảng giữa 2 nghiệm (parabol lồi)
+    r = _roots(a, b, y - lo)
+    if r is None:
+        return [upper]
+    out = []
+    if upper[0] < r[0]:
+        out.append((upper[0], min(upper[1], r[0])))
+    if upper[1] > r[1]:
+        out.append((max(upper[0], r[1]), upper[1]))
+    return out
+
+
+def sweep_intervals(dino, obs, frames, arc=None, dino_margin=DINO_MARGIN,
+                    obstacle_margin=OBSTACLE_MARGIN, slack=SWEEP_SLACK, vertical=True):
+    """Các khoảng thời gian t trong [0, frames] (đơn vị frame) mà hitbox của dino
+    (chiều cao đứng, chứa cả hitbox lúc cúi) và obstacle nới thêm slack px chồng nhau.
+
+    arc: kết quả dino_arc() (mặc định lấy từ trạng thái hiện tại).
+    vertical=False: bỏ điều kiện trục y (khi không đoán trước được cung nhảy).
+    """
+    hb = obstacle_hitbox(obs, obstacle_margin)
+    half = dino_margin // 2
+    d_left = dino.x + half
+    d_right = d_left + dino.width - dino_margin
+    o_left = obs.x + hb[4]
+    # Trục x: o_left(t) = o_left - speed * t
+    speed = obs.speed
+    if speed > 0:
+        t0 = max(0.0, (o_left - d_right - slack) / speed)
+        t1 = min(float(frames), (o_left + hb[5] - d_left + slack) / speed)
+    elif d_left - slack < o_left + hb[5] and o_left < d_right + slack:
+        t0, t1 = 0.0, float(frames)
+    else:
+        return []
+    if t0 > t1:
+        return []
+    if not vertical:
+        return [(t0, t1)]
+    # Trục y theo dino.y (top của hitbox đứng = y + half)
+    lo = hb[2] - half - dino.height + dino_margin - slack
+    hi = hb[3] - half + slack
+    return _vertical_intervals(arc or dino_arc(dino), lo, hi, t0, t1)
+
+
+def time_of_impact(dino, obstacles, frames=1, jump_held=False,
+                   dino_margin=DINO_MARGIN, obstacle_margin=OBSTACLE_MARGIN):
+    """Thời điểm va chạm sớm nhất (t tính bằng frame, có phần thập phân) trong
+    frames frame tới với chuyển động hiện tại, và obstacle tương ứng.
+    Trả về (t, obs) hoặc None. Dùng tọa độ thực (không int()), không slack."""
+    arc = dino_arc(dino, jump_held)
+    best = None
+    for obs in obstacles:
+        for t0, _ in sweep_intervals(dino, obs, frames, arc, dino_margin, obstacle_margin, slack=0):
+            if best is None or t0 < best[0]:
+                best = (t0, obs)
+            break
+    return best
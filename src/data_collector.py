@@ -1,10 +1,19 @@
 """
 Data Collector - Thu thập dữ liệu training từ người chơi và AI
 Dữ liệu bao gồm: inputs (trạng thái game) -> outputs (hành động người chơi)
+
+Mẫu của session được ghi vào SessionBuffer (mỗi cột 1 mảng numpy cấp phát
+trước, xem src/sample_log.py); khi lưu, các cột được ghi vào database (COPY) và
+sample log nhị phân training_data.bin. training_data.json chỉ còn được đọc
+(dữ liệu cũ), save_session_data() không ghi vào file này nữa.
 """
 import os
 import json
-from config.settings import SCREEN_WIDTH
+from config.settings import SCREEN_WIDTH, GROUND_Y
+from src.features import extract, COLLECTOR_V1
+from src.sample_log import (
+    SessionBuffer, append_samples, count_samples, get_log_path, source_id, to_db_rows,
+)
 
 
 def get_data_path():
@@ -24,64 +33,23 @@ def get_data_file_path():
 class DataCollector:
     """Thu thập dữ liệu training từ người chơi và AI"""
     
-    def __init__(self):
-        self.data = []
-        self.current_session_data = []
+    def __init__(self, data_path=None, log_path=None):
+        self.session = SessionBuffer()
         self.use_database = True  # Mặc định sử dụng database
+        # File JSON cũ (chỉ đọc); mặc định training_data.json ở gốc project
+        self.data_path = data_path or get_data_file_path()
+        # Sample log nhị phân làm backup
+        self.log_path = log_path or get_log_path()
     
     def get_inputs_from_game(self, dino, obstacles, game_speed, ground_y=None):
         """
-        Lấy inputs từ trạng thái game hiện tại
-        Trả về list các giá trị đã normalize
+        Lấy inputs từ trạng thái game hiện tại (schema collector_v1)
+        Trả về list các giá trị đã normalize:
+        [khoảng cách, loại obstacle, tốc độ game, độ cao dino, đang nhảy, đang cúi]
         """
-        from config.settings import GROUND_Y, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX
-        
         if ground_y is None:
             ground_y = GROUND_Y
-            
-        # Tìm obstacle gần nhất
-        nearest = None
-        min_dist = float('inf')
-        for obs in obstacles:
-            if obs.x > dino.x:
-                dist = obs.x - dino.x
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest = obs
-        
-        # Nếu không có obstacle phía trước
-        if nearest is None:
-            return [1.0, 0.5, 0.0, 0.0, 0.0, 0.0]
-        
-        from src.obstacle import Cactus, Bird
-        
-        # Tính toán các inputs
-        # 1. Khoảng cách đến obstacle gần nhất (0-1)
-        dist_normalized = min(min_dist / 500, 1.0)
-        
-        # 2. Loại obstacle (0 = Cactus, 1 = Bird)
-        obs_type = 0.0 if isinstance(nearest, Cactus) else 1.0
-        
-        # 3. Tốc độ game hiện tại (0-1)
-        speed_normalized = (game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN)
-        
-        # 4. Độ cao của dino so với mặt đất (0-1)
-        height_normalized = min((ground_y - dino.y) / 100, 1.0)
-        
-        # 5. Dino có đang nhảy không (0 hoặc 1)
-        is_jumping = 1.0 if dino.is_jumping else 0.0
-        
-        # 6. Dino có đang cúi không (0 hoặc 1)
-        is_ducking = 1.0 if dino.is_ducking else 0.0
-        
-        return [
-            dist_normalized,      # Khoảng cách đến obstacle
-            obs_type,             # Loại obstacle  
-            speed_normalized,     # Tốc độ game
-            height_normalized,    # Độ cao dino
-            is_jumping,           # Đang nhảy
-            is_ducking            # Đang cúi
-        ]
+        return extract(dino, obstacles, game_speed, COLLECTOR_V1, ground_y)
     
     def get_player_action(self, keys_pressed, dino):
         """
@@ -104,33 +72,11 @@ class DataCollector:
         source: "human" (người chơi) hoặc "ai" (AI)
         """
         inputs = self.get_inputs_from_game(dino, obstacles, game_speed, ground_y)
-        
-        sample = {
-            "inputs": inputs,
-            "outputs": {
-                "jump": action[0],
-                "duck": action[1]
-            },
-            "source": source,
-            "game_speed": game_speed,
-            "score": score,
-            # Raw values for database
-            "distance_to_obstacle": inputs[0],
-            "obstacle_type": inputs[1],
-            "game_speed_norm": inputs[2],
-            "dino_height": inputs[3],
-            "is_jumping": inputs[4],
-            "is_ducking": inputs[5],
-            "action_jump": action[0],
-            "action_duck": action[1],
-            "game_speed_raw": game_speed
-        }
-        
-        self.current_session_data.append(sample)
+        self.session.append(inputs, action[0], action[1], source_id(source), score, game_speed)
     
     def save_session_data(self):
-        """Lưu dữ liệu session hiện tại vào database và file"""
-        if not self.current_session_data:
+        """Lưu dữ liệu session hiện tại vào database và sample log"""
+        if not len(self.session):
             return 0
         
         total_saved = 0
@@ -138,47 +84,21 @@ class DataCollector:
         # Lưu vào database nếu được bật
         if self.use_database:
             try:
-                from src.database_handler import save_training_data
-                
-                # Chuyển đổi dữ liệu sang format cho database
-                db_data = []
-                for sample in self.current_session_data:
-                    db_data.append({
-                        "distance_to_obstacle": sample.get("distance_to_obstacle", 0),
-                        "obstacle_type": sample.get("obstacle_type", 0),
-                        "game_speed": sample.get("game_speed_norm", 0),
-                        "dino_height": sample.get("dino_height", 0),
-                        "is_jumping": sample.get("is_jumping", 0),
-                        "is_ducking": sample.get("is_ducking", 0),
-                        "action_jump": sample.get("action_jump", 0),
-                        "action_duck": sample.get("action_duck", 0),
-                        "source": sample.get("source", "human"),
-                        "game_speed_raw": sample.get("game_speed_raw", 0),
-                        "score": sample.get("score", 0),
-                        "quality_score": 1.0
-                    })
-                
-                total_saved = save_training_data(db_data)
+                from src.database_handler import save_training_data_bulk
+                total_saved = save_training_data_bulk(to_db_rows(self.session.columns()))
                 print(f"Đã lưu {total_saved} mẫu vào database")
             except Exception as e:
                 print(f"Lỗi khi lưu vào database: {e}")
         
-        # Vẫn lưu vào file JSON làm backup
-        all_data = self.load_data()
-        all_data.extend(self.current_session_data)
-        
-        try:
-            with open(get_data_file_path(), 'w', encoding='utf-8') as f:
-                json.dump(all_data, f, indent=2)
-        except Exception as e:
-            print(f"Lỗi khi lưu file: {e}")
+        # Vẫn lưu vào sample log làm backup (append, không đọc lại dữ liệu cũ)
+        append_samples(self.session.to_records(), self.log_path)
         
-        self.current_session_data = []
+        self.session.clear()
         return total_saved
     
     def load_data(self):
         """Load dữ liệu training từ file"""
-        path = get_data_file_path()
+        path = self.data_path
         try:
             if os.path.exists(path):
                 with open(path, 'r', encoding='utf-8') as f:
@@ -203,27 +123,26 @@ class DataCollector:
         except:
             pass
         
-        # Fallback: lấy từ file
+        # Fallback: lấy từ file JSON cũ + sample log
         data = self.load_data()
-        if not data:
-            return {"total": 0, "human": 0, "ai": 0, "source": "file"}
+        log_total, log_human, log_ai = count_samples(self.log_path)
         
         human_count = sum(1 for d in data if d.get("source") == "human")
         ai_count = sum(1 for d in data if d.get("source") == "ai")
         
         return {
-            "total": len(data),
-            "human": human_count,
-            "ai": ai_count,
+            "total": len(data) + log_total,
+            "human": human_count + log_human,
+            "ai": ai_count + log_ai,
             "source": "file"
         }
     
     def clear_data(self):
         """Xóa toàn bộ dữ liệu training"""
-        path = get_data_file_path()
         try:
-            if os.path.exists(path):
-                os.remove(path)
+            for path in (self.data_path, self.log_path):
+                if os.path.exists(path):
+                    os.remove(path)
             return True
         except Exception:
             return False
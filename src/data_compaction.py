@@ -0,0 +1,231 @@
+"""
+Data Compaction - Gộp dữ liệu training thành tập nhỏ có trọng số
+
+Phần lớn mẫu thu thập gần như trùng nhau (frame đứng yên [1.0, 0.5, 0.0, ...]
+LaneGame ghi mỗi 10 frame, đoạn fast_forward của datagen...). Compaction:
+
+1. Lượng tử hóa feature về lưới COMPACT_QUANT_LEVELS mức trên [0, 1].
+2. Gộp các mẫu cùng ô lưới, cùng nhãn (jump, duck) và nguồn thành 1 dòng:
+   feature = trung bình các mẫu, weight = số mẫu.
+3. Giữ tối đa COMPACT_RESERVOIR_PER_CLASS dòng cho mỗi (nguồn, action) bằng
+   priority sampling (reservoir có trọng số): priority = weight / u, giữ k dòng
+   priority lớn nhất, weight mới = max(weight, tau) với tau là priority thứ
+   k + 1. Tổng weight của nhóm được giữ (không chệch), action hiếm không bị
+   idle frame lấn át.
+
+Kết quả lưu ở training_data_compact.npz kèm watermark (như supervised_trainer);
+lần chạy sau chỉ đọc dữ liệu mới rồi gộp vào tập đã có.
+supervised_trainer train trên tập này với sample_weight = weight
+(python -m src.supervised_trainer --compact).
+
+Chạy:
+    python -m src.data_compaction                  # cập nhật tập compact
+    python -m src.data_compaction --rebuild        # gộp lại từ đầu
+    python -m src.data_compaction --compare        # train raw vs compact, so sánh accuracy/thời gian
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from config.settings import (
+    COMPACT_DATA_FILE, COMPACT_QUANT_LEVELS, COMPACT_RESERVOIR_PER_CLASS,
+)
+from src.sample_log import SOURCES
+
+N_FEATURES = 6  # collector_v1
+
+
+def get_compact_path():
+    return os.path.join(os.path.dirname(__file__), '..', COMPACT_DATA_FILE)
+
+
+class CompactDataset:
+    """Các dòng đã gộp: X (N, 6), y_jump, y_duck, source (chỉ số SOURCES), weight."""
+
+    def __init__(self, X, y_jump, y_duck, source, weight, watermark=None, raw_count=None):
+        self.X = np.asarray(X, dtype=np.float64).reshape(-1, N_FEATURES)
+        self.y_jump = np.asarray(y_jump, dtype=np.int64)
+        self.y_duck = np.asarray(y_duck, dtype=np.int64)
+        self.source = np.asarray(source, dtype=np.uint8)
+        self.weight = np.asarray(weight, dtype=np.float64)
+        self.watermark = watermark
+        # Số mẫu gốc đã gộp vào tập này
+        self.raw_count = int(self.weight.sum()) if raw_count is None else int(raw_count)
+
+    def __len__(self):
+        return len(self.X)
+
+    @classmethod
+    def from_raw(cls, X, y_jump, y_duck, source):
+        """Mẫu gốc, mỗi mẫu weight 1."""
+        return cls(X, y_jump, y_duck, source, np.ones(len(X)))
+
+    def concat(self, other):
+        return CompactDataset(np.concatenate([self.X, other.X]),
+                              np.concatenate([self.y_jump, other.y_jump]),
+                              np.concatenate([self.y_duck, other.y_duck]),
+                              np.concatenate([self.source, other.source]),
+                              np.concatenate([self.weight, other.weight]),
+                              other.watermark, self.raw_count + other.raw_count)
+
+    def save(self, path=None):
+        try:
+            np.savez_compressed(path or get_compact_path(), X=self.X, y_jump=self.y_jump,
+                                y_duck=self.y_duck, source=self.source, weight=self.weight,
+                                info=json.dumps({'watermark': self.watermark,
+                                                 'raw_count': self.raw_count}))
+            return True
+        except IOError as e:
+            print(f"Không lưu được dữ liệu compact: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path=None):
+        """Tập đã lưu, hoặc None."""
+        path = path or get_compact_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                info = json.loads(str(data['info']))
+                return cls(data['X'], data['y_jump'], data['y_duck'], data['source'],
+                           data['weight'], info.get('watermark'), info.get('raw_count'))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Không load được dữ liệu compact {path}: {e}")
+            return None
+
+
+def dedup(data, levels=COMPACT_QUANT_LEVELS):
+    """Gộp các dòng cùng ô lưới + nhãn + nguồn (feature trung bình theo weight, weight cộng dồn)."""
+    if not len(data):
+        return data
+    cells = np.rint(np.clip(data.X, 0.0, 1.0) * levels).astype(np.int64)
+    keys = np.column_stack([cells, data.y_jump, data.y_duck, data.source])
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    weight = np.bincount(inverse, weights=data.weight)
+    X = np.column_stack([np.bincount(inverse, weights=data.X[:, j] * data.weight)
+                         for j in range(N_FEATURES)]) / weight[:, None]
+    return CompactDataset(X, data.y_jump[first], data.y_duck[first], data.source[first],
+                          weight, data.watermark, data.raw_count)
+
+
+def priority_sample(weight, k, rng):
+    """Priority sampling: (chỉ số giữ lại, weight mới) của k trong các dòng có weight."""
+    if len(weight) <= k:
+        return np.arange(len(weight)), weight
+    priority = weight / (1.0 - rng.random(len(weight)))
+    order = np.argpartition(-priority, k)
+    keep, tau = order[:k], priority[order[k]]
+    return keep, np.maximum(weight[keep], tau)
+
+
+def reservoir(data, per_class=COMPACT_RESERVOIR_PER_CLASS, seed=0):
+    """Giữ tối đa per_class dòng cho mỗi (nguồn, action)."""
+    rng = np.random.default_rng(seed)
+    action = data.y_jump + 2 * data.y_duck
+    parts, weights = [], []
+    for src in np.unique(data.source):
+        for act in np.unique(action[data.source == src]):
+            idx = np.flatnonzero((data.source == src) & (action == act))
+            keep, weight = priority_sample(data.weight[idx], per_class, rng)
+            parts.append(idx[keep])
+            weights.append(weight)
+    if not parts:
+        return data
+    idx = np.concatenate(parts)
+    return CompactDataset(data.X[idx], data.y_jump[idx], data.y_duck[idx], data.source[idx],
+                          np.concatenate(weights), data.watermark, data.raw_count)
+
+
+def compact_arrays(X, y_jump, y_duck, source, levels=COMPACT_QUANT_LEVELS,
+                   per_class=COMPACT_RESERVOIR_PER_CLASS, seed=0):
+    """Dedup + reservoir cho mảng mẫu gốc."""
+    return reservoir(dedup(CompactDataset.from_raw(X, y_jump, y_duck, source), levels),
+                     per_class, seed)
+
+
+def compact(rebuild=False, path=None, seed=0):
+    """Gộp dữ liệu mới (sau watermark của tập compact) vào tập đã lưu.
+    Trả về CompactDataset, hoặc None nếu chưa có dữ liệu."""
+    from src.supervised_trainer import load_training_samples_since
+    path = path or get_compact_path()
+    current = None if rebuild else CompactDataset.load(path)
+    watermark = current.watermark if current is not None else None
+    X, y_jump, y_duck, source, new_watermark = load_training_samples_since(watermark)
+    if X is None or not len(X):
+        return current
+    start = time.perf_counter()
+    new = CompactDataset.from_raw(X, y_jump, y_duck, source)
+    new.watermark = new_watermark
+    merged = new if current is None else current.concat(new)
+    result = reservoir(dedup(merged), seed=seed)
+    result.save(path)
+    print(f"Compact: +{len(X)} mẫu mới -> {len(result)} dòng cho {result.raw_count} mẫu gốc "
+          f"(x{result.raw_count / max(len(result), 1):.1f}) trong {time.perf_counter() - start:.2f}s")
+    return result
+
+
+def summarize(data):
+    """In số dòng / tổng weight theo (nguồn, action)."""
+    action = data.y_jump + 2 * data.y_duck
+    for src in np.unique(data.source):
+        for act, name in enumerate(('none', 'jump', 'duck')):
+            mask = (data.source == src) & (action == act)
+            if mask.any():
+                print(f"  {SOURCES[src]:5} {name:4}: {mask.sum():6} dòng, "
+                      f"weight {data.weight[mask].sum():.0f}")
+
+
+def compare(test_size=0.2, seed=0):
+    """Train jump/duck model trên dữ liệu gốc và trên bản compact của cùng phần train,
+    đánh giá trên cùng phần test gốc."""
+    from sklearn.model_selection import train_test_split
+    from src.supervised_trainer import load_training_samples_since, fit_model, COMPACT_MLP_PARAMS
+    X, y_jump, y_duck, source, _ = load_training_samples_since(None)
+    if X is None or len(X) < 10:
+        print("Không đủ dữ liệu để so sánh")
+        return None
+    idx_train, idx_test = train_test_split(np.arange(len(X)), test_size=test_size,
+                                           random_state=seed)
+    start = time.perf_counter()
+    small = compact_arrays(X[idx_train], y_jump[idx_train], y_duck[idx_train],
+                           source[idx_train], seed=seed)
+    compact_s = time.perf_counter() - start
+    print(f"Train: {len(idx_train)} mẫu gốc -> {len(small)} dòng compact ({compact_s:.2f}s)")
+    results = {}
+    for name, y in (('jump', y_jump), ('duck', y_duck)):
+        for variant, (Xt, yt, w, params) in (
+                ('raw', (X[idx_train], y[idx_train], None, None)),
+                ('compact', (small.X, getattr(small, 'y_' + name), small.weight,
+                             COMPACT_MLP_PARAMS))):
+            start = time.perf_counter()
+            model, scaler = fit_model(Xt, yt, params, w)
+            seconds = time.perf_counter() - start
+            acc = model.score(scaler.transform(X[idx_test]), y[idx_test])
+            results[(name, variant)] = (acc, seconds)
+            print(f"{name:4} {variant:7}: test {acc:.4f}, train {seconds:.1f}s")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gộp dữ liệu training thành tập có trọng số")
+    parser.add_argument('--rebuild', action='store_true', help="Gộp lại toàn bộ dữ liệu")
+    parser.add_argument('--compare', action='store_true',
+                        help="So sánh model train trên dữ liệu gốc và dữ liệu compact")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare()
+        return
+    data = compact(rebuild=args.rebuild)
+    if data is None:
+        print("Chưa có dữ liệu training")
+        return
+    summarize(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 """
 Database Handler - Ket noi va thao tac voi Neon.tech PostgreSQL
 """
+import csv
+import io
+import json
 import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
@@ -126,6 +129,33 @@ def save_training_data(data_list):
     conn.close()
     return count
 
+def save_training_data_bulk(rows):
+    """rows: iterable tuple theo thứ tự cột dưới đây. Ghi tất cả bằng 1 lệnh COPY, 1 transaction."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    if not count:
+        return 0
+    buf.seek(0)
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.copy_expert("""
+            COPY training_data
+            (distance_to_obstacle, obstacle_type, game_speed, dino_height,
+             is_jumping, is_ducking, action_jump, action_duck, source,
+             game_speed_raw, score, quality_score)
+            FROM STDIN WITH (FORMAT csv)
+        """, buf)
+        conn.commit()
+        return count
+    finally:
+        cursor.close()
+        conn.close()
+
 def get_training_data_count(source=None):
     conn = get_connection()
     cursor = conn.cursor()
@@ -183,6 +213,34 @@ def set_setting(key, value):
     cursor.close()
     conn.close()
 
+def save_ai_genome(genome_name, fitness_score, generation, genome_data, config=None,
+                   is_active=False, description=None):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ai_genomes (
+            id SERIAL PRIMARY KEY,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            genome_name VARCHAR(100) NOT NULL,
+            fitness_score FLOAT NOT NULL,
+            generation INTEGER,
+            genome_data JSONB,
+            config JSONB,
+            is_active BOOLEAN DEFAULT FALSE,
+            description TEXT
+        )
+    """)
+    if is_active:
+        cursor.execute("UPDATE ai_genomes SET is_active = FALSE WHERE is_active")
+    cursor.execute("""
+        INSERT INTO ai_genomes (genome_name, fitness_score, generation, genome_data, config, is_active, description)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, (genome_name, fitness_score, generation, json.dumps(genome_data),
+          json.dumps(config) if config is not None else None, is_active, description))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
 def test_connection():
     try:
         conn = get_connection()
@@ -0,0 +1,147 @@
+"""
+Datagen - Sinh hàng loạt mẫu training "ai" từ genome NEAT đã lưu, headless
+
+Mỗi worker process (ProcessPoolExecutor) load network champion 1 lần rồi chạy
+các episode DinoEnv với seed = seed + số thứ tự episode. Mỗi frame được ghi
+thành mẫu với xác suất sample_rate: features collector_v1 mà AI thấy trước khi
+hành động, nhãn (jump, duck) như LaneGame._collect_data (đang nhảy thì không cúi).
+Frame "chết" được gộp bằng DinoEnv.fast_forward; số mẫu trong đoạn đó lấy theo
+phân phối nhị thức (các frame có cùng features và nhãn).
+
+Worker trả về mảng SAMPLE_DTYPE cho mỗi nhóm DATAGEN_CHUNK_EPISODES episode;
+process chính ghi thẳng vào sample log nhị phân (src/sample_log.py) hoặc bảng
+training_data (1 lệnh COPY mỗi nhóm) và in throughput.
+
+Chạy:
+    python -m src.datagen --episodes 2000 --workers 8                 # ghi vào training_data.bin
+    python -m src.datagen --episodes 500 --sample-rate 0.05 --sink db  # ghi vào database
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config.settings import DATAGEN_SAMPLE_RATE, DATAGEN_CHUNK_EPISODES, NEAT_SCHEMA
+from src.sample_log import SAMPLE_DTYPE, append_samples, source_id, to_db_rows
+
+SINKS = ('log', 'db')
+
+# Network của worker process và schema input của nó (load 1 lần trong initializer)
+_worker_net = None
+_worker_schema = None
+
+
+def _init_worker():
+    global _worker_net, _worker_schema
+    from src.ai_handler import load_network
+    _worker_net, _worker_schema = load_network()
+
+
+def run_episode(net, seed, sample_rate, max_steps, rows, schema=None):
+    """Chạy 1 episode, thêm mẫu vào rows (list tuple SAMPLE_DTYPE). Trả về số frame.
+    schema: schema input của net (None = NEAT_SCHEMA)."""
+    from src.dino_env import DinoEnv, ACTION_JUMP, ACTION_DUCK, action_from_output
+    from src.features import extract, COLLECTOR_V1
+    ai = source_id('ai')
+    rng = np.random.default_rng(seed)
+    env = DinoEnv(seed=seed, max_steps=max_steps, auto_reset=False, schema=schema or NEAT_SCHEMA)
+    inputs = env.observe()
+    done = False
+    while not done:
+        action = action_from_output(net.activate(inputs))
+        duck = 1 if action & ACTION_DUCK else 0
+        score, speed = env.score, env.game_speed
+        idle = env.dino.is_idle() and not action & ACTION_JUMP
+        # Features trước frame (fast_forward chỉ chạy khi chúng không đổi suốt đoạn gộp)
+        features = extract(env.dino, env.obstacles, speed, COLLECTOR_V1) if idle else None
+        skipped = env.fast_forward(action)
+        if skipped:
+            # Dino đứng trên ground suốt đoạn này, không nhảy
+            count = rng.binomial(skipped, sample_rate)
+            if count:
+                rows.extend([(features, 0, duck, ai, score, speed)] * count)
+            inputs = env.observe()
+            done = env.steps >= env.max_steps
+            continue
+        if rng.random() >= sample_rate:
+            inputs, _, done, _ = env.step(action)
+            continue
+        if features is None:
+            features = extract(env.dino, env.obstacles, speed, COLLECTOR_V1)
+        inputs, _, done, _ = env.step(action)
+        jump = 1 if action & ACTION_JUMP else 0
+        rows.append((features, jump, 1 if duck and not env.dino.is_jumping else 0, ai, score, speed))
+    return env.steps
+
+
+def _run_chunk(first_seed, episodes, sample_rate, max_steps):
+    """Task của worker: (mảng mẫu, số frame đã mô phỏng)."""
+    rows, frames = [], 0
+    for seed in range(first_seed, first_seed + episodes):
+        frames += run_episode(_worker_net, seed, sample_rate, max_steps, rows, _worker_schema)
+    return np.array(rows, dtype=SAMPLE_DTYPE), frames
+
+
+def _write(records, sink):
+    """Ghi 1 nhóm mẫu; database lỗi thì ghi vào sample log để không mất dữ liệu."""
+    if sink == 'db':
+        try:
+            from src.database_handler import save_training_data_bulk
+            return save_training_data_bulk(to_db_rows(records))
+        except Exception as e:
+            print(f"Lỗi khi ghi database, chuyển sang sample log: {e}")
+    return append_samples(records)
+
+
+def generate(episodes, seed=0, sample_rate=DATAGEN_SAMPLE_RATE, workers=None, sink='log',
+             max_steps=None, chunk=DATAGEN_CHUNK_EPISODES):
+    """Sinh mẫu từ episodes episode trên process pool. Trả về dict thống kê, None nếu chưa có AI."""
+    from src.ai_handler import load_network
+    from src.dino_env import MAX_STEPS
+    if sink not in SINKS:
+        raise ValueError(f"sink phải là một trong {SINKS}")
+    if load_network()[0] is None:
+        print("Chưa có AI đã train (best_genome.pkl / genome registry)")
+        return None
+    max_steps = max_steps or MAX_STEPS
+    workers = workers or os.cpu_count()
+    tasks = [(seed + i, min(chunk, episodes - i)) for i in range(0, episodes, chunk)]
+    print(f"Sinh dữ liệu: {episodes} episode, sample rate {sample_rate}, "
+          f"{workers} worker, ghi vào {sink}")
+
+    stats = {'episodes': 0, 'frames': 0, 'samples': 0, 'written': 0}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_chunk, s, n, sample_rate, max_steps): n for s, n in tasks}
+        for future in as_completed(futures):
+            records, frames = future.result()
+            stats['episodes'] += futures[future]
+            stats['frames'] += frames
+            stats['samples'] += len(records)
+            stats['written'] += _write(records, sink)
+            elapsed = time.perf_counter() - start
+            print(f"  {stats['episodes']}/{episodes} episode | {stats['samples']} mẫu | "
+                  f"{stats['samples'] / elapsed:.0f} mẫu/s | {stats['frames'] / elapsed:.0f} frame/s")
+    stats['seconds'] = time.perf_counter() - start
+    print(f"Xong: ghi {stats['written']} mẫu trong {stats['seconds']:.1f}s")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sinh mẫu training AI headless")
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help="Seed của episode đầu tiên")
+    parser.add_argument('--sample-rate', type=float, default=DATAGEN_SAMPLE_RATE,
+                        help="Xác suất ghi mỗi frame thành mẫu")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sink', choices=SINKS, default='log',
+                        help="log: training_data.bin, db: bảng training_data")
+    parser.add_argument('--max-steps', type=int, default=None, help="Số frame tối đa mỗi episode")
+    args = parser.parse_args(argv)
+    generate(args.episodes, args.seed, args.sample_rate, args.workers, args.sink, args.max_steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -55,8 +55,11 @@ class Dino:
         self._cur_anim: str = "move"
         # Cache rect để tránh tạo mới mỗi frame
         self._cached_rect: Optional[pygame.Rect] = None
+        self._rect_key = None
         # Ground y cho lane game
         self.ground_y: int = GROUND_Y
+        # Tắt âm thanh khi chạy headless (DinoEnv, training)
+        self.silent: bool = False
 
         # Smooth physics
         self._coyote_timer: int = 0        # Đếm thời gian sau khi rời ground
@@ -97,7 +100,8 @@ class Dino:
             self._jump_held = True
             self.anim_frame = 0
             self.anim_timer = 0
-            play_sound("jump")
+            if not self.silent:
+                play_sound("jump")
 
             # Squash effect khi nhảy - tắt để không bị méo
             self._scale_x = 1.0
@@ -140,13 +144,15 @@ class Dino:
         self._scale_x += (1.0 - self._scale_x) * self._scale_lerp_speed
         self._scale_y += (1.0 - self._scale_y) * self._scale_lerp_speed
 
+    def current_gravity(self, jump_held=False):
+        """Gravity của frame tới: nhẹ hơn khi giữ phím (variable jump height)."""
+        return JUMP_HOLD_GRAVITY if jump_held or self._jump_held else GRAVITY
+
     def update(self, jump_held=False):
         was_on_ground = self.is_on_ground
 
         if self.is_jumping:
-            # Sử dụng gravity nhẹ hơn khi giữ phím (variable jump height)
-            current_gravity = JUMP_HOLD_GRAVITY if jump_held or self._jump_held else GRAVITY
-            self.vel_y += current_gravity
+            self.vel_y += self.current_gravity(jump_held)
             self.y += self.vel_y
 
             # Tính toán ground level cho dino hiện tại
@@ -203,11 +209,31 @@ class Dino:
                 self.anim_timer = 0
                 self.anim_frame = (self.anim_frame + 1) % _ANIM_FRAMES.get(anim, 1)
 
+    def is_idle(self):
+        """Đứng yên trên ground: update() khi đó chỉ tăng bộ đếm animation / coyote."""
+        return (self.is_on_ground and not self.is_jumping and self._jump_buffer_timer == 0
+                and self.y == self.ground_y - self.height
+                and self._last_x == self.x and self._last_y == self.y
+                and self._scale_x == 1.0 and self._scale_y == 1.0
+                and self._cur_anim == self._anim_name())
+
+    def advance_idle(self, n):
+        """Tương đương gọi update() n lần khi is_idle() (dùng cho fast-forward)."""
+        self._coyote_timer = max(self._coyote_timer - n, 0)
+        speed = _ANIM_SPEED.get(self._cur_anim, 8)
+        t = self.anim_timer + n
+        self.anim_frame = (self.anim_frame + t // speed) % _ANIM_FRAMES.get(self._cur_anim, 1)
+        self.anim_timer = t % speed
+
     def get_rect(self):
-        h = self.height
-        if self.is_ducking:
-            h = int(self.height * DUCK_HEIGHT_RATIO)
-        self._cached_rect = pygame.Rect(self.x, self.y + (self.height - h), self.width, h)
+        # Chỉ tạo Rect mới khi vị trí hoặc trạng thái cúi thay đổi
+        key = (self.x, self.y, self.is_ducking)
+        if self._cached_rect is None or key != self._rect_key:
+            h = self.height
+            if self.is_ducking:
+                h = int(self.height * DUCK_HEIGHT_RATIO)
+            self._cached_rect = pygame.Rect(self.x, self.y + (self.height - h), self.width, h)
+            self._rect_key = key
         return self._cached_rect
 
     def draw(self, screen):
@@ -0,0 +1,433 @@
+"""
+Dino Env - Môi trường kiểu Gym cho DinoRacer, chạy headless (không cần display)
+
+DinoEnv    : 1 môi trường, dùng đúng class Dino / Obstacle của game.
+VecDinoEnv : N môi trường chạy song song bằng numpy (struct-of-arrays),
+             cho kết quả giống hệt N DinoEnv cùng seed.
+
+Action là bitmask: bit 0 = nhảy, bit 1 = cúi (0 = không làm gì).
+step() trả về (obs, reward, done, info); reward = số obstacle vừa vượt qua.
+Khi done, môi trường tự reset (auto-reset) và obs trả về là của episode mới;
+thông tin episode vừa kết thúc nằm trong info.
+
+DinoEnv.fast_forward(action) chạy gộp các frame "chết" (dino đứng trên
+ground, obstacle còn ngoài tầm feature) với kết quả giống hệt step() từng frame.
+
+DinoEnv(frame_skip=k): mỗi step() giữ action trong k frame (policy chạy ở
+60/k Hz). Va chạm dùng swept AABB (src/collision.py) làm broadphase nên kết quả
+giống hệt gọi step() k lần với cùng action ở 60 Hz, kể cả frame va chạm.
+
+DinoEnv(course=...): spawn theo course tính sẵn (src/shared_course.py) thay vì
+roll rng, giống hệt DinoEnv(seed) của course đó.
+
+Ví dụ:
+    env = VecDinoEnv(256, seed=0)
+    obs = env.reset()
+    obs, rewards, dones, info = env.step(actions)
+"""
+import math
+import random
+
+import numpy as np
+
+from config.settings import (
+    SCREEN_WIDTH, GROUND_Y, DINO_X, DINO_WIDTH, DINO_HEIGHT,
+    JUMP_VELOCITY, JUMP_HOLD_GRAVITY, DUCK_HEIGHT_RATIO,
+    CACTUS_WIDTH, CACTUS_HEIGHT_SMALL, CACTUS_HEIGHT_LARGE, BIRD_WIDTH, BIRD_HEIGHT,
+    INITIAL_SCORE, SPEED_INCREASE_INTERVAL, SPEED_INCREASE_AMOUNT,
+    MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX,
+)
+from src.obstacle import ObstacleQueue, roll_obstacle, BIRD_HEIGHTS
+from src.collision import (
+    DINO_MARGIN, OBSTACLE_MARGIN, find_collision, dino_arc, arc_lands_within, sweep_intervals,
+)
+from src.features import extract, extract_batch, feature_size, NEAT_V1, DIST_SCALE
+
+ACTION_NONE = 0
+ACTION_JUMP = 1
+ACTION_DUCK = 2
+NUM_ACTIONS = 4
+
+OBS_SIZE = feature_size(NEAT_V1)
+MAX_STEPS = 5000
+# Số obstacle tối đa cùng lúc trên màn hình của 1 env (spawn cách nhau >= 350px)
+MAX_OBSTACLES = 8
+# frame_skip tối đa: obstacle mới spawn (x = _SPAWN_X) không thể tới dino trong 1 step
+MAX_FRAME_SKIP = 8
+
+# Margin thu nhỏ hitbox (giá trị truyền vào Rect.inflate, dạng dương)
+GAME_MARGINS = (DINO_MARGIN, OBSTACLE_MARGIN)             # GameManager / các mode
+NEAT_MARGINS = (4, 4)                                     # eval_genome
+
+_SPAWN_X = SCREEN_WIDTH + 50
+_DINO_GROUND = GROUND_Y - DINO_HEIGHT
+_DUCK_HEIGHT = int(DINO_HEIGHT * DUCK_HEIGHT_RATIO)
+
+
+def game_speed_for(score):
+    """Tốc độ game theo điểm (giống GameManager / eval_genome)."""
+    return min(OBSTACLE_SPEED_MIN + (score // SPEED_INCREASE_INTERVAL) * SPEED_INCREASE_AMOUNT,
+               OBSTACLE_SPEED_MAX)
+
+
+def compute_fitness(score, game_speed):
+    """Fitness NEAT: thưởng nhiều hơn khi sống lâu ở tốc độ cao."""
+    speed_bonus = (game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN)
+    return score * 10 * (1 + speed_bonus)
+
+
+def action_from_output(output):
+    """Chuyển output (jump, duck, nothing) của network sang action bitmask."""
+    return (ACTION_JUMP if output[0] > 0.5 else 0) | (ACTION_DUCK if output[1] > 0.5 else 0)
+
+
+# Các hàm đếm frame tới sự kiện tiếp theo. x của obstacle sau n lần update() là
+# x0 - n * speed (Obstacle.update), đơn điệu theo n, nên ước lượng n dạng đóng
+# rồi chỉnh 1-2 bước bằng đúng phép toán float của update()/extract()/step():
+# kết quả khớp từng bit với step() từng frame.
+
+def _frames_until(obs, threshold, done):
+    """Số lần update() nữa tới khi done(x) đúng (done(x) ~ x < threshold)."""
+    x0, speed, start = obs.x0, obs.speed, obs.frames
+    n = max(math.ceil((x0 - threshold) / speed), start)
+    while n > start and done(x0 - (n - 1) * speed):
+        n -= 1
+    while not done(x0 - n * speed):
+        n += 1
+    return n - start
+
+
+def _frames_until_in_range(obs, dino_x):
+    """Số lần update() tới khi obstacle vào tầm feature (dist < 1.0)."""
+    return _frames_until(obs, dino_x + DIST_SCALE, lambda x: (x - dino_x) / DIST_SCALE < 1.0)
+
+
+def _frames_until_spawn(last):
+    """Số frame trước frame sẽ spawn obstacle mới (điều kiện spawn trong step())."""
+    return _frames_until(last, SCREEN_WIDTH - MIN_OBSTACLE_SPAWN_DISTANCE,
+                         lambda x: x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE)
+
+
+def _frames_until_offscreen(obs):
+    """Số lần update() tới khi obstacle ra khỏi màn hình (bị retire)."""
+    return _frames_until(obs, -100, lambda x: x < -100)
+
+
+class DinoEnv:
+    """Một môi trường DinoRacer headless, luật giống eval_genome / GameManager."""
+
+    def __init__(self, seed=None, margins=GAME_MARGINS, max_steps=MAX_STEPS, auto_reset=True,
+                 schema=NEAT_V1, frame_skip=1, course=None):
+        if not 1 <= frame_skip <= MAX_FRAME_SKIP:
+            raise ValueError(f"frame_skip phải trong [1, {MAX_FRAME_SKIP}]")
+        self.schema = schema
+        self.frame_skip = frame_skip
+        self.rng = random.Random(seed)
+        self.course = course
+        self.dino_margin, self.obstacle_margin = margins
+        self.max_steps = max_steps
+        self.auto_reset = auto_reset
+        self.reset()
+
+    def reset(self, seed=None):
+        from src.dino import Dino
+        if seed is not None:
+            self.rng.seed(seed)
+        self.dino = Dino()
+        self.dino.silent = True
+        self.obstacles = ObstacleQueue()
+        self.score = INITIAL_SCORE
+        self.game_speed = OBSTACLE_SPEED_MIN
+        self.steps = 0
+        self._course_index = 0
+        return self.observe()
+
+    def _next_kind(self):
+        """(is_bird, variant) của obstacle kế tiếp trong course; hết course thì roll rng."""
+        i = self._course_index
+        if i >= len(self.course):
+            return None
+        self._course_index = i + 1
+        row = self.course[i]
+        return bool(row['is_bird']), int(row['variant'])
+
+    def observe(self):
+        return extract(self.dino, self.obstacles, self.game_speed, self.schema)
+
+    def fitness(self):
+        return compute_fitness(self.score, self.game_speed)
+
+    def _collided(self):
+        return find_collision(self.dino, self.obstacles, self.dino_margin, self.obstacle_margin) is not None
+
+    def fast_forward(self, action):
+        """Chạy gộp các frame liên tiếp có cùng observation với action này.
+
+        Điều kiện: dino đứng yên trên ground, action không nhảy và không đổi
+        trạng thái cúi, mọi obstacle phía trước còn ngoài tầm feature. Khi đó
+        observation (và action của network) không đổi cho tới sự kiện kế tiếp:
+        obstacle vào tầm, spawn obstacle mới, obstacle bị retire hoặc hết
+        max_steps. Không có va chạm và điểm không đổi trong khoảng này.
+
+        Trả về số frame đã chạy (0 = phải gọi step()). Không tự reset:
+        caller kiểm tra steps >= max_steps.
+        """
+        dino = self.dino
+        if action & ACTION_JUMP or dino.is_ducking != bool(action & ACTION_DUCK) or not dino.is_idle():
+            return 0
+
+        obstacles = self.obstacles
+        frames = self.max_steps - self.steps
+        ahead_speed = None
+        for obs in obstacles:
+            if obs.x <= dino.x:
+                if not obs.passed:
+                    return 0
+                frames = min(frames, _frames_until_offscreen(obs))
+                continue
+            if (obs.x - dino.x) / DIST_SCALE < 1.0:
+                return 0
+            # Obstacle phía trước khác tốc độ có thể vượt nhau (đổi type1)
+            if ahead_speed is None:
+                ahead_speed = obs.speed
+            elif obs.speed != ahead_speed:
+                return 0
+            frames = min(frames, _frames_until_in_range(obs, dino.x))
+
+        # Frame spawn dùng rng -> để step() chạy
+        if obstacles:
+            frames = min(frames, _frames_until_spawn(obstacles[-1]))
+        elif obstacles.last_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
+            return 0
+        if frames <= 0:
+            return 0
+
+        dino.set_duck(bool(action & ACTION_DUCK))
+        dino.advance_idle(frames)
+        for obs in obstacles:
+            obs.advance(frames)
+        # Retire chỉ có thể xảy ra ở frame cuối (frames bị chặn tại đó)
+        obstacles.retire_offscreen()
+        self.steps += frames
+        return frames
+
+    def _advance(self, action):
+        """1 frame mô phỏng (chưa kiểm tra va chạm)."""
+        dino = self.dino
+        if action & ACTION_JUMP:
+            dino.jump()
+        dino.set_duck(bool(action & ACTION_DUCK))
+        dino.update(jump_held=False)
+
+        if self.obstacles.last_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
+            kind = self._next_kind() if self.course is not None else None
+            self.obstacles.spawn(_SPAWN_X, min(self.game_speed, OBSTACLE_SPEED_MAX), self.rng, kind)
+
+        for obs in self.obstacles:
+            obs.update()
+            if obs.x < dino.x and not obs.passed:
+                obs.passed = True
+                self.score += 1
+
+        self.obstacles.retire_offscreen()
+        self.game_speed = game_speed_for(self.score)
+        self.steps += 1
+
+    def _sweep_frames(self, action, frames):
+        """Các frame con (1..frames) có thể va chạm theo swept AABB.
+
+        Gọi sau dino.jump() của frame con đầu tiên. Cung nhảy chỉ đoán trước
+        được khi dino không nhảy lại giữa chừng; nếu không chỉ dùng trục x.
+        """
+        dino = self.dino
+        arc = dino_arc(dino)
+        if action & ACTION_JUMP:
+            # Chưa nhảy được (vd đang cúi) hoặc sẽ chạm đất rồi nhảy lại
+            vertical = dino.is_jumping and not arc_lands_within(arc, frames)
+        else:
+            vertical = True
+        check = set()
+        for obs in self.obstacles:
+            for t0, t1 in sweep_intervals(dino, obs, frames, arc, self.dino_margin,
+                                          self.obstacle_margin, vertical=vertical):
+                check.update(range(max(1, math.floor(t0)), min(frames, math.ceil(t1)) + 1))
+        return check
+
+    def step(self, action):
+        prev_score = self.score
+        if self.frame_skip == 1:
+            self._advance(action)
+            collided = self._collided()
+        else:
+            frames = min(self.frame_skip, self.max_steps - self.steps)
+            if action & ACTION_JUMP:
+                # jump() lần 2 trong _advance() của frame con đầu là no-op
+                self.dino.jump()
+            check = self._sweep_frames(action, frames)
+            collided = False
+            for sub in range(1, frames + 1):
+                self._advance(action)
+                if sub in check and self._collided():
+                    collided = True
+                    break
+        done = collided or self.steps >= self.max_steps
+        reward = self.score - prev_score
+        info = {'score': self.score, 'game_speed': self.game_speed,
+                'fitness': self.fitness(), 'steps': self.steps, 'collided': collided}
+        if done and self.auto_reset:
+            return self.reset(), reward, done, info
+        return self.observe(), reward, done, info
+
+
+class VecDinoEnv:
+    """N môi trường DinoRacer chạy song song bằng numpy.
+
+    Env i dùng random.Random(seed + i) để sinh obstacle, nên kết quả giống hệt
+    DinoEnv(seed + i). Spawn obstacle hiếm (khoảng 1 lần / 50 frame) nên vẫn
+    dùng random.Random cho từng env; phần vật lý, điểm, va chạm và observation
+    đều vector hoá.
+    """
+
+    def __init__(self, num_envs, seed=None, margins=GAME_MARGINS, max_steps=MAX_STEPS,
+                 schema=NEAT_V1):
+        self.num_envs = num_envs
+        self.schema = schema
+        self.dino_margin, self.obstacle_margin = margins
+        self.max_steps = max_steps
+        n, k = num_envs, MAX_OBSTACLES
+
+        self.dino_y = np.zeros(n)
+        self.vel_y = np.zeros(n)
+        self.jumping = np.zeros(n, dtype=bool)
+        self.ducking = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.game_speed = np.zeros(n)
+        self.last_obstacle_x = np.zeros(n)
+        self.steps = np.zeros(n, dtype=np.int64)
+
+        self.obs_x = np.zeros((n, k))
+        # x = obs_x0 - obs_frames * speed, giống Obstacle.update()
+        self.obs_x0 = np.zeros((n, k))
+        self.obs_frames = np.zeros((n, k), dtype=np.int64)
+        self.obs_y = np.zeros((n, k))
+        self.obs_w = np.zeros((n, k))
+        self.obs_h = np.zeros((n, k))
+        self.obs_speed = np.zeros((n, k))
+        self.obs_bird = np.zeros((n, k), dtype=bool)
+        self.obs_passed = np.zeros((n, k), dtype=bool)
+        self.obs_active = np.zeros((n, k), dtype=bool)
+
+        self.rngs = [random.Random() for _ in range(n)]
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            for i, rng in enumerate(self.rngs):
+                rng.seed(seed + i)
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def _reset_envs(self, mask):
+        self.dino_y[mask] = _DINO_GROUND
+        self.vel_y[mask] = 0
+        self.jumping[mask] = False
+        self.ducking[mask] = False
+        self.score[mask] = INITIAL_SCORE
+        self.game_speed[mask] = OBSTACLE_SPEED_MIN
+        self.last_obstacle_x[mask] = 0
+        self.steps[mask] = 0
+        self.obs_active[mask] = False
+
+    def _spawn(self, i):
+        """Spawn obstacle cho env i - cùng cách chọn (roll_obstacle) như ObstacleQueue.spawn."""
+        slot = int(np.argmin(self.obs_active[i]))
+        if self.obs_active[i, slot]:
+            raise RuntimeError("VecDinoEnv: vượt quá MAX_OBSTACLES")
+        is_bird, variant = roll_obstacle(self.rngs[i])
+        if is_bird:
+            self.obs_w[i, slot], self.obs_h[i, slot] = BIRD_WIDTH, BIRD_HEIGHT
+            self.obs_y[i, slot] = BIRD_HEIGHTS[variant]
+        else:
+            h = CACTUS_HEIGHT_LARGE if variant else CACTUS_HEIGHT_SMALL
+            self.obs_w[i, slot], self.obs_h[i, slot] = CACTUS_WIDTH, h
+            self.obs_y[i, slot] = GROUND_Y - h
+        self.obs_bird[i, slot] = is_bird
+        self.obs_x[i, slot] = self.obs_x0[i, slot] = _SPAWN_X
+        self.obs_frames[i, slot] = 0
+        self.obs_speed[i, slot] = min(self.game_speed[i], OBSTACLE_SPEED_MAX)
+        self.obs_passed[i, slot] = False
+        self.obs_active[i, slot] = True
+        self.last_obstacle_x[i] = _SPAWN_X
+
+    def observe(self):
+        """Observation (N, feature_size(schema)) giống DinoEnv.observe()."""
+        return extract_batch(DINO_X, self.dino_y, self.jumping, self.ducking, self.game_speed,
+                             self.obs_x, self.obs_y, self.obs_bird, self.obs_active, self.schema,
+                             vel_y=self.vel_y, obs_w=self.obs_w, obs_h=self.obs_h,
+                             obs_speed=self.obs_speed)
+
+    def fitness(self):
+        return compute_fitness(self.score, self.game_speed)
+
+    def _collided(self):
+        dm, om = self.dino_margin, self.obstacle_margin
+        # Rect của dino (pygame.Rect cắt phần thập phân về 0)
+        h = np.where(self.ducking, _DUCK_HEIGHT, DINO_HEIGHT)
+        top = np.trunc(self.dino_y + (DINO_HEIGHT - h)) + dm // 2
+        bottom = top + h - dm
+        left = DINO_X + dm // 2
+        right = left + DINO_WIDTH - dm
+
+        ox = np.trunc(self.obs_x) + om // 2
+        oy = self.obs_y + om // 2
+        hit = (self.obs_active
+               & (left < ox + self.obs_w - om) & (ox < right)
+               & (top[:, None] < oy + self.obs_h - om) & (oy < bottom[:, None]))
+        return hit.any(axis=1)
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+
+        # Dino: jump() chỉ khi đang trên ground và không cúi, set_duck() khi không nhảy
+        jump = ((actions & ACTION_JUMP) != 0) & ~self.jumping & ~self.ducking
+        self.vel_y[jump] = JUMP_VELOCITY
+        self.jumping |= jump
+        self.ducking = np.where(self.jumping, self.ducking, (actions & ACTION_DUCK) != 0)
+
+        # AI không bao giờ thả phím nhảy nên luôn dùng JUMP_HOLD_GRAVITY
+        j = self.jumping
+        self.vel_y[j] += JUMP_HOLD_GRAVITY
+        self.dino_y[j] += self.vel_y[j]
+        landed = j & (self.dino_y >= _DINO_GROUND)
+        self.dino_y[landed] = _DINO_GROUND
+        self.vel_y[landed] = 0
+        self.jumping[landed] = False
+
+        for i in np.flatnonzero(self.last_obstacle_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE):
+            self._spawn(i)
+
+        prev_score = self.score.copy()
+        active = self.obs_active
+        self.obs_frames += active
+        self.obs_x = np.where(active, self.obs_x0 - self.obs_frames * self.obs_speed, self.obs_x)
+        passed = active & (self.obs_x < DINO_X) & ~self.obs_passed
+        self.obs_passed |= passed
+        self.score += passed.sum(axis=1)
+
+        self.obs_active &= ~(self.obs_x < -100)
+        any_active = self.obs_active.any(axis=1)
+        max_x = np.where(self.obs_active, self.obs_x, -np.inf).max(axis=1)
+        self.last_obstacle_x = np.where(any_active, max_x, self.last_obstacle_x)
+        self.game_speed = np.minimum(
+            OBSTACLE_SPEED_MIN + (self.score // SPEED_INCREASE_INTERVAL) * SPEED_INCREASE_AMOUNT,
+            OBSTACLE_SPEED_MAX)
+        self.steps += 1
+
+        collided = self._collided()
+        dones = collided | (self.steps >= self.max_steps)
+        rewards = self.score - prev_score
+        info = {'score': self.score.copy(), 'game_speed': self.game_speed.copy(),
+                'fitness': self.fitness(), 'steps': self.steps.copy(), 'collided': collided}
+        if dones.any():
+            self._reset_envs(dones)
+        return self.observe(), rewards, dones, info
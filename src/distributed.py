@@ -0,0 +1,433 @@
+"""
+Distributed - Eval genome NEAT phân tán qua TCP (coordinator / worker)
+
+Coordinator chạy trong process training (run_neat_training(coordinator=...)):
+  - nghe TCP; worker kết nối và xác thực bằng DISTRIBUTED_AUTHKEY
+    (multiprocessing.connection: message pickle có độ dài + HMAC)
+  - gửi neat-config.txt, NEAT_SCHEMA và descriptor các course obstacle (src.shared_course,
+    nằm trong shared memory: worker cùng máy attach không copy) 1 lần, rồi mỗi
+    generation chia các genome chưa có trong fitness cache thành batch
+    DISTRIBUTED_BATCH_SIZE, kèm tên hàm eval và các course seed; worker mô phỏng
+    headless và gửi kết quả về
+  - worker chết / mất kết nối / quá DISTRIBUTED_TIMEOUT: batch đang làm được
+    đưa lại vào hàng đợi cho worker khác
+  - không còn worker nào: coordinator tự eval các batch còn lại
+  - cuối generation in throughput từng worker và ghi vào telemetry
+
+Message là pickle: ai có authkey là chạy được code ở phía bên kia. Vì vậy
+coordinator mặc định chỉ nghe 127.0.0.1, và cả coordinator lẫn worker từ chối
+địa chỉ ngoài loopback khi authkey còn là giá trị mặc định (công khai trong
+repo). --local-workers dùng authkey ngẫu nhiên cho mỗi lần chạy (nếu chưa đặt
+DINORACER_AUTHKEY).
+
+Chạy:
+    export DINORACER_AUTHKEY=<khóa bí mật>               # trên mọi máy
+    python -m src.ai_handler --coordinator 0.0.0.0:5555
+    python -m src.distributed worker <host>:5555          # trên mỗi máy worker
+    python -m src.ai_handler --coordinator 127.0.0.1:5555 --local-workers 3   # thử trên 1 máy
+"""
+import argparse
+import ipaddress
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+
+import neat
+
+from config.settings import (
+    DISTRIBUTED_PORT, DISTRIBUTED_BATCH_SIZE, DISTRIBUTED_TIMEOUT, DISTRIBUTED_AUTHKEY,
+    NEAT_COURSE_SEEDS, NEAT_SCHEMA,
+)
+from src import telemetry, shared_course
+
+LOCAL_NAME = 'coordinator'     # tên trong thống kê khi coordinator tự eval
+
+
+AUTHKEY_ENV = 'DINORACER_AUTHKEY'
+
+
+def get_authkey():
+    return os.environ.get(AUTHKEY_ENV, DISTRIBUTED_AUTHKEY).encode()
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def check_authkey(host, authkey):
+    """ValueError nếu định kết nối / nghe ngoài loopback bằng authkey mặc định."""
+    if authkey == DISTRIBUTED_AUTHKEY.encode() and not is_loopback(host):
+        raise ValueError(f"Không dùng authkey mặc định cho địa chỉ {host or '0.0.0.0'}: "
+                         f"đặt biến môi trường {AUTHKEY_ENV} (giống nhau trên mọi máy)")
+
+
+def parse_address(address, default_host='127.0.0.1'):
+    """'host:port', ':port' hoặc 'host' -> (host, port)."""
+    host, sep, port = str(address).rpartition(':')
+    if not sep:
+        host, port = str(address), ''
+    return host or default_host, int(port) if port else DISTRIBUTED_PORT
+
+
+class WorkerStats:
+    """Thống kê 1 worker trong generation hiện tại."""
+
+    def __init__(self, name):
+        self.name = name
+        self.alive = True
+        self.reset()
+
+    def reset(self):
+        self.batches = 0
+        self.genomes = 0
+        self.steps = 0
+        self.busy = 0.0
+        self.requeued = 0
+
+    def record(self, genomes, steps, seconds):
+        self.batches += 1
+        self.genomes += genomes
+        self.steps += steps
+        self.busy += seconds
+
+    def genomes_per_s(self):
+        return self.genomes / self.busy if self.busy > 0 else 0.0
+
+    def steps_per_s(self):
+        return self.steps / self.busy if self.busy > 0 else 0.0
+
+
+class _Job:
+    """Kết quả eval của 1 generation, điền dần theo batch."""
+
+    def __init__(self, results, pending):
+        self.results = results
+        self.remaining = pending
+        self.done = threading.Event()
+        if not pending:
+            self.done.set()
+
+
+class _Batch:
+    __slots__ = ('job', 'indices', 'genomes', 'eval_name')
+
+    def __init__(self, job, indices, genomes, eval_name):
+        self.job = job
+        self.indices = indices
+        self.genomes = genomes
+        self.eval_name = eval_name
+
+
+class Coordinator(neat.reporting.BaseReporter):
+    """Phát batch genome cho worker TCP, kiêm reporter NEAT in throughput từng worker."""
+
+    def __init__(self, address=None, batch_size=DISTRIBUTED_BATCH_SIZE, timeout=DISTRIBUTED_TIMEOUT,
+                 local_workers=0, course_seeds=NEAT_COURSE_SEEDS, schema=NEAT_SCHEMA,
+                 config_path=None):
+        from src.ai_handler import get_config_path
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.course_seeds = course_seeds
+        self.schema = schema
+        with open(config_path or get_config_path(), 'r', encoding='utf-8') as f:
+            self._config_text = f.read()
+        host, port = parse_address(address or '')
+        if local_workers and AUTHKEY_ENV not in os.environ:
+            # Worker con nhận khóa qua env, không ai khác biết
+            self.authkey = secrets.token_hex(32).encode()
+        else:
+            self.authkey = get_authkey()
+        check_authkey(host, self.authkey)
+        self.listener = Listener((host, port), authkey=self.authkey)
+        # Các course dùng chung cho worker (rỗng khi course ngẫu nhiên)
+        self.courses = [shared_course.publish_course(seed) for seed in course_seeds or ()]
+        self.address = self.listener.address
+        self.queue = queue.Queue()
+        self.workers = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Coordinator chờ worker tại {self.address[0]}:{self.address[1]}")
+        self._procs = [start_local_worker(self.address, f"local{i}", self.authkey)
+                       for i in range(local_workers)]
+        if local_workers:
+            self.wait_for_workers(local_workers)
+
+    # ── Kết nối worker ──────────────────────────────────
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+                if self._closed:
+                    return
+                print(f"Worker kết nối lỗi: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _register(self, name):
+        with self._lock:
+            base, n = name, 1
+            while name in self.workers and self.workers[name].alive:
+                n += 1
+                name = f"{base}#{n}"
+            stats = self.workers[name] = WorkerStats(name)
+        return stats
+
+    def _serve(self, conn):
+        stats, batch = None, None
+        try:
+            hello = conn.recv()
+            stats = self._register(str(hello[1]))
+            conn.send(('config', self._config_text, [c.descriptor for c in self.courses],
+                       self.schema))
+            print(f"Worker {stats.name} đã kết nối")
+            while not self._closed:
+                try:
+                    batch = self.queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                start = time.perf_counter()
+                conn.send(('batch', batch.eval_name, self.course_seeds, batch.genomes))
+                if not conn.poll(self.timeout):
+                    raise TimeoutError(f"không trả kết quả sau {self.timeout}s")
+                kind, results, steps = conn.recv()
+                if kind != 'result' or len(results) != len(batch.indices):
+                    raise RuntimeError(f"worker báo lỗi: {results}")
+                self._complete(batch, results, steps)
+                stats.record(len(results), steps, time.perf_counter() - start)
+                batch = None
+            conn.send(('stop',))
+        except Exception as e:
+            if not self._closed:
+                print(f"Worker {stats.name if stats else '?'} mất kết nối: {type(e).__name__} {e}")
+        finally:
+            if batch is not None:
+                # Giao lại batch đang làm dở cho worker khác
+                self.queue.put(batch)
+                stats.requeued += 1
+            if stats is not None:
+                stats.alive = False
+            conn.close()
+
+    def _complete(self, batch, results, steps):
+        with self._lock:
+            job = batch.job
+            for i, result in zip(batch.indices, results):
+                job.results[i] = result
+            job.remaining -= len(batch.indices)
+            telemetry.add_steps(steps)
+            if job.remaining <= 0:
+                job.done.set()
+
+    def alive_workers(self):
+        return [w for w in self.workers.values() if w.alive and w.name != LOCAL_NAME]
+
+    def wait_for_workers(self, count, timeout=30):
+        """Chờ tới khi có count worker kết nối (hoặc hết timeout giây)."""
+        deadline = time.time() + timeout
+        while len(self.alive_workers()) < count and time.time() < deadline:
+            time.sleep(0.1)
+        return len(self.alive_workers())
+
+    def _evaluate_local(self, config):
+        """Eval 1 batch ngay trong process training (khi không còn worker)."""
+        from src.ai_handler import EVAL_FUNCS
+        try:
+            batch = self.queue.get_nowait()
+        except queue.Empty:
+            return
+        with self._lock:
+            stats = self.workers.setdefault(LOCAL_NAME, WorkerStats(LOCAL_NAME))
+        func = EVAL_FUNCS[batch.eval_name]
+        start, steps = time.perf_counter(), telemetry.get_steps()
+        results = [func(genome, config, self.course_seeds, self.schema)
+                   for genome in batch.genomes]
+        steps = telemetry.get_steps() - steps
+        # eval_genome đã tự add_steps
+        self._complete(batch, results, 0)
+        stats.record(len(results), steps, time.perf_counter() - start)
+
+    # ── Eval ────────────────────────────────────────────
+
+    def map(self, genomes, config, eval_name):
+        """Kết quả của hàm eval tên eval_name cho từng genome (theo thứ tự),
+        lấy từ fitness cache hoặc từ worker."""
+        from src.fitness_cache import get_fitness_cache
+        cache = get_fitness_cache()
+        results = [cache.lookup(genome, eval_name) for genome in genomes]
+        todo = [i for i, r in enumerate(results) if r is None]
+        job = _Job(results, len(todo))
+        for start in range(0, len(todo), self.batch_size):
+            indices = todo[start:start + self.batch_size]
+            self.queue.put(_Batch(job, indices, [genomes[i] for i in indices], eval_name))
+
+        warned = False
+        while not job.done.wait(0.05):
+            if not self.alive_workers():
+                if not warned:
+                    print("Không có worker, coordinator tự eval")
+                    warned = True
+                self._evaluate_local(config)
+        for i in todo:
+            cache.store(genomes[i], eval_name, results[i])
+
+        workers = [w for w in self.workers.values() if w.genomes]
+        telemetry.set_metric('workers', len(self.alive_workers()))
+        telemetry.set_metric('worker_genomes_per_s', {w.name: w.genomes_per_s() for w in workers})
+        telemetry.set_metric('requeued_batches', sum(w.requeued for w in self.workers.values()))
+        return results
+
+    # ── Reporter hooks ──────────────────────────────────
+
+    def start_generation(self, generation):
+        with self._lock:
+            for name in [n for n, w in self.workers.items() if not w.alive]:
+                del self.workers[name]
+            for w in self.workers.values():
+                w.reset()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        for w in sorted(self.workers.values(), key=lambda w: w.name):
+            if not w.batches and not w.requeued:
+                continue
+            status = '' if w.alive else ' (mất kết nối)'
+            extra = f", {w.requeued} batch giao lại" if w.requeued else ''
+            print(f"  {w.name}{status}: {w.genomes} genome, {w.genomes_per_s():.1f} genome/s, "
+                  f"{w.steps_per_s():.0f} step/s{extra}")
+
+    def close(self):
+        self._closed = True
+        try:
+            self.listener.close()
+        except OSError:
+            pass
+        for proc in self._procs:
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+        for course in self.courses:
+            course.close()
+        self.courses = []
+
+
+def start_local_worker(address, name=None, authkey=None):
+    """Chạy 1 worker process trên máy này, kết nối tới coordinator ở address."""
+    host, port = address
+    if host in ('', '0.0.0.0'):
+        host = '127.0.0.1'
+    cmd = [sys.executable, '-m', 'src.distributed', 'worker', f'{host}:{port}']
+    if name:
+        cmd += ['--name', name]
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    if authkey is not None:
+        env[AUTHKEY_ENV] = authkey.decode()
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return subprocess.Popen(cmd, cwd=root, env=env)
+
+
+# ── Worker ──────────────────────────────────────────────
+
+def _connect(address, retry_seconds):
+    """Client tới coordinator, thử lại tới khi coordinator mở cổng."""
+    deadline = time.time() + retry_seconds
+    while True:
+        try:
+            return Client(address, authkey=get_authkey())
+        except (ConnectionRefusedError, socket.timeout, OSError) as e:
+            if time.time() >= deadline:
+                print(f"Không kết nối được coordinator {address[0]}:{address[1]}: {e}")
+                return None
+            time.sleep(0.5)
+
+
+def _load_config(text):
+    """neat.Config từ nội dung neat-config.txt coordinator gửi."""
+    fd, path = tempfile.mkstemp(suffix='.txt', prefix='neat-config-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                           neat.DefaultSpeciesSet, neat.DefaultStagnation, path)
+    finally:
+        os.remove(path)
+
+
+def run_worker(address, name=None, retry_seconds=30):
+    """Nhận batch genome từ coordinator, eval headless, gửi kết quả về."""
+    from src.ai_handler import EVAL_FUNCS
+    host, port = parse_address(address)
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    try:
+        check_authkey(host, get_authkey())
+    except ValueError as e:
+        print(e)
+        return 1
+    try:
+        conn = _connect((host, port), retry_seconds)
+    except multiprocessing.AuthenticationError as e:
+        print(f"Sai authkey: {e}")
+        return 1
+    if conn is None:
+        return 1
+
+    config, schema, done = None, NEAT_SCHEMA, 0
+    try:
+        conn.send(('hello', name))
+        while True:
+            msg = conn.recv()
+            if msg[0] == 'config':
+                config = _load_config(msg[1])
+                for descriptor in (msg[2] if len(msg) > 2 else None) or ():
+                    shared_course.attach_course(descriptor)
+                if len(msg) > 3:
+                    schema = msg[3]
+            elif msg[0] == 'batch':
+                _, eval_name, course_seeds, genomes = msg
+                steps = telemetry.get_steps()
+                try:
+                    func = EVAL_FUNCS[eval_name]
+                    results = [func(genome, config, course_seeds, schema) for genome in genomes]
+                except Exception as e:
+                    conn.send(('error', repr(e), 0))
+                    continue
+                conn.send(('result', results, telemetry.get_steps() - steps))
+                done += len(results)
+            elif msg[0] == 'stop':
+                break
+    except (EOFError, OSError):
+        print(f"Worker {name}: coordinator đã đóng kết nối")
+    finally:
+        conn.close()
+    print(f"Worker {name}: đã eval {done} genome")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Eval NEAT phân tán")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('worker', help="Chạy worker, kết nối tới coordinator")
+    p.add_argument('address', help="host:port của coordinator")
+    p.add_argument('--name', help="Tên worker (mặc định hostname-pid)")
+    p.add_argument('--retry', type=float, default=30, help="Số giây thử kết nối lại")
+    args = parser.parse_args(argv)
+    return run_worker(args.address, args.name, args.retry)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
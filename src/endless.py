@@ -7,15 +7,21 @@ from config.settings import (
     SCREEN_WIDTH, SCREEN_HEIGHT, FPS, GROUND_Y,
     INITIAL_SCORE, SPEED_INCREASE_INTERVAL, SPEED_INCREASE_AMOUNT,
     MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX,
-    COLLISION_MARGIN, COMBO_MAX_MULTIPLIER, COMBO_OBSTACLES_PER_LEVEL,
+    COMBO_MAX_MULTIPLIER, COMBO_OBSTACLES_PER_LEVEL,
     MILESTONE_STEP, MILESTANE_BANNER_DURATION,
 )
 from src.dino import Dino
-from src.obstacle import create_obstacle
+from src.obstacle import ObstacleQueue
+from src.collision import find_collision
+from src import profiler
 from src.highscore import load_highscore, save_highscore
 from src.assets_loader import play_sound
 from src.data_collector import get_collector
 from src.utils import get_cached_font, get_gradient_bg
+from src.replay import (
+    start_recording, MODE_ENDLESS,
+    INPUT_JUMP_PRESS, INPUT_JUMP_RELEASE, INPUT_DUCK_RELEASE, INPUT_JUMP_DOWN, INPUT_DUCK_DOWN,
+)
 
 SKY_TOP = (100, 180, 230)
 SKY_BOT = (255, 210, 120)
@@ -31,9 +37,13 @@ def _get_endless_bg():
 class EndlessGame:
     """Chế độ Endless - chạy càng xa càng tốt"""
     
-    def __init__(self, screen):
+    def __init__(self, screen, headless=False):
         self.screen = screen
         self.clock = pygame.time.Clock()
+        self.prof = profiler.get_profiler()
+        # headless: mô phỏng lại replay - không âm thanh, highscore/DB
+        self.headless = headless
+        self.recorder = None
 
         # Sử dụng cached fonts thay vì tạo mới
         self.font_title = get_cached_font('Arial', 60, bold=True)
@@ -44,12 +54,15 @@ class EndlessGame:
 
         self.reset()
     
-    def reset(self):
+    def reset(self, seed=None):
         self.dino = Dino()
-        self.obstacles = []
+        self.dino.silent = self.headless
+        self.obstacles = ObstacleQueue()
+        # Course sinh từ rng riêng theo seed để replay tái lập được
+        self.seed = seed if seed is not None else random.randrange(1 << 31)
+        self.rng = random.Random(self.seed)
         self.score = 0
         self.game_speed = OBSTACLE_SPEED_MIN
-        self.last_obstacle_x = 0
         
         self.game_over = False
         self.start_ticks = pygame.time.get_ticks()
@@ -67,21 +80,12 @@ class EndlessGame:
         self.frame_count = 0
     
     def spawn_obstacle(self):
-        if self.last_obstacle_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
+        if self.obstacles.last_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
             speed = min(self.game_speed, OBSTACLE_SPEED_MAX)
-            obs = create_obstacle(SCREEN_WIDTH + 50, speed)
-            self.obstacles.append(obs)
-            self.last_obstacle_x = obs.x
+            self.obstacles.spawn(SCREEN_WIDTH + 50, speed, self.rng)
     
     def check_collision(self):
-        dino_rect = self.dino.get_rect()
-        # Sử dụng margin từ settings
-        margin = COLLISION_MARGIN
-        shrunk = dino_rect.inflate(-margin * 2, -margin * 2)
-        for obs in self.obstacles:
-            if shrunk.colliderect(obs.get_rect().inflate(-margin, -margin)):
-                return True
-        return False
+        return find_collision(self.dino, self.obstacles) is not None
     
     def update(self, keys=None, jump_held=False):
         if self.game_over:
@@ -97,6 +101,8 @@ class EndlessGame:
             else:
                 self.dino.duck(False)
 
+        prof = self.prof
+        prof.begin('physics')
         self.dino.update(jump_held=jump_held)
         self.spawn_obstacle()
         
@@ -110,9 +116,8 @@ class EndlessGame:
                 self.combo_mult = min(1 + self.combo_count // COMBO_OBSTACLES_PER_LEVEL, COMBO_MAX_MULTIPLIER)
                 self.score += self.combo_mult
         
-        self.obstacles = [o for o in self.obstacles if not o.is_off_screen()]
-        if self.obstacles:
-            self.last_obstacle_x = max(o.x for o in self.obstacles)
+        self.obstacles.retire_offscreen()
+        prof.end('physics')
 
         # Milestone banner
         milestone_step = MILESTONE_STEP
@@ -139,11 +144,17 @@ class EndlessGame:
                     action, source="human", score=self.score
                 )
         
-        if self.check_collision():
+        prof.begin('collision')
+        collided = self.check_collision()
+        prof.end('collision')
+        if collided:
             self.game_over = True
-            play_sound("gameover")
             self.combo_count = 0
             self.combo_mult = 1
+            if self.headless:
+                return
+            play_sound("gameover")
+            prof.begin('persistence')
 
             # Lưu highscore
             if self.score > self.highscore:
@@ -158,6 +169,28 @@ class EndlessGame:
                 save_highscore_db('human', self.score, 'endless')
             except Exception:
                 pass
+            prof.end('persistence')
+
+    def step_inputs(self, bits):
+        """Một frame từ bit input (dùng chung cho chơi thật và replay).
+
+        JUMP_PRESS = có KEYDOWN nhảy trong frame (jump_held của update()).
+        """
+        if bits & INPUT_JUMP_RELEASE:
+            self.dino.jump_release()
+        if bits & INPUT_DUCK_RELEASE:
+            self.dino.duck(False)
+        keys = {
+            pygame.K_SPACE: bool(bits & INPUT_JUMP_DOWN),
+            pygame.K_UP: False,
+            pygame.K_DOWN: bool(bits & INPUT_DUCK_DOWN),
+        }
+        self.update(keys, jump_held=bool(bits & INPUT_JUMP_PRESS))
+
+    def _save_replay(self, end_reason='collision'):
+        if self.recorder is not None:
+            self.recorder.save([self.score], end_reason)
+            self.recorder = None
 
     def draw_background(self):
         # Sử dụng cached gradient background
@@ -167,19 +200,26 @@ class EndlessGame:
         pygame.draw.line(self.screen, GROUND_LINE, (0, GROUND_Y), (SCREEN_WIDTH, GROUND_Y), 3)
     
     def draw(self):
+        prof = self.prof
+        prof.begin('draw-bg')
         self.draw_background()
+        prof.end('draw-bg')
         
+        prof.begin('draw-sprites')
         self.dino.draw(self.screen)
         
         for obs in self.obstacles:
             obs.draw(self.screen)
+        prof.end('draw-sprites')
         
+        prof.begin('hud')
         self._draw_hud()
         
         if self.game_over:
             self._draw_game_over()
+        prof.end('hud')
         
-        pygame.display.flip()
+        profiler.flip()
     
     def _draw_hud(self):
         score_text = self.font_hud.render(f"SCORE: {self.score:05d}", True, (255, 230, 80))
@@ -246,35 +286,56 @@ class EndlessGame:
     def run(self):
         running = True
 
+        prof = self.prof
+        self.recorder = start_recording(MODE_ENDLESS, [self.seed])
         while running:
             self.draw()
             self.clock.tick(FPS)
 
             keys = pygame.key.get_pressed()
-            jump_held = False
+            bits = 0
+            if keys[pygame.K_SPACE] or keys[pygame.K_UP]:
+                bits |= INPUT_JUMP_DOWN
+            if keys[pygame.K_DOWN]:
+                bits |= INPUT_DUCK_DOWN
 
+            prof.begin('events')
             for event in pygame.event.get():
+                if prof.handle_event(event):
+                    continue
                 if event.type == pygame.QUIT:
                     running = False
 
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         if self.collect_data:
-                            self.collector.save_session_data()
+                            with prof.section('persistence'):
+                                self.collector.save_session_data()
                         running = False
                     elif event.key == pygame.K_r and self.game_over:
                         self.reset()
+                        self.recorder = start_recording(MODE_ENDLESS, [self.seed])
                     elif event.key in (pygame.K_SPACE, pygame.K_UP):
-                        jump_held = True
+                        bits |= INPUT_JUMP_PRESS
 
                 if event.type == pygame.KEYUP:
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
-                        self.dino.jump_release()
+                        bits |= INPUT_JUMP_RELEASE
                     if event.key == pygame.K_DOWN:
-                        self.dino.duck(False)
+                        bits |= INPUT_DUCK_RELEASE
+            prof.end('events')
 
             if not self.game_over:
-                self.update(keys, jump_held=jump_held)
+                prof.begin('update')
+                if self.recorder is not None:
+                    self.recorder.record(bits)
+                self.step_inputs(bits)
+                if self.game_over:
+                    self._save_replay()
+                prof.end('update')
+            prof.next_frame()
+
+        self._save_replay('quit')
 
         return self.score
 
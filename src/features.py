@@ -0,0 +1,179 @@
+"""
+Features - Bộ trích xuất observation dùng chung cho AI, data collector và env
+
+Mỗi schema là một danh sách feature có version; model/genome được train với
+schema nào thì phải dùng đúng schema đó khi chạy.
+  neat_v1      (8) : NEAT genome (NEAT_SCHEMA mặc định), DinoEnv, NEAT visual trainer
+                     (ai_handler._get_inputs, neat_visual._get_inputs)
+  neat_v2     (10) : neat_v1 + land, clear1 từ bảng cung nhảy (src/physics_tables.py);
+                     NEAT_SCHEMA = 'neat_v2' + num_inputs = 10 trong neat-config.txt
+  collector_v1 (6) : DataCollector, supervised model
+  state_v1     (5) : GameManager.get_state(), LaneGame.get_state()
+
+NEAT visual trainer trước đây đưa 5 input (state_v1) vào network 8 input của
+neat-config.txt nên activate() lỗi và main.py rơi về train headless; giờ nó
+dùng neat_v1 như ai_handler.
+
+Obstacle trong list luôn theo thứ tự spawn = thứ tự x tăng dần (spawn cách nhau
+>= MIN_OBSTACLE_SPAWN_DISTANCE nên obstacle sau không thể vượt obstacle trước),
+nên chỉ cần duyệt 1 lần và dừng ngay khi gặp 2 obstacle phía trước dino.
+"""
+import numpy as np
+
+from config.settings import GROUND_Y, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX
+from src.physics_tables import get_jump_table, obstacle_kind
+
+NEAT_V1 = 'neat_v1'
+NEAT_V2 = 'neat_v2'
+COLLECTOR_V1 = 'collector_v1'
+STATE_V1 = 'state_v1'
+
+FEATURE_SCHEMAS = {
+    NEAT_V1: ('dist1', 'type1', 'dist2', 'speed', 'height', 'jumping', 'ducking', 'bias'),
+    # land  : số frame còn lại tới khi chạm đất / airtime (0 trên ground)
+    # clear1: 1 nếu nhảy ngay (hoặc cung nhảy hiện tại) qua được obstacle gần nhất;
+    #         0 khi obstacle còn ngoài tầm (dist1 = 1) để observation không đổi
+    NEAT_V2: ('dist1', 'type1', 'dist2', 'speed', 'height', 'jumping', 'ducking', 'land', 'clear1', 'bias'),
+    COLLECTOR_V1: ('dist1', 'is_bird', 'speed', 'height', 'jumping', 'ducking'),
+    STATE_V1: ('dist1', 'is_bird', 'speed', 'height', 'jumping'),
+}
+
+# Giá trị khi không có obstacle phía trước
+_DEFAULTS = {
+    NEAT_V1: (1.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0),
+    NEAT_V2: (1.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0),
+    COLLECTOR_V1: (1.0, 0.5, 0.0, 0.0, 0.0, 0.0),
+    STATE_V1: (1.0, 0.5, 0.0, 0.0, 0.0),
+}
+
+DIST_SCALE = 500         # px - khoảng cách được normalize về 0-1
+HEIGHT_SCALE = 100       # px - độ cao dino được normalize về 0-1
+BIRD_HEIGHT_RANGE = 130  # px - chênh lệch độ cao bird lớn nhất
+_SPEED_RANGE = OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN
+
+
+def feature_size(schema):
+    return len(FEATURE_SCHEMAS[schema])
+
+
+def nearest_two(obstacles, dino_x):
+    """Hai obstacle gần nhất phía trước dino (None nếu không có)."""
+    nearest = None
+    for obs in obstacles:
+        if obs.x > dino_x:
+            if nearest is not None:
+                return nearest, obs
+            nearest = obs
+    return nearest, None
+
+
+def extract(dino, obstacles, game_speed, schema=NEAT_V1, ground_y=GROUND_Y):
+    """Trích xuất features của 1 world theo schema, trả về list float."""
+    nearest, second = nearest_two(obstacles, dino.x)
+    if nearest is None:
+        return list(_DEFAULTS[schema])
+
+    dist1 = min((nearest.x - dino.x) / DIST_SCALE, 1.0)
+    speed = (game_speed - OBSTACLE_SPEED_MIN) / _SPEED_RANGE
+    height = min((ground_y - dino.y) / HEIGHT_SCALE, 1.0)
+    jumping = 1.0 if dino.is_jumping else 0.0
+
+    if schema == STATE_V1:
+        return [dist1, 1.0 if nearest.is_bird else 0.0, speed, height, jumping]
+
+    ducking = 1.0 if dino.is_ducking else 0.0
+    if schema == COLLECTOR_V1:
+        return [dist1, 1.0 if nearest.is_bird else 0.0, speed, height, jumping, ducking]
+
+    if schema == NEAT_V1 or schema == NEAT_V2:
+        # Bird: map độ cao về 0.3-1.0, cactus = 0
+        type1 = 0.0
+        if nearest.is_bird:
+            type1 = 0.3 + (ground_y - nearest.y) / BIRD_HEIGHT_RANGE * 0.7
+        dist2 = min((second.x - dino.x) / DIST_SCALE, 1.0) if second is not None else 1.0
+        if schema == NEAT_V1:
+            return [dist1, type1, dist2, speed, height, jumping, ducking, 0.5]
+        land, clear1 = _jump_features(dino, nearest, dist1, ground_y)
+        return [dist1, type1, dist2, speed, height, jumping, ducking, land, clear1, 0.5]
+
+    raise ValueError(f"Unknown feature schema: {schema}")
+
+
+def _jump_features(dino, nearest, dist1, ground_y):
+    """(land, clear1) của neat_v2 - tra bảng cung nhảy, O(1)."""
+    table = get_jump_table(ground_y=ground_y)
+    k = table.jump_frame(dino)
+    if k is None:
+        # Cú nhảy không khớp bảng (vd thả phím sớm)
+        return 0.5, 0.0
+    land = (table.airtime - k) / table.airtime if k else 0.0
+    clear1 = 0.0
+    if dist1 < 1.0 and table.will_clear(nearest.x - dino.x, nearest.speed,
+                                        obstacle_kind(nearest, table.obstacle_margin), k):
+        clear1 = 1.0
+    return land, clear1
+
+
+def extract_batch(dino_x, dino_y, jumping, ducking, game_speed,
+                  obs_x, obs_y, obs_bird, obs_active,
+                  schema=NEAT_V1, ground_y=GROUND_Y,
+                  vel_y=None, obs_w=None, obs_h=None, obs_speed=None):
+    """Phiên bản numpy của extract() cho N world cùng lúc.
+
+    dino_y, jumping, ducking, game_speed: mảng (N,)
+    obs_x, obs_y, obs_bird, obs_active  : mảng (N, K), slot không cần theo thứ tự x
+    vel_y, obs_w, obs_h, obs_speed      : chỉ cần cho neat_v2
+    Trả về mảng (N, feature_size(schema)).
+    """
+    n = len(dino_y)
+    rows = np.arange(n)
+    dist = np.where(obs_active & (obs_x > dino_x), obs_x - dino_x, np.inf)
+    i1 = np.argmin(dist, axis=1)
+    d1 = dist[rows, i1]
+    dist[rows, i1] = np.inf
+    d2 = dist.min(axis=1)
+    bird = obs_bird[rows, i1]
+
+    dist1 = np.minimum(d1 / DIST_SCALE, 1.0)
+    speed = (game_speed - OBSTACLE_SPEED_MIN) / _SPEED_RANGE
+    height = np.minimum((ground_y - dino_y) / HEIGHT_SCALE, 1.0)
+
+    if schema == NEAT_V1 or schema == NEAT_V2:
+        type1 = np.where(bird, 0.3 + (ground_y - obs_y[rows, i1]) / BIRD_HEIGHT_RANGE * 0.7, 0.0)
+        dist2 = np.where(np.isfinite(d2), np.minimum(d2 / DIST_SCALE, 1.0), 1.0)
+        cols = [dist1, type1, dist2, speed, height, jumping, ducking]
+        if schema == NEAT_V2:
+            cols += _jump_features_batch(jumping, vel_y, d1, rows, i1, obs_y, obs_w, obs_h,
+                                         obs_speed, ground_y)
+        cols.append(np.full(n, 0.5))
+    elif schema == COLLECTOR_V1:
+        cols = [dist1, bird, speed, height, jumping, ducking]
+    elif schema == STATE_V1:
+        cols = [dist1, bird, speed, height, jumping]
+    else:
+        raise ValueError(f"Unknown feature schema: {schema}")
+
+    out = np.empty((n, len(cols)))
+    for j, col in enumerate(cols):
+        out[:, j] = col
+    out[~np.isfinite(d1)] = _DEFAULTS[schema]
+    return out
+
+
+def _jump_features_batch(jumping, vel_y, d1, rows, i1, obs_y, obs_w, obs_h, obs_speed, ground_y):
+    """[land, clear1] của neat_v2 cho N world (giống _jump_features)."""
+    table = get_jump_table(ground_y=ground_y)
+    k = table.jump_frame_batch(jumping, vel_y)
+    known = k >= 0
+    land = np.where(known, np.where(k > 0, (table.airtime - k) / table.airtime, 0.0), 0.5)
+    clear1 = np.zeros(len(k))
+    in_range = known & (d1 < DIST_SCALE)
+    if in_range.any():
+        r, j = rows[in_range], i1[in_range]
+        m = table.obstacle_margin
+        half = m // 2
+        top = np.trunc(obs_y[r, j]).astype(np.int64) + half
+        kinds = np.stack([top, top + obs_h[r, j].astype(np.int64) - m,
+                          np.full(len(r), half), obs_w[r, j].astype(np.int64) - m], axis=1)
+        clear1[in_range] = table.will_clear_batch(d1[in_range], obs_speed[r, j], kinds, k[in_range])
+    return [land, clear1]
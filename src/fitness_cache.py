@@ -0,0 +1,110 @@
+"""
+Fitness Cache - Nhớ fitness của genome đã mô phỏng (LRU)
+
+Khi các course cố định (NEAT_COURSE_SEEDS), fitness chỉ phụ thuộc vào phần genome
+ảnh hưởng tới network: connection đang bật (in, out, weight) và node (bias,
+response, activation, aggregation). Elite được giữ qua generation và con
+giống hệt nhau (kể cả khác species) có cùng hash nên không phải mô phỏng lại.
+
+Mỗi generation in tỉ lệ hit; telemetry ghi thêm cache_hits / cache_misses.
+"""
+import hashlib
+import struct
+from collections import OrderedDict
+
+import neat
+
+from config.settings import FITNESS_CACHE_SIZE, NEAT_COURSE_SEEDS
+from src import telemetry
+
+_pack_double = struct.Struct('<d').pack
+
+
+def genome_hash(genome, course_seeds=NEAT_COURSE_SEEDS):
+    """Hash canonical (bytes) của genome + bộ course; bỏ qua key và connection tắt."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(tuple(course_seeds) if course_seeds is not None else None).encode())
+    for key in sorted(genome.nodes):
+        ng = genome.nodes[key]
+        h.update(b'n%d|%s|%s|' % (key, ng.activation.encode(), ng.aggregation.encode()))
+        h.update(_pack_double(ng.bias))
+        h.update(_pack_double(ng.response))
+    for key in sorted(k for k, cg in genome.connections.items() if cg.enabled):
+        h.update(b'c%d,%d|' % key)
+        h.update(_pack_double(genome.connections[key].weight))
+    return h.digest()
+
+
+class FitnessCache(neat.reporting.BaseReporter):
+    """LRU {(hash genome, hàm eval): kết quả}, kiêm reporter NEAT để báo hit rate."""
+
+    def __init__(self, max_size=FITNESS_CACHE_SIZE, course_seeds=NEAT_COURSE_SEEDS):
+        self.max_size = max_size
+        self.course_seeds = course_seeds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        # Course ngẫu nhiên -> fitness không tái lập được, không cache
+        return self.course_seeds is not None and self.max_size > 0
+
+    def _key(self, genome, eval_name):
+        # Mỗi hàm eval trả về kiểu kết quả khác nhau (fitness / (fitness, descriptor))
+        return genome_hash(genome, self.course_seeds), eval_name
+
+    def lookup(self, genome, eval_name):
+        """Kết quả đã nhớ của genome với hàm eval tên eval_name, hoặc None (tính là miss)."""
+        if not self.enabled:
+            return None
+        key = self._key(genome, eval_name)
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            telemetry.add_count('cache_hits')
+            return result
+        self.misses += 1
+        telemetry.add_count('cache_misses')
+        return None
+
+    def store(self, genome, eval_name, result):
+        if not self.enabled:
+            return
+        self.entries[self._key(genome, eval_name)] = result
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def evaluate(self, genome, config, eval_func):
+        """Fitness của genome: lấy từ cache hoặc gọi eval_func(genome, config)."""
+        result = self.lookup(genome, eval_func.__name__)
+        if result is None:
+            result = eval_func(genome, config)
+            self.store(genome, eval_func.__name__, result)
+        return result
+
+    def clear(self):
+        self.entries.clear()
+
+    # ── Reporter hooks ──────────────────────────────────
+
+    def start_generation(self, generation):
+        self.hits = 0
+        self.misses = 0
+
+    def post_evaluate(self, config, population, species, best_genome):
+        total = self.hits + self.misses
+        if self.enabled and total:
+            print(f"Fitness cache: {self.hits}/{total} hit ({self.hits / total:.0%}), "
+                  f"{len(self.entries)} entries")
+
+
+_cache = None
+
+
+def get_fitness_cache():
+    global _cache
+    if _cache is None:
+        _cache = FitnessCache()
+    return _cache
@@ -8,10 +8,18 @@ from config.settings import (
     SCREEN_WIDTH, SCREEN_HEIGHT, FPS, GROUND_Y,
     INITIAL_SCORE, SPEED_INCREASE_INTERVAL, SPEED_INCREASE_AMOUNT,
     MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX,
-    COLLISION_MARGIN,
 )
 from src.dino import Dino
-from src.obstacle import create_obstacle
+from src.obstacle import ObstacleQueue
+from src.collision import find_collision
+from src import profiler
+from src.features import extract, STATE_V1
+from src.replay import (
+    start_recording, apply_dino_inputs,
+    MODE_HUMAN, MODE_PVE, MODE_PVP,
+    INPUT_JUMP_PRESS, INPUT_JUMP_RELEASE, INPUT_DUCK_PRESS, INPUT_DUCK_RELEASE,
+    INPUT_JUMP_DOWN, INPUT_DUCK_DOWN, INPUT_SLOW, INPUT_FAST, INPUT_AI, INPUT_KEYS,
+)
 from src.highscore import load_highscore, save_highscore
 from src.assets_loader import play_sound, load_image, CLOUD_POSITIONS
 from src.achievements import check_achievements
@@ -163,10 +171,14 @@ def clear_game_cache():
 
 
 class GameManager:
-    def __init__(self, screen, is_ai_mode=False):
+    def __init__(self, screen, is_ai_mode=False, headless=False):
         self.screen = screen
         self.clock = pygame.time.Clock()
+        self.prof = profiler.get_profiler()
         self.is_ai_mode = is_ai_mode
+        # headless: mô phỏng lại replay - không âm thanh, particles, highscore/DB
+        self.headless = headless
+        self.recorder = None
         self.highscore_human, self.highscore_ai = load_highscore()
 
         # Sử dụng cached fonts thay vì tạo mới
@@ -199,13 +211,16 @@ class GameManager:
 
         self.reset()
 
-    def reset(self):
+    def reset(self, seed=None):
         skin = getattr(game_settings, 'skin_dino', 'dino') if not self.is_ai_mode else 'ai_dino'
         self.dino = Dino(folder=skin)
-        self.obstacles = []
+        self.dino.silent = self.headless
+        self.obstacles = ObstacleQueue()
+        # Course sinh từ rng riêng theo seed để replay tái lập được
+        self.seed = seed if seed is not None else random.randrange(1 << 31)
+        self.rng = random.Random(self.seed)
         self.score = INITIAL_SCORE
         self.game_speed = OBSTACLE_SPEED_MIN
-        self.last_obstacle_x = 0
         self.game_over = False
         self.paused = False
         self.ground_offset = 0
@@ -228,32 +243,13 @@ class GameManager:
         self.paused = not self.paused
 
     def spawn_obstacle(self):
-        if self.last_obstacle_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
+        if self.obstacles.last_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
             speed = min(self.game_speed, OBSTACLE_SPEED_MAX)
-            obs = create_obstacle(SCREEN_WIDTH + 50, speed)
-            self.obstacles.append(obs)
-            self.last_obstacle_x = obs.x
+            self.obstacles.spawn(SCREEN_WIDTH + 50, speed, self.rng)
 
     def check_collision(self):
-        # Early exit nếu không có obstacle
-        if not self.obstacles:
-            return False
-
-        # Tối ưu: lấy rect một lần, tính margin một lần
-        dino_rect = self.dino.get_rect()
-        # Sử dụng margin từ settings
-        margin = COLLISION_MARGIN
-        shrunk = dino_rect.inflate(-margin * 2, -margin * 2)
-
-        # Early exit: kiểm tra khoảng cách trước
-        dino_x = dino_rect.x
-        for obs in self.obstacles:
-            # Bỏ qua obstacle ở xa
-            if obs.x > dino_x + 100:
-                continue
-            if shrunk.colliderect(obs.get_rect().inflate(-margin, -margin)):
-                return True
-        return False
+        # Hitbox dạng tuple + broadphase theo x (xem src/collision.py)
+        return find_collision(self.dino, self.obstacles) is not None
 
     def update(self, action=None, speed_mult=1.0, jump_held=False):
         """
@@ -278,10 +274,11 @@ class GameManager:
                 self.dino.jump()
             self.dino.duck(duck > 0.5)
 
+        self.prof.begin('physics')
         self.dino.update(jump_held=jump_held)
 
         # Spawn dust particles khi đang chạy trên ground
-        if not self.game_over and not self.paused:
+        if not self.headless:
             if self.dino.is_on_ground and not self.dino.is_jumping:
                 self._dust_spawn_timer += 1
                 # Spawn bụi mỗi 3-5 frames tùy tốc độ
@@ -315,26 +312,32 @@ class GameManager:
             if obs.x < self.dino.x and not obs.passed:
                 obs.passed = True
                 self.score += 1
-        if self.score // 100 > prev_score // 100 and self.score > 0:
+        if self.score // 100 > prev_score // 100 and self.score > 0 and not self.headless:
             play_sound("score")
 
-        self.obstacles = [o for o in self.obstacles if not o.is_off_screen()]
-        if self.obstacles:
-            self.last_obstacle_x = max(o.x for o in self.obstacles)
+        self.obstacles.retire_offscreen()
+        self.prof.end('physics')
 
         self.game_speed = OBSTACLE_SPEED_MIN + (self.score // SPEED_INCREASE_INTERVAL) * SPEED_INCREASE_AMOUNT
         self.game_speed = min(self.game_speed, OBSTACLE_SPEED_MAX)
         self.bg_index = min(1 + self.score // 50, 5)
 
-        for c in self.clouds:
-            c.update()
+        if not self.headless:
+            for c in self.clouds:
+                c.update()
 
-        if self.check_collision():
+        self.prof.begin('collision')
+        collided = self.check_collision()
+        self.prof.end('collision')
+        if collided and self.headless:
+            self.game_over = True
+        elif collided:
             self.game_over = True
             play_sound("gameover")
             rect = self.dino.get_rect()
             for _ in range(40):
                 self.particles.append(Particle(rect.centerx, rect.centery))
+            self.prof.begin('persistence')
             h_cur = self.highscore_ai if self.is_ai_mode else self.highscore_human
             if self.score > h_cur:
                 if self.is_ai_mode:
@@ -363,6 +366,7 @@ class GameManager:
                 save_highscore_db(player_type, self.score, game_mode)
             except Exception:
                 pass  # DB không có thì bỏ qua
+            self.prof.end('persistence')
 
         # Tiến trình hiển thị achievement popup
         if self.ach_popup_item is None and self.pending_achievements:
@@ -373,25 +377,23 @@ class GameManager:
             if self.ach_popup_timer == 0:
                 self.ach_popup_item = None
 
+    def step_inputs(self, bits):
+        """Một frame human mode từ bit input (dùng chung cho chơi thật và replay)."""
+        apply_dino_inputs(self.dino, bits)
+        speed_mult = 1.0
+        if bits & INPUT_SLOW:
+            speed_mult = 0.5
+        elif bits & INPUT_FAST:
+            speed_mult = 1.5
+        self.update(speed_mult=speed_mult, jump_held=bool(bits & INPUT_JUMP_DOWN))
+
+    def _save_replay(self, end_reason='collision'):
+        if self.recorder is not None:
+            self.recorder.save([self.score], end_reason)
+            self.recorder = None
+
     def get_state(self):
-        nearest = None
-        min_dist = float('inf')
-        for obs in self.obstacles:
-            if obs.x > self.dino.x:
-                dist = obs.x - self.dino.x
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest = obs
-        if nearest is None:
-            return [1.0, 0.5, 0.0, 0.0, 0.0]
-        from src.obstacle import Cactus
-        return [
-            min(min_dist / 500, 1.0),
-            0.0 if isinstance(nearest, Cactus) else 1.0,
-            (self.game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN),
-            min((GROUND_Y - self.dino.y) / 100, 1.0),
-            1.0 if self.dino.is_jumping else 0.0,
-        ]
+        return extract(self.dino, self.obstacles, self.game_speed, STATE_V1)
 
     # ── Draw ──────────────────────────────────────────────────
 
@@ -603,11 +605,15 @@ class GameManager:
         self.screen.blit(name_surf, (px + 8, py + 32))
 
     def draw(self):
+        prof = self.prof
+        prof.begin('draw-bg')
         self._draw_background()
         for c in self.clouds:
             c.draw(self.screen)
         self._draw_ground()
+        prof.end('draw-bg')
 
+        prof.begin('draw-sprites')
         # Vẽ dust particles TRƯỚC dino (để dino đè lên)
         for p in self.dust_particles:
             p.draw(self.screen)
@@ -615,6 +621,9 @@ class GameManager:
         self.dino.draw(self.screen)
         for obs in self.obstacles:
             obs.draw(self.screen)
+        prof.end('draw-sprites')
+
+        prof.begin('hud')
         self._draw_hud()
         self._draw_pause_btn()
         if self.paused:
@@ -622,7 +631,8 @@ class GameManager:
         elif self.game_over:
             self._draw_game_over()
         self._draw_achievement_popup()
-        pygame.display.flip()
+        prof.end('hud')
+        profiler.flip()
 
     def run_human_mode(self):
         """
@@ -636,71 +646,103 @@ class GameManager:
         - ESC       : về menu (khi game over)
         """
         running = True
+        self.recorder = start_recording(MODE_HUMAN, [self.seed])
+        # Cạnh phím (press/release) tích lũy qua các frame pause,
+        # áp dụng ở frame đầu tiên game chạy tiếp
+        pending = 0
         while running:
             # --- Đọc phím giữ để tính speed_mult ---
             keys = pygame.key.get_pressed()
-            speed_mult = 1.0
-            jump_held = False
+            held = 0
             if not self.paused and not self.game_over:
                 if keys[pygame.K_a]:
-                    speed_mult = 0.5   # A: chậm 50%
+                    held |= INPUT_SLOW   # A: chậm 50%
                 elif keys[pygame.K_d]:
-                    speed_mult = 1.5   # D: nhanh 150%
+                    held |= INPUT_FAST   # D: nhanh 150%
 
-                # Track trạng thái jump key
-                jump_held = keys[pygame.K_SPACE] or keys[pygame.K_UP]
+                # Track trạng thái jump key (variable jump height)
+                if keys[pygame.K_SPACE] or keys[pygame.K_UP]:
+                    held |= INPUT_JUMP_DOWN
 
+            self.prof.begin('events')
             for event in pygame.event.get():
+                if self.prof.handle_event(event):
+                    continue
                 if event.type == pygame.QUIT:
                     running = False
 
                 if event.type == pygame.KEYDOWN:
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
                         if not self.game_over and not self.paused:
-                            self.dino.jump_press()
+                            pending |= INPUT_JUMP_PRESS
                     if event.key == pygame.K_DOWN:
                         if not self.game_over and not self.paused:
-                            self.dino.duck(True)
+                            pending |= INPUT_DUCK_PRESS
                     if event.key == pygame.K_p:
                         if not self.game_over:
                             self.toggle_pause()
                     if event.key == pygame.K_r and self.game_over:
                         self.reset()
+                        pending = 0
+                        self.recorder = start_recording(MODE_HUMAN, [self.seed])
                     if event.key == pygame.K_ESCAPE and self.game_over:
                         running = False
 
                 if event.type == pygame.KEYUP:
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
-                        self.dino.jump_release()
+                        pending |= INPUT_JUMP_RELEASE
                     if event.key == pygame.K_DOWN or event.key == pygame.K_s:
-                        self.dino.duck(False)
+                        pending |= INPUT_DUCK_RELEASE
 
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     if self.pause_btn.collidepoint(event.pos) and not self.game_over:
                         self.toggle_pause()
+            self.prof.end('events')
 
-            # Update với jump_held để hỗ trợ variable jump height
-            self.update(speed_mult=speed_mult, jump_held=jump_held)
+            self.prof.begin('update')
+            if self.paused or self.game_over:
+                self.update()
+            else:
+                bits = pending | held
+                pending = 0
+                if self.recorder is not None:
+                    self.recorder.record(bits)
+                self.step_inputs(bits)
+                if self.game_over:
+                    self._save_replay()
+            self.prof.end('update')
             self.draw()
             self.clock.tick(FPS)
+            self.prof.next_frame()
+
+        self._save_replay('quit')
 
     def run_pve_mode(self, ai_type='neat'):
         """
         Chạy chế độ PVE.
-        ai_type: 'neat' hoặc 'supervised'
+        ai_type: 'neat' hoặc 'supervised'; thêm hậu tố '_table' để dùng bảng tra
+        quyết định đã chưng cất (src/policy_table.py, O(1) mỗi frame cho máy yếu)
         """
         from src.lane_game import LaneGame, LANE_H
-        from src.ai_handler import load_genome, _get_inputs_from_lane
-        import neat
+        from src.ai_handler import load_network, _get_inputs_from_lane
 
         # Load AI
-        net = None
+        net, net_schema = None, None
         jump_model, duck_model = None, None
         jump_scaler, duck_scaler = None, None
-
-        if ai_type == 'neat':
-            genome, config = load_genome()
-            net = neat.nn.FeedForwardNetwork.create(genome, config) if genome else None
+        table = None
+
+        if ai_type.endswith('_table'):
+            from src.policy_table import load_table
+            ai_type = ai_type[:-len('_table')]
+            table = load_table(ai_type)
+            if table is None:
+                print(f"Chua co policy table {ai_type} (python -m src.policy_table build --policy {ai_type})")
+
+        if table is not None:
+            ai_label = "AI (NEAT)" if ai_type == 'neat' else "AI (Supervised)"
+        elif ai_type == 'neat':
+            net, net_schema = load_network()
             ai_label = "AI (NEAT)"
         else:
             # Load supervised models
@@ -713,13 +755,11 @@ class GameManager:
                     ai_label = "AI (Supervised)"
                 else:
                     print("Khong load duoc supervised model! Dung NEAT...")
-                    genome, config = load_genome()
-                    net = neat.nn.FeedForwardNetwork.create(genome, config) if genome else None
+                    net, net_schema = load_network()
                     ai_label = "AI (NEAT)"
             except Exception as e:
                 print(f"Loi load supervised: {e}. Dung NEAT...")
-                genome, config = load_genome()
-                net = neat.nn.FeedForwardNetwork.create(genome, config) if genome else None
+                net, net_schema = load_network()
                 ai_label = "AI (NEAT)"
 
         ai_lane     = LaneGame('ai_dino', ai_label, label_color=(200, 150, 255))
@@ -727,37 +767,64 @@ class GameManager:
         div = pygame.Surface((SCREEN_WIDTH, 4)); div.fill((255, 200, 50))
         font_hint = get_cached_font('Arial', 16)
         running = True
+        recorder = start_recording(MODE_PVE, [ai_lane.seed, player_lane.seed])
 
+        prof = self.prof
         while running:
+            player_bits = 0
+            prof.begin('events')
             for event in pygame.event.get():
+                if prof.handle_event(event):
+                    continue
                 if event.type == pygame.QUIT: running = False
                 if event.type == pygame.KEYDOWN:
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
-                        if not player_lane.game_over: player_lane.dino.jump_press()
+                        if not player_lane.game_over: player_bits |= INPUT_JUMP_PRESS
                     if event.key == pygame.K_DOWN:
-                        if not player_lane.game_over: player_lane.dino.duck(True)
-                    if event.key == pygame.K_r: ai_lane.reset(); player_lane.reset()
+                        if not player_lane.game_over: player_bits |= INPUT_DUCK_PRESS
+                    if event.key == pygame.K_r:
+                        _save_lanes_replay(recorder, (ai_lane, player_lane), 'restart')
+                        ai_lane.reset(); player_lane.reset()
+                        player_bits = 0
+                        recorder = start_recording(MODE_PVE, [ai_lane.seed, player_lane.seed])
                     if event.key == pygame.K_ESCAPE: running = False
                 if event.type == pygame.KEYUP:
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
-                        player_lane.dino.jump_release()
-                    if event.key == pygame.K_DOWN: player_lane.dino.duck(False)
+                        player_bits |= INPUT_JUMP_RELEASE
+                    if event.key == pygame.K_DOWN: player_bits |= INPUT_DUCK_RELEASE
+            prof.end('events')
 
+            prof.begin('update')
+            # Action của AI cũng được ghi dạng bit nên replay không cần model
+            ai_bits = 0
             if not ai_lane.game_over:
-                if ai_type == 'neat' and net:
-                    ai_lane.update(action=net.activate(_get_inputs_from_lane(ai_lane)))
+                out = None
+                if table is not None:
+                    # Bảng dùng đúng schema của policy gốc (neat_v1 / neat_v2 / collector_v1)
+                    inputs = (_get_inputs_from_lane(ai_lane, table.schema) if ai_type == 'neat'
+                              else ai_lane._get_inputs_for_collector())
+                    out = table.activate(inputs)
+                elif ai_type == 'neat' and net:
+                    # Network dùng schema nó được train (entry registry / NEAT_SCHEMA)
+                    out = net.activate(_get_inputs_from_lane(ai_lane, net_schema))
                 elif ai_type == 'supervised' and jump_model and duck_model:
-                    # Get inputs for supervised model
-                    from src.ai_handler import _get_inputs
-                    inputs = _get_inputs(ai_lane.dino, ai_lane.obstacles, ai_lane.game_speed)
-                    action = predict_action(jump_model, jump_scaler, duck_model, duck_scaler, inputs)
-                    ai_lane.update(action=action[:3])  # Take first 3 values
-                else:
-                    ai_lane.update()
-            else:
-                ai_lane.update()
-
-            player_lane.update()
+                    # Supervised model được train trên schema collector_v1
+                    inputs = ai_lane._get_inputs_for_collector()
+                    out = predict_action(jump_model, jump_scaler, duck_model, duck_scaler, inputs)
+                if out is not None:
+                    ai_bits = INPUT_AI
+                    if out[0] > 0.5:
+                        ai_bits |= INPUT_JUMP_DOWN
+                    if out[1] > 0.5:
+                        ai_bits |= INPUT_DUCK_DOWN
+
+            if recorder is not None and not (ai_lane.game_over and player_lane.game_over):
+                recorder.record(ai_bits, player_bits)
+            ai_lane.step_inputs(ai_bits)
+            player_lane.step_inputs(player_bits)
+            if recorder is not None and ai_lane.game_over and player_lane.game_over:
+                recorder = _save_lanes_replay(recorder, (ai_lane, player_lane))
+            prof.end('update')
             ai_lane.draw(); player_lane.draw()
             self.screen.blit(ai_lane.surface, (0, 0))
             self.screen.blit(div, (0, LANE_H))
@@ -765,7 +832,10 @@ class GameManager:
             if ai_lane.game_over or player_lane.game_over:
                 hint = font_hint.render('R - Retry  |  ESC - Menu', True, (220, 220, 220))
                 self.screen.blit(hint, hint.get_rect(center=(SCREEN_WIDTH // 2, LANE_H * 2 + 4 - 12)))
-            pygame.display.flip(); self.clock.tick(FPS)
+            profiler.flip(); self.clock.tick(FPS)
+            prof.next_frame()
+
+        _save_lanes_replay(recorder, (ai_lane, player_lane), 'quit')
 
     def run_pvp_mode(self):
         from src.lane_game import LaneGame, LANE_H
@@ -781,65 +851,84 @@ class GameManager:
         font_hint = get_cached_font('Arial', 16)
 
         running = True
+        prof = self.prof
+        recorder = start_recording(MODE_PVP, [p1.seed, p2.seed])
 
         while running:
             # Đọc phím liên tục để P2 (W/S) nhận input mượt hơn
             keys = pygame.key.get_pressed()
 
-            # Tạo action cho P1 (Space/Up/Down)
-            p1_action = None
+            # Action giữ phím cho P1 (Space/Up/Down)
+            p1_bits = 0
             if not p1.game_over:
-                p1_jump = 1 if (keys[pygame.K_SPACE] or keys[pygame.K_UP]) else 0
-                p1_duck = 1 if keys[pygame.K_DOWN] else 0
-                p1_action = (p1_jump, p1_duck)
-
-            # Tạo action cho P2 (W/S)
-            p2_action = None
+                p1_bits = INPUT_KEYS
+                if keys[pygame.K_SPACE] or keys[pygame.K_UP]:
+                    p1_bits |= INPUT_JUMP_DOWN
+                if keys[pygame.K_DOWN]:
+                    p1_bits |= INPUT_DUCK_DOWN
+
+            # Action giữ phím cho P2 (W/S)
+            p2_bits = 0
             if not p2.game_over:
-                p2_jump = 1 if keys[pygame.K_w] else 0
-                p2_duck = 1 if keys[pygame.K_s] else 0
-                p2_action = (p2_jump, p2_duck)
+                p2_bits = INPUT_KEYS
+                if keys[pygame.K_w]:
+                    p2_bits |= INPUT_JUMP_DOWN
+                if keys[pygame.K_s]:
+                    p2_bits |= INPUT_DUCK_DOWN
 
+            prof.begin('events')
             for event in pygame.event.get():
+                if prof.handle_event(event):
+                    continue
                 if event.type == pygame.QUIT:
                     running = False
                 if event.type == pygame.KEYDOWN:
                     # P1 controls
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
                         if not p1.game_over:
-                            p1.dino.jump_press()
+                            p1_bits |= INPUT_JUMP_PRESS
                     if event.key == pygame.K_DOWN:
                         if not p1.game_over:
-                            p1.dino.duck(True)
+                            p1_bits |= INPUT_DUCK_PRESS
                     # P2 controls
                     if event.key == pygame.K_w:
                         if not p2.game_over:
-                            p2.dino.jump_press()
+                            p2_bits |= INPUT_JUMP_PRESS
                     if event.key == pygame.K_s:
                         if not p2.game_over:
-                            p2.dino.duck(True)
+                            p2_bits |= INPUT_DUCK_PRESS
                     # Game controls
                     if event.key == pygame.K_r:
+                        _save_lanes_replay(recorder, (p1, p2), 'restart')
                         p1.reset()
                         p2.reset()
+                        p1_bits = p2_bits = 0
+                        recorder = start_recording(MODE_PVP, [p1.seed, p2.seed])
                     if event.key == pygame.K_ESCAPE:
                         running = False
 
                 if event.type == pygame.KEYUP:
                     # P1 release
                     if event.key in (pygame.K_SPACE, pygame.K_UP):
-                        p1.dino.jump_release()
+                        p1_bits |= INPUT_JUMP_RELEASE
                     if event.key == pygame.K_DOWN:
-                        p1.dino.duck(False)
+                        p1_bits |= INPUT_DUCK_RELEASE
                     # P2 release
                     if event.key == pygame.K_w:
-                        p2.dino.jump_release()
+                        p2_bits |= INPUT_JUMP_RELEASE
                     if event.key == pygame.K_s:
-                        p2.dino.duck(False)
+                        p2_bits |= INPUT_DUCK_RELEASE
+            prof.end('events')
 
             # Update cả hai lane - truyền action cho cả hai người chơi
-            p1.update(player_action=p1_action)
-            p2.update(player_action=p2_action)
+            prof.begin('update')
+            if recorder is not None and not (p1.game_over and p2.game_over):
+                recorder.record(p1_bits, p2_bits)
+            p1.step_inputs(p1_bits)
+            p2.step_inputs(p2_bits)
+            if recorder is not None and p1.game_over and p2.game_over:
+                recorder = _save_lanes_replay(recorder, (p1, p2))
+            prof.end('update')
 
             # Draw
             p1.draw()
@@ -864,5 +953,15 @@ class GameManager:
                 hint = font_hint.render('R - Retry  |  ESC - Menu', True, (220, 220, 220))
                 self.screen.blit(hint, hint.get_rect(center=(SCREEN_WIDTH // 2, LANE_H * 2 + 4 - 12)))
 
-            pygame.display.flip()
+            profiler.flip()
             self.clock.tick(FPS)
+            prof.next_frame()
+
+        _save_lanes_replay(recorder, (p1, p2), 'quit')
+
+
+def _save_lanes_replay(recorder, lanes, end_reason='collision'):
+    """Lưu replay PVE/PVP (nếu đang ghi), trả về None để bỏ recorder."""
+    if recorder is not None:
+        recorder.save([lane.score for lane in lanes], end_reason)
+    return None
@@ -0,0 +1,339 @@
+"""
+Genome Registry - Hall-of-fame các genome NEAT tốt nhất
+
+Giữ top-K genome (fitness, generation, thời gian) trong thư mục genomes/:
+  index.json          : danh sách entry + id của champion đang dùng
+  <id>.genome.z       : genome pickle nén zlib (để train tiếp / rollback)
+  <id>.net.json       : network đã compile thành danh sách node phẳng
+
+AI lane chỉ cần đọc <id>.net.json và dựng CompiledNetwork, không phải
+parse neat-config.txt hay dựng lại FeedForwardNetwork, nên load chỉ mất
+vài ms. Output của CompiledNetwork giống hệt FeedForwardNetwork.
+
+Nếu có DATABASE_URL, mỗi genome mới cũng được ghi vào bảng ai_genomes.
+
+Chạy:
+    python -m src.genome_registry list
+    python -m src.genome_registry activate <id>     # rollback về champion cũ
+    python -m src.genome_registry import best_genome.pkl
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import zlib
+
+import neat
+from neat.activations import ActivationFunctionSet
+from neat.aggregations import AggregationFunctionSet
+
+from config.settings import GENOME_REGISTRY_DIR, GENOME_REGISTRY_TOP_K, NEAT_SCHEMA
+
+INDEX_FILE = 'index.json'
+NET_FORMAT = 1
+
+_activations = ActivationFunctionSet()
+_aggregations = AggregationFunctionSet()
+
+# Cache network đã load: {id: CompiledNetwork}
+_net_cache = {}
+
+
+def get_registry_dir():
+    return os.path.join(os.path.dirname(__file__), '..', GENOME_REGISTRY_DIR)
+
+
+# ── Network đã compile ──────────────────────────────────
+
+def compile_network(genome, config):
+    """Genome -> dict JSON được (danh sách node theo thứ tự tính)."""
+    ff = neat.nn.FeedForwardNetwork.create(genome, config)
+    nodes = []
+    for node, _act, _agg, bias, response, links in ff.node_evals:
+        ng = genome.nodes[node]
+        nodes.append([node, ng.activation, ng.aggregation, bias, response,
+                      [[i, w] for i, w in links]])
+    return {
+        'format': NET_FORMAT,
+        'inputs': list(ff.input_nodes),
+        'outputs': list(ff.output_nodes),
+        'nodes': nodes,
+    }
+
+
+class CompiledNetwork:
+    """Feed-forward network từ compile_network(), cùng API activate().
+
+    Node key được map sang index liên tiếp để dùng list thay vì dict.
+    """
+
+    __slots__ = ('num_inputs', 'values', 'evals', 'output_idx')
+
+    def __init__(self, data):
+        index = {}
+        for key in data['inputs']:
+            index[key] = len(index)
+        for key in data['outputs']:
+            index.setdefault(key, len(index))
+        for node in data['nodes']:
+            index.setdefault(node[0], len(index))
+
+        self.num_inputs = len(data['inputs'])
+        self.values = [0.0] * len(index)
+        self.evals = []
+        for node, act, agg, bias, response, links in data['nodes']:
+            # agg None = sum: tính trực tiếp, không tạo list
+            agg_func = None if agg == 'sum' else _aggregations.get(agg)
+            self.evals.append((index[node], _activations.get(act), agg_func, bias, response,
+                               tuple((index[i], w) for i, w in links)))
+        self.output_idx = [index[k] for k in data['outputs']]
+
+    def activate(self, inputs):
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError(f"Expected {self.num_inputs} inputs, got {len(inputs)}")
+        values = self.values
+        values[:self.num_inputs] = inputs
+        for out, act, agg, bias, response, links in self.evals:
+            if agg is None:
+                s = sum([values[i] * w for i, w in links])
+            else:
+                s = agg([values[i] * w for i, w in links])
+            values[out] = act(bias + response * s)
+        return [values[i] for i in self.output_idx]
+
+
+# ── Index ───────────────────────────────────────────────
+
+def load_index():
+    path = os.path.join(get_registry_dir(), INDEX_FILE)
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except (IOError, ValueError) as e:
+        print(f"Error loading genome index: {e}")
+    return {'active': None, 'pinned': False, 'next_id': 1, 'entries': []}
+
+
+def save_index(index):
+    registry_dir = get_registry_dir()
+    path = os.path.join(registry_dir, INDEX_FILE)
+    try:
+        os.makedirs(registry_dir, exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, path)
+        return True
+    except (IOError, OSError) as e:
+        print(f"Error saving genome index: {e}")
+        return False
+
+
+def list_genomes():
+    """Các entry theo fitness giảm dần."""
+    return sorted(load_index()['entries'], key=lambda e: e['fitness'], reverse=True)
+
+
+def get_entry(entry_id=None):
+    """Entry theo id, mặc định champion đang active."""
+    index = load_index()
+    if entry_id is None:
+        entry_id = index.get('active')
+    for entry in index['entries']:
+        if entry['id'] == entry_id:
+            return entry
+    return None
+
+
+def _remove_files(entry):
+    for name in (entry['genome_file'], entry['net_file']):
+        try:
+            os.remove(os.path.join(get_registry_dir(), name))
+        except OSError:
+            pass
+
+
+# ── Ghi ─────────────────────────────────────────────────
+
+def register_genome(genome, config, generation=None, fitness=None, description=None,
+                    top_k=GENOME_REGISTRY_TOP_K, schema=NEAT_SCHEMA):
+    """Thêm genome vào hall-of-fame nếu lọt top-K và chưa có (cùng genome_hash,
+    vd elite được giữ qua nhiều generation). schema: schema input genome được
+    train (AI lane dùng đúng schema này). Trả về entry mới hoặc None."""
+    from src.fitness_cache import genome_hash
+    if fitness is None:
+        # Novelty search ghi đè genome.fitness, fitness gốc nằm ở raw_fitness
+        fitness = getattr(genome, 'raw_fitness', genome.fitness)
+    if fitness is None:
+        return None
+    index = load_index()
+    entries = index['entries']
+    digest = genome_hash(genome).hex()
+    if any(e.get('hash') == digest for e in entries):
+        return None
+    if len(entries) >= top_k and fitness <= min(e['fitness'] for e in entries):
+        return None
+
+    entry_id = index['next_id']
+    registry_dir = get_registry_dir()
+    net_data = compile_network(genome, config)
+    entry = {
+        'id': entry_id,
+        'fitness': float(fitness),
+        'generation': generation,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'schema': schema,
+        'num_inputs': len(net_data['inputs']),
+        'num_outputs': len(net_data['outputs']),
+        'genome_file': f'{entry_id:05d}.genome.z',
+        'net_file': f'{entry_id:05d}.net.json',
+        'description': description,
+        'hash': digest,
+    }
+    try:
+        os.makedirs(registry_dir, exist_ok=True)
+        with open(os.path.join(registry_dir, entry['genome_file']), 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(genome, protocol=pickle.HIGHEST_PROTOCOL), 9))
+        with open(os.path.join(registry_dir, entry['net_file']), 'w', encoding='utf-8') as f:
+            json.dump(net_data, f, separators=(',', ':'))
+    except (IOError, OSError, pickle.PickleError) as e:
+        print(f"Error saving genome {entry_id}: {e}")
+        return None
+
+    entries.append(entry)
+    entries.sort(key=lambda e: e['fitness'], reverse=True)
+    for old in entries[top_k:]:
+        _remove_files(old)
+        _net_cache.pop(old['id'], None)
+    del entries[top_k:]
+    index['next_id'] = entry_id + 1
+    # Champion mới tự động active, trừ khi người dùng đã chọn tay (rollback)
+    if not index.get('pinned') or index.get('active') not in {e['id'] for e in entries}:
+        index['active'] = entries[0]['id']
+        index['pinned'] = False
+    if not save_index(index):
+        return None
+
+    _save_to_database(entry, net_data, is_active=index['active'] == entry_id)
+    return entry
+
+
+def _save_to_database(entry, net_data, is_active):
+    if not os.getenv("DATABASE_URL"):
+        return
+    try:
+        from src.database_handler import save_ai_genome
+        save_ai_genome(
+            genome_name=f"genome_{entry['id']:05d}",
+            fitness_score=entry['fitness'],
+            generation=entry['generation'],
+            genome_data=net_data,
+            config={'schema': entry['schema'], 'num_inputs': entry['num_inputs'],
+                    'num_outputs': entry['num_outputs']},
+            is_active=is_active,
+            description=entry['description'],
+        )
+    except Exception as e:
+        print(f"Không lưu được genome vào database: {e}")
+
+
+def set_active(entry_id):
+    """Chọn champion dùng cho AI lane (rollback). Trả về True nếu thành công."""
+    index = load_index()
+    if entry_id not in {e['id'] for e in index['entries']}:
+        return False
+    index['active'] = entry_id
+    index['pinned'] = entry_id != index['entries'][0]['id']
+    return save_index(index)
+
+
+# ── Đọc ─────────────────────────────────────────────────
+
+def load_network(entry_id=None):
+    """CompiledNetwork của entry (mặc định champion), hoặc None."""
+    entry = get_entry(entry_id)
+    if entry is None:
+        return None
+    net = _net_cache.get(entry['id'])
+    if net is not None:
+        return net
+    try:
+        with open(os.path.join(get_registry_dir(), entry['net_file']), 'r', encoding='utf-8') as f:
+            net = CompiledNetwork(json.load(f))
+    except (IOError, ValueError, KeyError, TypeError) as e:
+        print(f"Error loading network {entry['id']}: {e}")
+        return None
+    _net_cache[entry['id']] = net
+    return net
+
+
+def load_registered_genome(entry_id=None):
+    """Genome gốc (neat.DefaultGenome) của entry, hoặc None."""
+    entry = get_entry(entry_id)
+    if entry is None:
+        return None
+    try:
+        with open(os.path.join(get_registry_dir(), entry['genome_file']), 'rb') as f:
+            return pickle.loads(zlib.decompress(f.read()))
+    except (IOError, OSError, zlib.error, pickle.PickleError, EOFError) as e:
+        print(f"Error loading genome {entry['id']}: {e}")
+        return None
+
+
+class RegistryReporter(neat.reporting.BaseReporter):
+    """Reporter NEAT: đưa genome tốt nhất mỗi generation vào registry."""
+
+    def __init__(self, config):
+        self.config = config
+        self.generation = 0
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        register_genome(best_genome, self.config, generation=self.generation)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genome hall-of-fame")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list')
+    p_activate = sub.add_parser('activate', help="Chọn champion (rollback)")
+    p_activate.add_argument('id', type=int)
+    p_import = sub.add_parser('import', help="Đưa file genome .pkl vào registry")
+    p_import.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        active = load_index().get('active')
+        for e in list_genomes():
+            mark = '*' if e['id'] == active else ' '
+            print(f"{mark} {e['id']:>5}  fitness {e['fitness']:>10.1f}  gen {str(e['generation']):>5}  "
+                  f"{e['created']}  {e['description'] or ''}")
+        return 0
+
+    if args.command == 'activate':
+        if set_active(args.id):
+            print(f"Active genome: {args.id}")
+            return 0
+        print(f"Genome {args.id} không có trong registry")
+        return 1
+
+    from src.ai_handler import get_neat_config
+    try:
+        with open(args.path, 'rb') as f:
+            genome = pickle.load(f)
+    except (IOError, OSError, pickle.PickleError) as e:
+        print(f"Error loading {args.path}: {e}")
+        return 1
+    entry = register_genome(genome, get_neat_config(), fitness=genome.fitness or 0.0,
+                            description=f"import {os.path.basename(args.path)}")
+    print(f"Imported as {entry['id']}" if entry else "Đã có trong registry hoặc không lọt top-K, bỏ qua")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,12 +8,16 @@ import math
 from config.settings import (
     SCREEN_WIDTH, SPEED_INCREASE_INTERVAL, SPEED_INCREASE_AMOUNT,
     MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX,
-    INITIAL_SCORE, COLLISION_MARGIN, LANE_HEIGHT,
+    INITIAL_SCORE, LANE_HEIGHT,
 )
 from src.dino import Dino
-from src.obstacle import create_obstacle
+from src.obstacle import ObstacleQueue
+from src.collision import find_collision
+from src.profiler import get_profiler
 from src.assets_loader import play_sound, load_image
 from src.data_collector import get_collector
+from src.features import extract, COLLECTOR_V1, STATE_V1
+from src.replay import apply_dino_inputs, INPUT_AI, INPUT_KEYS, INPUT_JUMP_DOWN, INPUT_DUCK_DOWN
 from src.utils import get_cached_font
 
 # Chiều cao mỗi lane
@@ -92,11 +96,14 @@ class LaneGame:
     """
 
     def __init__(self, dino_folder="dino", label="PLAYER",
-                 label_color=(255, 230, 80), collect_data=False, player_type="human"):
+                 label_color=(255, 230, 80), collect_data=False, player_type="human",
+                 headless=False):
         self.dino_folder = dino_folder
         self.label = label
         self.label_color = label_color
-        self.collect_data = collect_data
+        # headless: mô phỏng lại replay - không âm thanh, không thu thập data
+        self.headless = headless
+        self.collect_data = collect_data and not headless
         self.player_type = player_type
 
         self.surface = pygame.Surface((LANE_W, LANE_H))
@@ -116,8 +123,9 @@ class LaneGame:
 
         self.reset()
 
-    def reset(self):
+    def reset(self, seed=None):
         self.dino = Dino(x=80, folder=self.dino_folder)
+        self.dino.silent = self.headless
         from config.settings import DINO_HEIGHT
         # Set ground_y BEFORE setting y position
         self.dino.ground_y = GROUND_Y_LANE
@@ -125,10 +133,12 @@ class LaneGame:
         # Debug: Invalidate cached rect
         self.dino._cached_rect = None
 
-        self.obstacles = []
+        self.obstacles = ObstacleQueue()
+        # Course sinh từ rng riêng theo seed để replay tái lập được
+        self.seed = seed if seed is not None else random.randrange(1 << 31)
+        self.rng = random.Random(self.seed)
         self.score = INITIAL_SCORE
         self.game_speed = OBSTACLE_SPEED_MIN
-        self.last_obstacle_x = 0
         self.game_over = False
         self.ground_offset = 0
         self.bg_offset = 0
@@ -180,33 +190,18 @@ class LaneGame:
                 d.anim_frame = (d.anim_frame + 1) % _ANIM_FRAMES.get(anim, 1)
 
     def _spawn_obstacle(self):
-        if self.last_obstacle_x - LANE_W < -MIN_OBSTACLE_SPAWN_DISTANCE:
+        if self.obstacles.last_x - LANE_W < -MIN_OBSTACLE_SPAWN_DISTANCE:
             speed = min(self.game_speed, OBSTACLE_SPEED_MAX)
-            obs = create_obstacle(LANE_W + 50, speed)
-            from src.obstacle import Cactus, Bird
-            if isinstance(obs, Cactus):
+            obs = self.obstacles.spawn(LANE_W + 50, speed, self.rng)
+            if not obs.is_bird:
                 obs.y = GROUND_Y_LANE - obs.height
             else:
                 from config.settings import GROUND_Y
                 ratio = GROUND_Y_LANE / GROUND_Y
                 obs.y = int(obs.y * ratio)
-            self.obstacles.append(obs)
-            self.last_obstacle_x = obs.x
 
     def check_collision(self):
-        from config.settings import DINO_HEIGHT, DUCK_HEIGHT_RATIO, COLLISION_MARGIN
-        d = self.dino
-        h = d.height
-        if d.is_ducking:
-            h = int(d.height * DUCK_HEIGHT_RATIO)
-        dino_rect = pygame.Rect(d.x, d.y + (d.height - h), d.width, h)
-        # Sử dụng margin từ settings
-        margin = COLLISION_MARGIN
-        shrunk = dino_rect.inflate(-margin * 2, -margin * 2)
-        for obs in self.obstacles:
-            if shrunk.colliderect(obs.get_rect().inflate(-margin, -margin)):
-                return True
-        return False
+        return find_collision(self.dino, self.obstacles) is not None
 
     def get_dino_rect(self):
         from config.settings import DUCK_HEIGHT_RATIO
@@ -239,36 +234,16 @@ class LaneGame:
         self.last_action = action
     
     def _get_inputs_for_collector(self):
-        nearest = None
-        min_dist = float("inf")
-        for obs in self.obstacles:
-            if obs.x > self.dino.x:
-                dist = obs.x - self.dino.x
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest = obs
-        
-        if nearest is None:
-            return [1.0, 0.5, 0.0, 0.0, 0.0, 0.0]
-        
-        from src.obstacle import Cactus
-        
-        dist_normalized = min(min_dist / 500, 1.0)
-        obs_type = 0.0 if isinstance(nearest, Cactus) else 1.0
-        speed_normalized = (self.game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN)
-        height_normalized = min((GROUND_Y_LANE - self.dino.y) / 100, 1.0)
-        is_jumping = 1.0 if self.dino.is_jumping else 0.0
-        is_ducking = 1.0 if self.dino.is_ducking else 0.0
-        
-        return [dist_normalized, obs_type, speed_normalized, height_normalized, is_jumping, is_ducking]
+        return extract(self.dino, self.obstacles, self.game_speed, COLLECTOR_V1, GROUND_Y_LANE)
 
     def update(self, action=None, player_action=None):
         if self.game_over:
             self.go_flash_timer += 1
             # Chỉ save data một lần khi mới game over
             if self.collect_data and hasattr(self, '_data_saved') and not self._data_saved:
-                if len(get_collector().current_session_data) > 0:
-                    get_collector().save_session_data()
+                if len(get_collector().session) > 0:
+                    with get_profiler().section('persistence'):
+                        get_collector().save_session_data()
                 self._data_saved = True
             return
 
@@ -293,6 +268,8 @@ class LaneGame:
             if duck > 0.5 and not self.dino.is_jumping:
                 actual_action = (actual_action[0], 1)
 
+        prof = get_profiler()
+        prof.begin('physics')
         # Update dino physics using proper update method
         self.dino.update(jump_held=False)
         self._spawn_obstacle()
@@ -306,51 +283,54 @@ class LaneGame:
             if obs.x < self.dino.x and not obs.passed:
                 obs.passed = True
                 self.score += 1
-        if self.score // 100 > prev // 100 and self.score > 0:
+        if self.score // 100 > prev // 100 and self.score > 0 and not self.headless:
             play_sound("score")
 
-        self.obstacles = [o for o in self.obstacles if not o.is_off_screen()]
-        if self.obstacles:
-            self.last_obstacle_x = max(o.x for o in self.obstacles)
+        self.obstacles.retire_offscreen()
+        prof.end('physics')
 
         self.game_speed = OBSTACLE_SPEED_MIN + (self.score // SPEED_INCREASE_INTERVAL) * SPEED_INCREASE_AMOUNT
         self.game_speed = min(self.game_speed, OBSTACLE_SPEED_MAX)
         self.bg_index = min(1 + self.score // 50, 5)
 
-        for c in self.clouds:
-            c.update()
+        if not self.headless:
+            for c in self.clouds:
+                c.update()
 
-        if self.check_collision():
+        prof.begin('collision')
+        collided = self.check_collision()
+        prof.end('collision')
+        if collided:
             self.game_over = True
-            play_sound("gameover")
+            if not self.headless:
+                play_sound("gameover")
             if self.collect_data:
+                prof.begin('persistence')
                 get_collector().save_session_data()
+                prof.end('persistence')
         
         self.frame_count += 1
         self._collect_data(actual_action)
 
+    def step_inputs(self, bits):
+        """Một frame từ bit input: AI action, phím giữ (PVP) hoặc chỉ cạnh phím (PVE)."""
+        apply_dino_inputs(self.dino, bits)
+        jump = 1 if bits & INPUT_JUMP_DOWN else 0
+        duck = 1 if bits & INPUT_DUCK_DOWN else 0
+        if bits & INPUT_AI:
+            self.update(action=(jump, duck, 0))
+        elif bits & INPUT_KEYS:
+            self.update(player_action=(jump, duck))
+        else:
+            self.update()
+
     def get_state(self):
-        nearest = None
-        min_dist = float("inf")
-        for obs in self.obstacles:
-            if obs.x > self.dino.x:
-                dist = obs.x - self.dino.x
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest = obs
-        if nearest is None:
-            return [1.0, 0.5, 0.0, 0.0, 0.0]
-        from src.obstacle import Cactus
-        return [
-            min(min_dist / 500, 1.0),
-            0.0 if isinstance(nearest, Cactus) else 1.0,
-            (self.game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN),
-            min((GROUND_Y_LANE - self.dino.y) / 100, 1.0),
-            1.0 if self.dino.is_jumping else 0.0,
-        ]
+        return extract(self.dino, self.obstacles, self.game_speed, STATE_V1, GROUND_Y_LANE)
 
     def draw(self, show_go=True):
         surf = self.surface
+        prof = get_profiler()
+        prof.begin('draw-bg')
 
         bg = _get_bg(self.bg_index)
         ox = int(self.bg_offset) % LANE_W
@@ -371,12 +351,16 @@ class LaneGame:
         else:
             pygame.draw.rect(surf, GROUND_COL, (0, GROUND_Y_LANE, LANE_W, tile_h))
             pygame.draw.line(surf, GROUND_LN, (0, GROUND_Y_LANE), (LANE_W, GROUND_Y_LANE), 2)
+        prof.end('draw-bg')
 
+        prof.begin('draw-sprites')
         self.dino.draw(surf)
 
         for obs in self.obstacles:
             obs.draw(surf)
+        prof.end('draw-sprites')
 
+        prof.begin('hud')
         lbl = self.font_label.render(self.label, True, self.label_color)
         surf.blit(lbl, (8, 6))
 
@@ -424,3 +408,4 @@ class LaneGame:
 
             hint = self.font_small.render("R - Retry  |  ESC - Menu", True, (200, 200, 200))
             surf.blit(hint, hint.get_rect(center=(LANE_W // 2, py + 115)))
+        prof.end('hud')
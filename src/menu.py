@@ -6,6 +6,7 @@ import random
 import math
 from config.settings import SCREEN_WIDTH, SCREEN_HEIGHT, DIFFICULTY_MULTIPLIERS
 from src.utils import get_cached_font, clear_menu_background_cache
+from src import profiler
 
 # Pre-create background gradient surface
 _bg_gradient_surface = None
@@ -328,8 +329,6 @@ class Menu:
         hint1 = self.font_hint.render("Left/Right arrows to toggle, Up/Down to select", True, (200, 200, 200))
         self.screen.blit(hint1, (sw // 2 - hint1.get_width() // 2, sh - 40))
 
-        pygame.display.flip()
-
     def draw_achievements_menu(self):
         """Hiển thị danh sách thành tựu"""
         from src.achievements import get_achievements
@@ -402,11 +401,8 @@ class Menu:
         self.draw_button("← BACK", back_rect, self.selected == 0)
         self.button_rects = [back_rect]
 
-        pygame.display.flip()
-
     def draw_train_ai_menu(self):
         """Submenu chọn loại Training AI"""
-        self.draw_background()
         self.draw_title_with_shadow("TRAIN AI", 80)
 
         sw, sh = self._get_screen_dims()
@@ -440,8 +436,6 @@ class Menu:
                 self.selected = i
             self.draw_button(item, rect, i == self.selected)
 
-        pygame.display.flip()
-
     def draw_stats_menu(self):
         self.draw_background()
         self.draw_title_with_shadow("STATISTICS", 60)
@@ -579,28 +573,29 @@ class Menu:
         self.draw_button("← BACK", back_rect, self.selected == 0)
         self.button_rects = [back_rect]
 
-        pygame.display.flip()
-
     def draw(self):
-        # Cập nhật vị trí buttons mỗi khi vẽ để thích ứng với kích thước màn hình
-        self._calculate_button_positions()
-
-        self.draw_background()
+        prof = profiler.get_profiler()
+        with prof.section('draw-bg'):
+            # Cập nhật vị trí buttons mỗi khi vẽ để thích ứng với kích thước màn hình
+            self._calculate_button_positions()
+            self.draw_background()
+
+        # Buttons + chữ của menu con / menu chính
+        with prof.section('hud'):
+            if self.current_menu == MENU_SETTINGS:
+                self.draw_settings_menu()
+            elif self.current_menu == MENU_STATS:
+                self.draw_stats_menu()
+            elif self.current_menu == MENU_ACHIEVEMENTS:
+                self.draw_achievements_menu()
+            elif self.current_menu == MENU_TRAIN_AI:
+                self.draw_train_ai_menu()
+            else:
+                self.draw_main_menu()
 
-        if self.current_menu == MENU_SETTINGS:
-            self.draw_settings_menu()
-            return
-        elif self.current_menu == MENU_STATS:
-            self.draw_stats_menu()
-            return
-        elif self.current_menu == MENU_ACHIEVEMENTS:
-            self.draw_achievements_menu()
-            return
-        elif self.current_menu == MENU_TRAIN_AI:
-            self.draw_train_ai_menu()
-            return
+        profiler.flip()
 
-        # Main menu
+    def draw_main_menu(self):
         self.draw_title_with_shadow("DINO RACER", 100)
 
         mouse_pos = pygame.mouse.get_pos()
@@ -619,8 +614,6 @@ class Menu:
         hint = self.font_hint.render("v1.0 - Use Arrows + Enter or Mouse Click", True, (180, 180, 180))
         self.screen.blit(hint, (10, sh - 25))
 
-        pygame.display.flip()
-
     def handle_settings_input(self, event):
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_UP:
@@ -662,160 +655,165 @@ class Menu:
     def run(self):
         running = True
         clock = pygame.time.Clock()
+        prof = profiler.get_profiler()
         
         while running:
             self.draw()
             clock.tick(60)
+            prof.next_frame()
             
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return "Quit"
+            with prof.section('events'):
+                for event in pygame.event.get():
+                    if prof.handle_event(event):
+                        continue
+                    if event.type == pygame.QUIT:
+                        return "Quit"
                 
-                if self.current_menu == MENU_SETTINGS:
-                    self.handle_settings_input(event)
-                    # Also handle mouse click in settings
-                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                        mouse_pos = pygame.mouse.get_pos()
-                        for i, button_data in enumerate(self.button_rects):
-                            rect = button_data if not isinstance(button_data, tuple) else button_data[1]
-                            if rect.collidepoint(mouse_pos):
-                                if i == len(self.settings_items) - 1:  # Back button
-                                    self.current_menu = MENU_MAIN
-                                    self.selected = 0
-                                else:
-                                    self._toggle_setting(i)
-                    continue
+                    if self.current_menu == MENU_SETTINGS:
+                        self.handle_settings_input(event)
+                        # Also handle mouse click in settings
+                        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                            mouse_pos = pygame.mouse.get_pos()
+                            for i, button_data in enumerate(self.button_rects):
+                                rect = button_data if not isinstance(button_data, tuple) else button_data[1]
+                                if rect.collidepoint(mouse_pos):
+                                    if i == len(self.settings_items) - 1:  # Back button
+                                        self.current_menu = MENU_MAIN
+                                        self.selected = 0
+                                    else:
+                                        self._toggle_setting(i)
+                        continue
                 
-                if self.current_menu == MENU_STATS:
-                    if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
-                        self.current_menu = MENU_MAIN
-                        self.selected = 0
-                    # Also handle mouse click in stats
-                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                        mouse_pos = pygame.mouse.get_pos()
-                        for button_data in self.button_rects:
-                            rect = button_data if not isinstance(button_data, tuple) else button_data[1]
-                            if rect.collidepoint(mouse_pos):
-                                self.current_menu = MENU_MAIN
-                                self.selected = 0
-                    continue
-
-                if self.current_menu == MENU_ACHIEVEMENTS:
-                    if event.type == pygame.KEYDOWN and event.key in (pygame.K_RETURN, pygame.K_ESCAPE):
-                        self.current_menu = MENU_MAIN
-                        self.selected = 0
-                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                        mouse_pos = pygame.mouse.get_pos()
-                        for button_data in self.button_rects:
-                            rect = button_data if not isinstance(button_data, tuple) else button_data[1]
-                            if rect.collidepoint(mouse_pos):
-                                self.current_menu = MENU_MAIN
-                                self.selected = 0
-                    continue
-
-                if self.current_menu == MENU_TRAIN_AI:
-                    train_items = ["NEAT Training", "Supervised Training", "Back"]
-                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                        mouse_pos = pygame.mouse.get_pos()
-                        for i, button_data in enumerate(self.button_rects):
-                            rect = button_data if not isinstance(button_data, tuple) else button_data[1]
-                            if rect.collidepoint(mouse_pos):
-                                if train_items[i] == "Back":
+                    if self.current_menu == MENU_STATS:
+                        if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
+                            self.current_menu = MENU_MAIN
+                            self.selected = 0
+                        # Also handle mouse click in stats
+                        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                            mouse_pos = pygame.mouse.get_pos()
+                            for button_data in self.button_rects:
+                                rect = button_data if not isinstance(button_data, tuple) else button_data[1]
+                                if rect.collidepoint(mouse_pos):
                                     self.current_menu = MENU_MAIN
                                     self.selected = 0
-                                else:
-                                    return train_items[i]
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
+                        continue
+
+                    if self.current_menu == MENU_ACHIEVEMENTS:
+                        if event.type == pygame.KEYDOWN and event.key in (pygame.K_RETURN, pygame.K_ESCAPE):
                             self.current_menu = MENU_MAIN
                             self.selected = 0
-                        elif event.key == pygame.K_RETURN:
-                            if self.selected < len(train_items) - 1:
-                                return train_items[self.selected]
-                            else:
+                        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                            mouse_pos = pygame.mouse.get_pos()
+                            for button_data in self.button_rects:
+                                rect = button_data if not isinstance(button_data, tuple) else button_data[1]
+                                if rect.collidepoint(mouse_pos):
+                                    self.current_menu = MENU_MAIN
+                                    self.selected = 0
+                        continue
+
+                    if self.current_menu == MENU_TRAIN_AI:
+                        train_items = ["NEAT Training", "Supervised Training", "Back"]
+                        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                            mouse_pos = pygame.mouse.get_pos()
+                            for i, button_data in enumerate(self.button_rects):
+                                rect = button_data if not isinstance(button_data, tuple) else button_data[1]
+                                if rect.collidepoint(mouse_pos):
+                                    if train_items[i] == "Back":
+                                        self.current_menu = MENU_MAIN
+                                        self.selected = 0
+                                    else:
+                                        return train_items[i]
+                        if event.type == pygame.KEYDOWN:
+                            if event.key == pygame.K_ESCAPE:
                                 self.current_menu = MENU_MAIN
                                 self.selected = 0
-                        elif event.key == pygame.K_UP:
-                            self.selected = (self.selected - 1) % len(train_items)
-                        elif event.key == pygame.K_DOWN:
-                            self.selected = (self.selected + 1) % len(train_items)
-                    continue
-
-                # Main menu handling
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:
-                        mouse_pos = pygame.mouse.get_pos()
-                        for button_data in self.button_rects:
-                            # Handle both tuple (item_idx, rect) and just rect
-                            if isinstance(button_data, tuple):
-                                item_idx, rect = button_data
-                            else:
-                                rect = button_data
-                                item_idx = self.selected
-                            if rect.collidepoint(mouse_pos):
-                                self.selected = item_idx
-                                choice = self.main_items[item_idx]
-                                if choice == "Settings":
-                                    self.current_menu = MENU_SETTINGS
-                                    self.selected = 0
-                                    self._calculate_button_positions()
-                                elif choice == "Stats":
-                                    self.current_menu = MENU_STATS
-                                    self.selected = 0
-                                    self.cached_stats = None
-                                elif choice == "Achievements":
-                                    self.current_menu = MENU_ACHIEVEMENTS
-                                    self.selected = 0
-                                elif choice == "Train AI":
-                                    self.current_menu = MENU_TRAIN_AI
+                            elif event.key == pygame.K_RETURN:
+                                if self.selected < len(train_items) - 1:
+                                    return train_items[self.selected]
+                                else:
+                                    self.current_menu = MENU_MAIN
                                     self.selected = 0
+                            elif event.key == pygame.K_UP:
+                                self.selected = (self.selected - 1) % len(train_items)
+                            elif event.key == pygame.K_DOWN:
+                                self.selected = (self.selected + 1) % len(train_items)
+                        continue
+
+                    # Main menu handling
+                    if event.type == pygame.MOUSEBUTTONDOWN:
+                        if event.button == 1:
+                            mouse_pos = pygame.mouse.get_pos()
+                            for button_data in self.button_rects:
+                                # Handle both tuple (item_idx, rect) and just rect
+                                if isinstance(button_data, tuple):
+                                    item_idx, rect = button_data
                                 else:
-                                    return choice
-                    # Mouse wheel scrolling
-                    elif event.button == 4:  # Scroll up
-                        self.scroll_offset = max(0, self.scroll_offset - 1)
-                        self._calculate_button_positions()
-                    elif event.button == 5:  # Scroll down
-                        self.scroll_offset = min(len(self.main_items) - self.max_visible_buttons,
-                                               self.scroll_offset + 1)
-                        self._calculate_button_positions()
-
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_UP:
-                        self.selected = (self.selected - 1) % len(self.main_items)
-                        # Cập nhật scroll_offset để giữ selected visible
-                        if self.is_scrolling:
-                            max_scroll = len(self.main_items) - self.max_visible_buttons
-                            if self.selected < self.scroll_offset:
-                                self.scroll_offset = max(0, self.selected)
-                            elif self.selected >= self.scroll_offset + self.max_visible_buttons:
-                                self.scroll_offset = min(max_scroll, self.selected - self.max_visible_buttons + 2)
-                            self._calculate_button_positions()
-                    elif event.key == pygame.K_DOWN:
-                        self.selected = (self.selected + 1) % len(self.main_items)
-                        # Cập nhật scroll_offset để giữ selected visible
-                        if self.is_scrolling:
-                            max_scroll = len(self.main_items) - self.max_visible_buttons
-                            if self.selected < self.scroll_offset:
-                                self.scroll_offset = max(0, self.selected)
-                            elif self.selected >= self.scroll_offset + self.max_visible_buttons:
-                                self.scroll_offset = min(max_scroll, self.selected - self.max_visible_buttons + 2)
+                                    rect = button_data
+                                    item_idx = self.selected
+                                if rect.collidepoint(mouse_pos):
+                                    self.selected = item_idx
+                                    choice = self.main_items[item_idx]
+                                    if choice == "Settings":
+                                        self.current_menu = MENU_SETTINGS
+                                        self.selected = 0
+                                        self._calculate_button_positions()
+                                    elif choice == "Stats":
+                                        self.current_menu = MENU_STATS
+                                        self.selected = 0
+                                        self.cached_stats = None
+                                    elif choice == "Achievements":
+                                        self.current_menu = MENU_ACHIEVEMENTS
+                                        self.selected = 0
+                                    elif choice == "Train AI":
+                                        self.current_menu = MENU_TRAIN_AI
+                                        self.selected = 0
+                                    else:
+                                        return choice
+                        # Mouse wheel scrolling
+                        elif event.button == 4:  # Scroll up
+                            self.scroll_offset = max(0, self.scroll_offset - 1)
                             self._calculate_button_positions()
-                    elif event.key == pygame.K_RETURN:
-                        choice = self.main_items[self.selected]
-                        if choice == "Settings":
-                            self.current_menu = MENU_SETTINGS
-                            self.selected = 0
+                        elif event.button == 5:  # Scroll down
+                            self.scroll_offset = min(len(self.main_items) - self.max_visible_buttons,
+                                                   self.scroll_offset + 1)
                             self._calculate_button_positions()
-                        elif choice == "Stats":
-                            self.current_menu = MENU_STATS
-                            self.selected = 0
-                            self.cached_stats = None
-                        elif choice == "Achievements":
-                            self.current_menu = MENU_ACHIEVEMENTS
-                            self.selected = 0
-                        elif choice == "Train AI":
-                            self.current_menu = MENU_TRAIN_AI
-                            self.selected = 0
-                        else:
-                            return choice
+
+                    if event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_UP:
+                            self.selected = (self.selected - 1) % len(self.main_items)
+                            # Cập nhật scroll_offset để giữ selected visible
+                            if self.is_scrolling:
+                                max_scroll = len(self.main_items) - self.max_visible_buttons
+                                if self.selected < self.scroll_offset:
+                                    self.scroll_offset = max(0, self.selected)
+                                elif self.selected >= self.scroll_offset + self.max_visible_buttons:
+                                    self.scroll_offset = min(max_scroll, self.selected - self.max_visible_buttons + 2)
+                                self._calculate_button_positions()
+                        elif event.key == pygame.K_DOWN:
+                            self.selected = (self.selected + 1) % len(self.main_items)
+                            # Cập nhật scroll_offset để giữ selected visible
+                            if self.is_scrolling:
+                                max_scroll = len(self.main_items) - self.max_visible_buttons
+                                if self.selected < self.scroll_offset:
+                                    self.scroll_offset = max(0, self.selected)
+                                elif self.selected >= self.scroll_offset + self.max_visible_buttons:
+                                    self.scroll_offset = min(max_scroll, self.selected - self.max_visible_buttons + 2)
+                                self._calculate_button_positions()
+                        elif event.key == pygame.K_RETURN:
+                            choice = self.main_items[self.selected]
+                            if choice == "Settings":
+                                self.current_menu = MENU_SETTINGS
+                                self.selected = 0
+                                self._calculate_button_positions()
+                            elif choice == "Stats":
+                                self.current_menu = MENU_STATS
+                                self.selected = 0
+                                self.cached_stats = None
+                            elif choice == "Achievements":
+                                self.current_menu = MENU_ACHIEVEMENTS
+                                self.selected = 0
+                            elif choice == "Train AI":
+                                self.current_menu = MENU_TRAIN_AI
+                                self.selected = 0
+                            else:
+                                return choice
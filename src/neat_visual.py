@@ -2,6 +2,11 @@
 NEAT Visual Training - Chạy toàn bộ population trên 1 màn hình.
 Mỗi dino có màu gradient từ xanh (tốt nhất) -> đỏ (tệ nhất).
 Hiển thị: generation, số còn sống, fitness tốt nhất, tốc độ game.
+
+Tốc độ mô phỏng (phím 1/2/3 hoặc T để đổi vòng):
+  x1   : 1 frame mô phỏng / frame vẽ, giới hạn FPS
+  x10  : 10 frame mô phỏng / frame vẽ, giới hạn FPS
+  MAX  : mô phỏng hết tốc độ, chỉ vẽ TURBO_RENDER_FPS lần / giây
 """
 import pygame
 import neat
@@ -13,11 +18,17 @@ import math
 from config.settings import (
     SCREEN_WIDTH, SCREEN_HEIGHT, FPS, GROUND_Y,
     INITIAL_SCORE, SPEED_INCREASE_INTERVAL, SPEED_INCREASE_AMOUNT,
-    MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX,
+    MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX, NEAT_SCHEMA,
 )
 from src.dino import Dino
-from src.obstacle import create_obstacle, Cactus
+from src.obstacle import ObstacleQueue
+from src.collision import find_collision
+from src.features import extract
 from src.assets_loader import load_image
+from src import profiler
+from src.telemetry import add_steps, create_reporter
+from src.genome_registry import RegistryReporter
+from src.checkpoint import AsyncCheckpointer, resolve_checkpoint, restore_population
 
 # ── Màu sắc ───────────────────────────────────────────
 SKY_TOP    = (30,  30,  60)
@@ -31,6 +42,33 @@ PANEL_COL  = (10,  10,  30, 200)
 _bg_cache   = {}
 _tile_cache = {}
 
+# ── Tốc độ mô phỏng ──────────────────────────────────
+SPEED_MODES      = (1, 10, 0)    # frame mô phỏng / frame vẽ, 0 = không giới hạn
+SPEED_LABELS     = {1: 'x1', 10: 'x10', 0: 'MAX'}
+SPEED_KEYS       = {pygame.K_1: 1, pygame.K_2: 10, pygame.K_3: 0}
+TURBO_RENDER_FPS = 30            # số lần vẽ / giây ở chế độ MAX
+
+
+def _get_background(w, h):
+    """Gradient nền (cache theo kích thước màn hình)."""
+    key = (w, h)
+    if key not in _bg_cache:
+        bg = pygame.Surface((w, h))
+        for y in range(h):
+            t = y / h
+            r = int(SKY_TOP[0] + (SKY_BOT[0] - SKY_TOP[0]) * t)
+            g = int(SKY_TOP[1] + (SKY_BOT[1] - SKY_TOP[1]) * t)
+            b = int(SKY_TOP[2] + (SKY_BOT[2] - SKY_TOP[2]) * t)
+            pygame.draw.line(bg, (r, g, b), (0, y), (w, y))
+        _bg_cache[key] = bg
+    return _bg_cache[key]
+
+
+def _get_ground_tile(h):
+    if h not in _tile_cache:
+        _tile_cache[h] = load_image("tiles/Tile_01.png", (64, h))
+    return _tile_cache[h]
+
 
 def _rank_color(rank, total):
     """Gradient: rank 0 (tốt nhất) = xanh, rank N-1 (tệ nhất) = đỏ."""
@@ -41,24 +79,14 @@ def _rank_color(rank, total):
     return (r, g, b)
 
 
+class TrainingStopped(Exception):
+    """Người dùng dừng training (ESC / đóng cửa sổ)."""
+
+
 def _get_inputs(dino, obstacles, game_speed, ground_y=GROUND_Y):
-    nearest = None
-    min_dist = float('inf')
-    for obs in obstacles:
-        if obs.x > dino.x:
-            dist = obs.x - dino.x
-            if dist < min_dist:
-                min_dist = dist
-                nearest = obs
-    if nearest is None:
-        return [1.0, 0.5, 0.0, 0.0, 0.0]
-    return [
-        min(min_dist / 500, 1.0),
-        0.0 if isinstance(nearest, Cactus) else 1.0,
-        (game_speed - OBSTACLE_SPEED_MIN) / (OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN),
-        min((ground_y - dino.y) / 100, 1.0),
-        1.0 if dino.is_jumping else 0.0,
-    ]
+    """Inputs cho NEAT genome (NEAT_SCHEMA, cùng inputs với ai_handler).
+    Không dùng state_v1: num_inputs của neat-config.txt theo NEAT_SCHEMA."""
+    return extract(dino, obstacles, game_speed, NEAT_SCHEMA, ground_y)
 
 
 class NeatVisualTrainer:
@@ -82,13 +110,15 @@ class NeatVisualTrainer:
         self.best_score    = 0
         self.winner_genome = None
         self._stop         = False   # cờ Ctrl+C / close
+        self.speed_mode    = 1       # xem SPEED_MODES
+        self.sim_fps       = 0.0     # frame mô phỏng / giây (đo thực tế)
 
     # ── Game loop cho 1 generation ─────────────────────
 
     def eval_genomes_visual(self, genomes, config):
         """Hàm được gọi bởi neat.Population.run() mỗi generation."""
         if self._stop:
-            return
+            raise TrainingStopped()
 
         self.generation += 1
 
@@ -105,17 +135,28 @@ class NeatVisualTrainer:
             fitnesses.append(0.0)
 
         alive  = list(range(len(dinos)))
-        obstacles = []
+        obstacles = ObstacleQueue()
         score     = INITIAL_SCORE
         game_speed = OBSTACLE_SPEED_MIN
-        last_obs_x = 0
         frame = 0
         ground_off = 0
 
+        prof = profiler.get_profiler()
         running = True
+        last_render = 0
+        fps_frames, fps_start = 0, pygame.time.get_ticks()
         while running and alive:
+            # Chỉ xử lý event + vẽ ở frame render, các frame khác chỉ mô phỏng
+            if self.speed_mode:
+                render = frame % self.speed_mode == 0
+            else:
+                render = pygame.time.get_ticks() - last_render >= 1000 // TURBO_RENDER_FPS
+
             # ── Events ──
-            for event in pygame.event.get():
+            prof.begin('events')
+            for event in (pygame.event.get() if render else ()):
+                if prof.handle_event(event):
+                    continue
                 if event.type == pygame.QUIT:
                     self._stop = True
                     running = False
@@ -129,17 +170,23 @@ class NeatVisualTrainer:
                     if event.key == pygame.K_s:
                         running = False
                         break
+                    if event.key in SPEED_KEYS:
+                        self.speed_mode = SPEED_KEYS[event.key]
+                    elif event.key == pygame.K_t:
+                        i = SPEED_MODES.index(self.speed_mode)
+                        self.speed_mode = SPEED_MODES[(i + 1) % len(SPEED_MODES)]
+            prof.end('events')
 
             if not running:
                 break
 
             # ── Spawn obstacle ──
-            if last_obs_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
-                obs = create_obstacle(SCREEN_WIDTH + 50, min(game_speed, OBSTACLE_SPEED_MAX))
-                obstacles.append(obs)
-                last_obs_x = obs.x
+            prof.begin('physics')
+            if obstacles.last_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
+                obstacles.spawn(SCREEN_WIDTH + 50, min(game_speed, OBSTACLE_SPEED_MAX))
 
             # ── AI quyết định ──
+            add_steps(len(alive))
             to_kill = []
             for idx in alive:
                 gid, genome, net = nets[idx]
@@ -158,28 +205,25 @@ class NeatVisualTrainer:
                     obs.passed = True
                     score += 1
 
-            obstacles = [o for o in obstacles if not o.is_off_screen()]
-            if obstacles:
-                last_obs_x = max(o.x for o in obstacles)
+            obstacles.retire_offscreen()
 
             game_speed = min(
                 OBSTACLE_SPEED_MIN + (score // SPEED_INCREASE_INTERVAL) * SPEED_INCREASE_AMOUNT,
                 OBSTACLE_SPEED_MAX
             )
+            prof.end('physics')
 
             # ── Kiểm tra va chạm ──
             # Giảm margin từ 8 xuống 2 để tránh collision quá nhạy khi nhảy qua
             margin = 2
+            prof.begin('collision')
             for idx in list(alive):
-                d = dinos[idx]
-                dr = d.get_rect().inflate(-margin * 2, -margin * 2)
-                for obs in obstacles:
-                    if dr.colliderect(obs.get_rect().inflate(-margin, -margin)):
-                        _, genome, _ = nets[idx]
-                        genome.fitness = score * 10.0
-                        fitnesses[idx] = genome.fitness
-                        alive.remove(idx)
-                        break
+                if find_collision(dinos[idx], obstacles, margin * 2, margin) is not None:
+                    _, genome, _ = nets[idx]
+                    genome.fitness = score * 10.0
+                    fitnesses[idx] = genome.fitness
+                    alive.remove(idx)
+            prof.end('collision')
 
             # ── Cập nhật fitness của dino còn sống ──
             for idx in alive:
@@ -187,12 +231,22 @@ class NeatVisualTrainer:
                 genome.fitness = score * 10.0
                 fitnesses[idx] = genome.fitness
 
-            # ── Draw ──
             ground_off = (ground_off + game_speed) % 64
-            self._draw(dinos, alive, nets, fitnesses, obstacles,
-                       score, game_speed, ground_off, frame)
-            self.clock.tick(FPS)
             frame += 1
+            fps_frames += 1
+            now = pygame.time.get_ticks()
+            if now - fps_start >= 500:
+                self.sim_fps = fps_frames * 1000 / (now - fps_start)
+                fps_frames, fps_start = 0, now
+
+            # ── Draw ──
+            if render:
+                last_render = now
+                self._draw(dinos, alive, nets, fitnesses, obstacles,
+                           score, game_speed, ground_off, frame)
+                if self.speed_mode:
+                    self.clock.tick(FPS)
+            prof.next_frame()
 
         # Ghi nhận best
         for idx, (gid, genome, net) in enumerate(nets):
@@ -205,16 +259,13 @@ class NeatVisualTrainer:
 
     def _draw(self, dinos, alive_set, nets, fitnesses,
               obstacles, score, speed, ground_off, frame):
+        prof = profiler.get_profiler()
+        prof.begin('draw-bg')
         # Background gradient
-        for y in range(SCREEN_HEIGHT):
-            t = y / SCREEN_HEIGHT
-            r = int(SKY_TOP[0] + (SKY_BOT[0] - SKY_TOP[0]) * t)
-            g = int(SKY_TOP[1] + (SKY_BOT[1] - SKY_TOP[1]) * t)
-            b = int(SKY_TOP[2] + (SKY_BOT[2] - SKY_TOP[2]) * t)
-            pygame.draw.line(self.screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+        self.screen.blit(_get_background(SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0))
 
         # Ground
-        tile = load_image("tiles/Tile_01.png", (64, SCREEN_HEIGHT - GROUND_Y))
+        tile = _get_ground_tile(SCREEN_HEIGHT - GROUND_Y)
         if tile:
             off = int(ground_off) % 64
             for x in range(-64, SCREEN_WIDTH + 64, 64):
@@ -224,7 +275,9 @@ class NeatVisualTrainer:
                              (0, GROUND_Y, SCREEN_WIDTH, SCREEN_HEIGHT - GROUND_Y))
             pygame.draw.line(self.screen, GROUND_LN,
                              (0, GROUND_Y), (SCREEN_WIDTH, GROUND_Y), 2)
+        prof.end('draw-bg')
 
+        prof.begin('draw-sprites')
         # Sắp xếp dino theo fitness để gán màu
         n = len(dinos)
         sorted_alive = sorted(alive_set, key=lambda i: fitnesses[i], reverse=True)
@@ -259,12 +312,14 @@ class NeatVisualTrainer:
         # Obstacles
         for obs in obstacles:
             obs.draw(self.screen)
+        prof.end('draw-sprites')
 
         # ── HUD Panel góc trên trái ──
-        panel = pygame.Surface((260, 130), pygame.SRCALPHA)
+        prof.begin('hud')
+        panel = pygame.Surface((260, 174), pygame.SRCALPHA)
         panel.fill(PANEL_COL)
         self.screen.blit(panel, (8, 8))
-        pygame.draw.rect(self.screen, (100, 80, 180), (8, 8, 260, 130), 1, border_radius=6)
+        pygame.draw.rect(self.screen, (100, 80, 180), (8, 8, 260, 174), 1, border_radius=6)
 
         lines = [
             f"GEN   {self.generation:>4}",
@@ -272,6 +327,8 @@ class NeatVisualTrainer:
             f"SCORE {score:>5}",
             f"FITNESS {self.best_fitness:>8.0f}",
             f"SPEED {speed:>5.1f}",
+            f"SIM   {SPEED_LABELS[self.speed_mode]:>4}",
+            f"FPS   {self.sim_fps:>6.0f}",
         ]
         for i, ln in enumerate(lines):
             surf = self.font_mono.render(ln, True, TEXT_COL)
@@ -291,28 +348,58 @@ class NeatVisualTrainer:
             self.screen.blit(t, (SCREEN_WIDTH - 132, 12 + i * 22))
 
         # ── Góc dưới: phím tắt ──
-        hint = self.font_small.render("ESC - Dừng training  |  S - Bỏ qua generation", True, (150, 150, 200))
+        hint = self.font_small.render("ESC - Dừng training  |  S - Bỏ qua generation  |  1/2/3 - Tốc độ x1/x10/MAX", True, (150, 150, 200))
         self.screen.blit(hint, (SCREEN_WIDTH // 2 - hint.get_width() // 2, SCREEN_HEIGHT - 22))
+        prof.end('hud')
 
-        pygame.display.flip()
+        profiler.flip()
 
     # ── Public API ──────────────────────────────────────
 
-    def run(self, generations=20):
-        """Chạy NEAT visual training."""
-        population = neat.Population(self.config)
+    def _extra_state(self):
+        return {'generation': self.generation, 'best_fitness': self.best_fitness,
+                'best_score': self.best_score, 'winner_genome': self.winner_genome}
+
+    def run(self, generations=20, resume=None):
+        """Chạy NEAT visual training. resume: đường dẫn checkpoint hoặc 'latest'."""
+        population = None
+        if resume:
+            path = resolve_checkpoint(resume, 'neat_visual')
+            if path:
+                population, extra = restore_population(path, self.config)
+                if extra:
+                    self.generation    = extra['generation']
+                    self.best_fitness  = extra['best_fitness']
+                    self.best_score    = extra['best_score']
+                    self.winner_genome = extra['winner_genome']
+            else:
+                print("Không tìm thấy checkpoint, train từ đầu")
+        if population is None:
+            population = neat.Population(self.config)
+        checkpointer = AsyncCheckpointer('neat_visual', extra_state=self._extra_state)
+        checkpointer.best_genome = population.best_genome
         population.add_reporter(neat.StdOutReporter(True))
         population.add_reporter(neat.StatisticsReporter())
+        population.add_reporter(RegistryReporter(self.config))
+        population.add_reporter(checkpointer)
+        telemetry = create_reporter('neat_visual', self.config, resumed_from=resume)
+        if telemetry:
+            population.add_reporter(telemetry)
 
         try:
             population.run(self.eval_genomes_visual, generations)
-        except KeyboardInterrupt:
-            print("\nTraining dừng sớm.")
+        except (KeyboardInterrupt, TrainingStopped):
+            print("\nTraining dừng sớm, lưu checkpoint...")
+            checkpointer.save_population(population)
+        finally:
+            checkpointer.wait()
+            if telemetry:
+                telemetry.close()
 
         return self.winner_genome
 
 
-def run_neat_visual(screen, config_path, generations=20):
+def run_neat_visual(screen, config_path, generations=20, resume=None):
     """
     Entry point: tạo NeatVisualTrainer, chạy training và trả về genome tốt nhất.
     """
@@ -321,6 +408,9 @@ def run_neat_visual(screen, config_path, generations=20):
         neat.DefaultSpeciesSet, neat.DefaultStagnation,
         config_path
     )
+    from src.ai_handler import check_schema
+    if not check_schema(config):
+        return None, config
     trainer = NeatVisualTrainer(screen, config)
-    winner = trainer.run(generations=generations)
+    winner = trainer.run(generations=generations, resume=resume)
     return winner, config
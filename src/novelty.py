@@ -0,0 +1,123 @@
+"""
+Novelty - Novelty search cho NEAT (tùy chọn)
+
+Mỗi genome có 1 behaviour descriptor nhỏ (BEHAVIOR_SIZE float):
+  [0:4]   tỉ lệ frame theo action (không làm gì / nhảy / cúi / nhảy + cúi)
+  [4:10]  histogram khoảng cách tới obstacle gần nhất lúc bắt đầu nhảy
+  [10]    thời gian sống (steps / MAX_STEPS)
+
+Novelty = khoảng cách trung bình tới k hàng xóm gần nhất trong archive +
+population hiện tại. k-NN tính brute-force bằng numpy (||a||² + ||b||² - 2ab,
+chia chunk) nên archive vài chục nghìn entry vẫn chỉ tốn vài ms/generation.
+
+Fitness dùng để chọn lọc = (1 - w) * fitness + w * novelty_chuẩn_hóa * max_fitness.
+Fitness gốc giữ trong genome.raw_fitness (registry dùng giá trị này).
+"""
+import numpy as np
+
+from config.settings import NOVELTY_K, NOVELTY_WEIGHT, NOVELTY_ARCHIVE_MAX, NOVELTY_ADD_PER_GEN
+
+JUMP_BINS = 6
+BEHAVIOR_SIZE = 4 + JUMP_BINS + 1
+KNN_CHUNK = 8192          # số entry archive xử lý mỗi lần (giới hạn RAM ma trận khoảng cách)
+
+
+def behavior_descriptor(action_counts, jump_dists, steps, max_steps):
+    """Descriptor từ số frame mỗi action, list dist1 lúc nhảy và số step."""
+    desc = np.zeros(BEHAVIOR_SIZE, dtype=np.float32)
+    if steps:
+        desc[0:4] = np.asarray(action_counts, dtype=np.float32) / steps
+    if jump_dists:
+        bins = np.minimum((np.asarray(jump_dists) * JUMP_BINS).astype(np.int64), JUMP_BINS - 1)
+        desc[4:4 + JUMP_BINS] = np.bincount(bins, minlength=JUMP_BINS) / len(jump_dists)
+    desc[-1] = steps / max_steps
+    return desc
+
+
+class NoveltyArchive:
+    """Archive descriptor (ring buffer numpy) + tính novelty bằng k-NN."""
+
+    def __init__(self, k=NOVELTY_K, max_size=NOVELTY_ARCHIVE_MAX, add_per_gen=NOVELTY_ADD_PER_GEN):
+        self.k = k
+        self.max_size = max_size
+        self.add_per_gen = add_per_gen
+        self.data = np.zeros((min(1024, max_size), BEHAVIOR_SIZE), dtype=np.float32)
+        self.sq_norms = np.zeros(len(self.data), dtype=np.float32)
+        self.size = 0
+        self.next = 0          # vị trí ghi tiếp theo khi đã đầy (ghi đè entry cũ nhất)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, descriptors):
+        for desc in descriptors:
+            if self.size < self.max_size:
+                if self.size == len(self.data):
+                    new_len = min(len(self.data) * 2, self.max_size)
+                    self.data = np.resize(self.data, (new_len, BEHAVIOR_SIZE))
+                    self.sq_norms = np.resize(self.sq_norms, new_len)
+                i = self.size
+                self.size += 1
+            else:
+                i = self.next
+                self.next = (self.next + 1) % self.max_size
+            self.data[i] = desc
+            self.sq_norms[i] = desc @ desc
+
+    def novelty(self, descriptors):
+        """Novelty của từng descriptor (mảng N x BEHAVIOR_SIZE) so với archive + chính batch."""
+        queries = np.asarray(descriptors, dtype=np.float32)
+        n = len(queries)
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        k = min(self.k, self.size + n - 1)
+        if k <= 0:
+            return np.zeros(n, dtype=np.float32)
+
+        # Khoảng cách trong batch, bỏ chính nó
+        d_self = q_norms[:, None] + q_norms[None, :] - 2 * queries @ queries.T
+        np.fill_diagonal(d_self, np.inf)
+        best = np.partition(d_self, k - 1, axis=1)[:, :k] if n - 1 >= k else d_self
+
+        # Gộp dần k nhỏ nhất với từng chunk của archive
+        for start in range(0, self.size, KNN_CHUNK):
+            chunk = self.data[start:min(start + KNN_CHUNK, self.size)]
+            norms = self.sq_norms[start:start + len(chunk)]
+            d = q_norms[:, None] + norms[None, :] - 2 * queries @ chunk.T
+            merged = np.concatenate([best, d], axis=1)
+            best = np.partition(merged, k - 1, axis=1)[:, :k] if merged.shape[1] > k else merged
+
+        best = np.sqrt(np.maximum(best[:, :k], 0.0))
+        return best.mean(axis=1)
+
+    def score(self, genomes, descriptors, weight=NOVELTY_WEIGHT):
+        """Gán genome.fitness = blend fitness + novelty, rồi thêm các genome
+        mới lạ nhất vào archive. genome.fitness lúc gọi phải là fitness gốc.
+        Trả về mảng novelty."""
+        descriptors = np.asarray(descriptors, dtype=np.float32)
+        nov = self.novelty(descriptors)
+        raw = np.array([g.fitness for g in genomes], dtype=np.float64)
+        max_raw = raw.max() if len(raw) and raw.max() > 0 else 1.0
+        max_nov = nov.max() if len(nov) and nov.max() > 0 else 1.0
+        blended = (1 - weight) * raw + weight * (nov / max_nov) * max_raw
+        for genome, r, b in zip(genomes, raw, blended):
+            genome.raw_fitness = float(r)
+            genome.fitness = float(b)
+        top = np.argsort(nov)[::-1][:self.add_per_gen]
+        self.add(descriptors[top])
+        return nov
+
+
+_archive = None
+
+
+def get_archive():
+    global _archive
+    if _archive is None:
+        _archive = NoveltyArchive()
+    return _archive
+
+
+def set_archive(archive):
+    """Thay archive (vd khi resume từ checkpoint)."""
+    global _archive
+    _archive = archive
@@ -5,6 +5,7 @@ Cactus dùng tile sprite hoặc fallback vẽ tay.
 """
 import pygame
 import random
+from collections import deque
 from src.assets_loader import get_sheet, load_image
 from config.settings import (
     GROUND_Y,
@@ -16,6 +17,10 @@ from config.settings import (
 _BIRD_ANIM_FRAMES = {"move": 6, "idle": 3}
 _BIRD_ANIM_SPEED  = 6   # game-frames mỗi sprite-frame
 
+# Độ cao bird (top) theo GROUND_Y: thấp / giữa / cao
+BIRD_HEIGHTS = (GROUND_Y - 130, GROUND_Y - 85, GROUND_Y - 50)
+CACTUS_CHANCE = 0.7
+
 # Enhanced cactus cache với LRU
 _cactus_cache = {}
 _CACTUS_CACHE_MAX_SIZE = 10
@@ -36,15 +41,31 @@ def _get_cactus_sprite(w, h):
 
 class Obstacle:
     """Base class với __slots__ để tối ưu memory"""
-    __slots__ = ('x', 'speed', 'passed')
+    __slots__ = ('x', 'speed', 'passed', '_hitbox', 'x0', 'frames')
+    is_bird = False  # class attribute - thay cho isinstance() khi trích xuất features
 
     def __init__(self, x, speed):
+        self.reset(x, speed, 0)
+
+    def reset(self, x, speed, variant):
+        """Tái sử dụng instance từ ObstaclePool thay vì tạo mới."""
         self.x = x
         self.speed = speed
         self.passed = False
+        self._hitbox = None  # cache của src.collision.obstacle_hitbox
+        # x sau n lần update() = x0 - n * speed (dạng đóng, không cộng dồn sai số),
+        # nên advance(n) và các hàm đếm frame của DinoEnv khớp đúng từng bit
+        self.x0 = x
+        self.frames = 0
 
     def update(self):
-        self.x -= self.speed
+        self.frames += 1
+        self.x = self.x0 - self.frames * self.speed
+
+    def advance(self, n):
+        """Tương đương gọi update() n lần, O(1)."""
+        self.frames += n
+        self.x = self.x0 - self.frames * self.speed
 
     def draw(self, screen):
         raise NotImplementedError
@@ -60,10 +81,14 @@ class Cactus(Obstacle):
     """Cactus với __slots__"""
     __slots__ = ('is_large', 'width', 'height', 'y')
 
-    def __init__(self, x, speed):
-        super().__init__(x, speed)
-        self.is_large = random.choice([True, False])
+    def __init__(self, x, speed, variant=0):
         self.width = CACTUS_WIDTH
+        self.reset(x, speed, variant)
+
+    def reset(self, x, speed, variant):
+        """variant: 1 = cactus lớn, 0 = cactus nhỏ"""
+        super().reset(x, speed, variant)
+        self.is_large = bool(variant)
         self.height = CACTUS_HEIGHT_LARGE if self.is_large else CACTUS_HEIGHT_SMALL
         self.y = GROUND_Y - self.height
 
@@ -89,16 +114,20 @@ class Cactus(Obstacle):
 class Bird(Obstacle):
     """Chim với animation và __slots__"""
     __slots__ = ('width', 'height', 'y', 'anim_frame', 'anim_timer', '_anim')
+    is_bird = True
 
-    def __init__(self, x, speed):
-        super().__init__(x, speed)
+    def __init__(self, x, speed, variant=0):
         self.width = BIRD_WIDTH
         self.height = BIRD_HEIGHT
-        # Calculate heights dynamically based on GROUND_Y
-        self.y = random.choice([GROUND_Y - 130, GROUND_Y - 85, GROUND_Y - 50])
+        self._anim = "move"   # dùng move.png làm animation chính
+        self.reset(x, speed, variant)
+
+    def reset(self, x, speed, variant):
+        """variant: chỉ số trong BIRD_HEIGHTS"""
+        super().reset(x, speed, variant)
+        self.y = BIRD_HEIGHTS[variant]
         self.anim_frame = 0
         self.anim_timer = 0
-        self._anim = "move"   # dùng move.png làm animation chính
 
     def update(self):
         super().update()
@@ -108,6 +137,13 @@ class Bird(Obstacle):
             num = _BIRD_ANIM_FRAMES.get(self._anim, 6)
             self.anim_frame = (self.anim_frame + 1) % num
 
+    def advance(self, n):
+        super().advance(n)
+        t = self.anim_timer + n
+        num = _BIRD_ANIM_FRAMES.get(self._anim, 6)
+        self.anim_frame = (self.anim_frame + t // _BIRD_ANIM_SPEED) % num
+        self.anim_timer = t % _BIRD_ANIM_SPEED
+
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.width, self.height)
 
@@ -125,7 +161,100 @@ class Bird(Obstacle):
                            (self.x + self.width - 11, self.y + 12), 2)
 
 
-def create_obstacle(x, speed):
-    if random.random() < 0.7:
-        return Cactus(x, speed)
-    return Bird(x, speed)
+def roll_obstacle(rng=random):
+    """Chọn loại obstacle với đúng 1 lần gọi rng.random().
+
+    Trả về (is_bird, variant): cactus 70% (lớn/nhỏ mỗi loại một nửa),
+    bird 30% (3 độ cao như nhau).
+    """
+    u = rng.random()
+    if u < CACTUS_CHANCE:
+        return False, int(u < CACTUS_CHANCE / 2)
+    step = (1 - CACTUS_CHANCE) / len(BIRD_HEIGHTS)
+    return True, min(int((u - CACTUS_CHANCE) / step), len(BIRD_HEIGHTS) - 1)
+
+
+def create_obstacle(x, speed, rng=random):
+    """Tạo obstacle ngẫu nhiên. rng: random.Random riêng để tái lập (mặc định global)."""
+    is_bird, variant = roll_obstacle(rng)
+    if is_bird:
+        return Bird(x, speed, variant)
+    return Cactus(x, speed, variant)
+
+
+class ObstaclePool:
+    """Pool tái sử dụng instance Cactus/Bird đã ra khỏi màn hình."""
+
+    def __init__(self):
+        self._free = {False: [], True: []}
+
+    def acquire(self, x, speed, rng=random, kind=None):
+        """kind: (is_bird, variant) đã biết trước (course tính sẵn), None = roll bằng rng."""
+        is_bird, variant = roll_obstacle(rng) if kind is None else kind
+        free = self._free[is_bird]
+        if free:
+            obs = free.pop()
+            obs.reset(x, speed, variant)
+            return obs
+        if is_bird:
+            return Bird(x, speed, variant)
+        return Cactus(x, speed, variant)
+
+    def release(self, obs):
+        self._free[obs.is_bird].append(obs)
+
+
+# Pool dùng chung cho mọi ObstacleQueue (game chạy đơn luồng)
+_shared_pool = ObstaclePool()
+
+
+class ObstacleQueue:
+    """Danh sách obstacle theo thứ tự x tăng dần (ring buffer trên deque).
+
+    Obstacle luôn spawn ở mép phải và cách nhau >= MIN_OBSTACLE_SPAWN_DISTANCE,
+    nên thứ tự spawn cũng là thứ tự x: obstacle ra khỏi màn hình luôn ở đầu
+    hàng đợi (retire O(1)) và obstacle xa nhất luôn ở cuối (last_x O(1)).
+    Hỗ trợ duyệt, len(), bool() và index như list.
+    """
+
+    def __init__(self, pool=None):
+        self._items = deque()
+        self.pool = pool if pool is not None else _shared_pool
+        self._last_x = 0
+
+    def spawn(self, x, speed, rng=random, kind=None):
+        obs = self.pool.acquire(x, speed, rng, kind)
+        self._items.append(obs)
+        return obs
+
+    @property
+    def last_x(self):
+        """x của obstacle xa nhất; giữ giá trị cũ khi hàng đợi rỗng (như last_obstacle_x)."""
+        if self._items:
+            return self._items[-1].x
+        return self._last_x
+
+    def retire_offscreen(self):
+        """Bỏ các obstacle đã ra khỏi màn hình bên trái, trả về pool."""
+        items = self._items
+        while items and items[0].is_off_screen():
+            obs = items.popleft()
+            self._last_x = obs.x
+            self.pool.release(obs)
+
+    def clear(self):
+        while self._items:
+            self.pool.release(self._items.popleft())
+        self._last_x = 0
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
@@ -0,0 +1,308 @@
+"""
+Physics Tables - Bảng cung nhảy tính trước cho settings hiện tại
+
+JumpTable replay đúng phép float của Dino.update() cho 1 cú nhảy từ ground
+(cùng gravity suốt cú nhảy), rồi lưu:
+  ys          : y của dino sau frame 1..airtime (frame cuối = chạm đất)
+  apex_frame  : frame cao nhất, apex_height: độ cao tối đa (px)
+  airtime     : số frame trên không
+  và với mỗi loại obstacle (hitbox sau margin): prefix sum các frame mà dino
+  chồng theo trục y với obstacle -> hỏi "nhảy bây giờ có qua được không" O(1).
+
+Frame n sau khi nhảy, obstacle ở khoảng cách d = obs.x - dino.x chồng theo
+trục x với dino khi A <= d - n * speed < B (A, B nguyên, tính từ hitbox, khớp
+int() của find_collision vì obs.x > 0 trong vùng này). Nên các frame chồng
+theo x là 1 đoạn [n_a, n_b] và chỉ cần đếm frame bị chặn trong đoạn đó.
+Giả định dino đứng (không cúi) và không nhảy lại sau khi chạm đất.
+
+Bảng được cache theo physics config (velocity, gravity, kích thước, ground, margin).
+AI không bao giờ thả phím nhảy nên dùng JUMP_HOLD_GRAVITY (mặc định).
+
+Chạy:
+    python -m src.physics_tables     # in cung nhảy, clearance và kiểm tra course có giải được
+"""
+import math
+import random
+import sys
+
+import numpy as np
+
+from config.settings import (
+    JUMP_VELOCITY, GRAVITY, JUMP_HOLD_GRAVITY, DINO_WIDTH, DINO_HEIGHT, GROUND_Y,
+    OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX, SPEED_INCREASE_AMOUNT,
+    MIN_OBSTACLE_SPAWN_DISTANCE,
+)
+from src.collision import DINO_MARGIN, OBSTACLE_MARGIN
+
+# Các mức tốc độ obstacle có thể có (game_speed tăng SPEED_INCREASE_AMOUNT mỗi mức)
+SPEED_LEVELS = tuple(sorted({min(OBSTACLE_SPEED_MIN + k * SPEED_INCREASE_AMOUNT, OBSTACLE_SPEED_MAX)
+                             for k in range(int((OBSTACLE_SPEED_MAX - OBSTACLE_SPEED_MIN)
+                                                / SPEED_INCREASE_AMOUNT) + 2)}))
+
+
+def obstacle_kind(obs, margin=OBSTACLE_MARGIN):
+    """(top, bottom, left_offset, width) hitbox của obstacle - key của bảng.
+    Giống collision.obstacle_hitbox nhưng không đụng cache trên obstacle
+    (DinoEnv có thể va chạm với margin khác)."""
+    half = margin // 2
+    top = int(obs.y) + half
+    return top, top + obs.height - margin, half, obs.width - margin
+
+
+class JumpTable:
+    """Cung nhảy + bảng clearance cho 1 physics config."""
+
+    def __init__(self, velocity=JUMP_VELOCITY, gravity=JUMP_HOLD_GRAVITY,
+                 dino_width=DINO_WIDTH, dino_height=DINO_HEIGHT, ground_y=GROUND_Y,
+                 dino_margin=DINO_MARGIN, obstacle_margin=OBSTACLE_MARGIN):
+        self.velocity = velocity
+        self.gravity = gravity
+        self.dino_width = dino_width
+        self.dino_height = dino_height
+        self.dino_margin = dino_margin
+        self.obstacle_margin = obstacle_margin
+        self.ground_level = ground_y - dino_height
+
+        # Cùng thứ tự phép toán với Dino.update()
+        y, vel = self.ground_level, velocity
+        ys, vels = [], []
+        while True:
+            vel += gravity
+            y += vel
+            if y >= self.ground_level:
+                ys.append(self.ground_level)
+                vels.append(0)
+                break
+            ys.append(y)
+            vels.append(vel)
+        self.ys = ys
+        self.vels = vels
+        self.airtime = len(ys)
+        top = min(ys)
+        self.apex_frame = ys.index(top) + 1
+        self.apex_height = self.ground_level - top
+        self._blocked = {}
+
+    def jump_frame(self, dino):
+        """Số frame dino đã ở trên không theo bảng này (0 nếu đang trên ground),
+        None nếu cú nhảy không khớp bảng (vd người chơi thả phím sớm)."""
+        if not dino.is_jumping:
+            return 0
+        k = round((dino.vel_y - self.velocity) / self.gravity)
+        if 1 <= k < self.airtime and abs(self.vels[k - 1] - dino.vel_y) < 1e-6:
+            return k
+        return None
+
+    def time_to_land(self, dino):
+        """Số frame còn lại tới khi chạm đất (0 trên ground), None nếu không khớp bảng."""
+        k = self.jump_frame(dino)
+        return None if k is None else (self.airtime - k if k else 0)
+
+    def _blocked_prefix(self, kind):
+        """(prefix, ground_blocked): prefix[n] = số frame 1..n dino chồng theo y với kind."""
+        entry = self._blocked.get(kind)
+        if entry is None:
+            o_top, o_bottom = kind[0], kind[1]
+            half = self.dino_margin // 2
+            h = self.dino_height - self.dino_margin
+            prefix = [0]
+            for y in self.ys:
+                d_top = int(y) + half
+                prefix.append(prefix[-1] + (d_top < o_bottom and o_top < d_top + h))
+            ground_top = int(self.ground_level) + half
+            entry = (np.array(prefix), ground_top < o_bottom and o_top < ground_top + h)
+            self._blocked[kind] = entry
+        return entry
+
+    def _x_bounds(self, kind):
+        """(A, B): obstacle chồng dino theo x khi A <= obs.x - dino.x < B."""
+        half = self.dino_margin // 2
+        off, width = kind[2], kind[3]
+        return half - off - width + 1, half + self.dino_width - self.dino_margin - off
+
+    def blocked_count(self, kind, first, last):
+        """Số frame trong [first, last] (tính từ lúc nhảy, >= 1) dino chồng theo y với kind."""
+        prefix, ground = self._blocked_prefix(kind)
+        extra = 0
+        if last > self.airtime:
+            extra = (last - max(first, self.airtime + 1) + 1) * ground if ground else 0
+            last = self.airtime
+        if first <= last:
+            extra += prefix[last] - prefix[first - 1]
+        return extra
+
+    def will_clear(self, dist, speed, kind, start=0):
+        """Nhảy (hoặc đang nhảy được start frame) thì obstacle ở khoảng cách dist,
+        tốc độ speed có đi qua mà không va chạm không. O(1)."""
+        a, b = self._x_bounds(kind)
+        n_a = max(1, math.floor((dist - b) / speed) + 1)
+        n_b = math.floor((dist - a) / speed)
+        if n_b < n_a:
+            return True
+        return self.blocked_count(kind, start + n_a, start + n_b) == 0
+
+    def will_clear_batch(self, dist, speed, kinds, start):
+        """will_clear cho N obstacle: dist, speed, start mảng (N,), kinds mảng (N, 4)."""
+        out = np.ones(len(dist), dtype=bool)
+        if not len(dist):
+            return out
+        uniq, inverse = np.unique(np.asarray(kinds, dtype=np.int64), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for j, kind in enumerate(map(tuple, uniq.tolist())):
+            m = inverse == j
+            prefix, ground = self._blocked_prefix(kind)
+            a, b = self._x_bounds(kind)
+            n_a = np.maximum(1, np.floor((dist[m] - b) / speed[m]).astype(np.int64) + 1)
+            n_b = np.floor((dist[m] - a) / speed[m]).astype(np.int64)
+            first, last = start[m] + n_a, start[m] + n_b
+            last_air = np.minimum(last, self.airtime)
+            count = np.where(first <= last_air,
+                             prefix[np.clip(last_air, 0, self.airtime)]
+                             - prefix[np.clip(first - 1, 0, self.airtime)], 0)
+            if ground:
+                count = count + np.maximum(0, last - np.maximum(first, self.airtime + 1) + 1)
+            out[m] = (n_b < n_a) | (count == 0)
+        return out
+
+    def jump_frame_batch(self, jumping, vel_y):
+        """jump_frame cho mảng (N,); -1 khi không khớp bảng."""
+        k = np.rint((vel_y - self.velocity) / self.gravity).astype(np.int64)
+        valid = (k >= 1) & (k < self.airtime)
+        vels = np.asarray(self.vels)
+        valid &= np.abs(vels[np.clip(k - 1, 0, self.airtime - 1)] - vel_y) < 1e-6
+        return np.where(jumping, np.where(valid, k, -1), 0)
+
+    def safe_runs(self, kind):
+        """Các đoạn frame liên tiếp [f1, f2] không chồng theo y (f2 = inf nếu kéo dài sau khi đáp)."""
+        prefix, ground = self._blocked_prefix(kind)
+        runs, start = [], None
+        for n in range(1, self.airtime + 1):
+            free = prefix[n] == prefix[n - 1]
+            if free and start is None:
+                start = n
+            elif not free and start is not None:
+                runs.append((start, n - 1))
+                start = None
+        # Frame airtime là lúc đã chạm đất: còn free thì ground cũng free
+        if start is not None:
+            runs.append((start, math.inf))
+        return runs
+
+    def clear_ranges(self, speed, kind):
+        """Các khoảng [lo, hi) của dist = obs.x - dino.x mà nhảy ngay thì qua được."""
+        a, b = self._x_bounds(kind)
+        return [(b + (f1 - 1) * speed, a + (f2 + 1) * speed) for f1, f2 in self.safe_runs(kind)]
+
+    def clearance_table(self, kind):
+        """{speed: clear_ranges} cho mọi mức tốc độ của game."""
+        return {speed: self.clear_ranges(speed, kind) for speed in SPEED_LEVELS}
+
+    def jump_windows(self, dist, speed, kind):
+        """Các khoảng số frame chờ t (thực) trước khi nhảy để qua được obstacle."""
+        return [((dist - hi) / speed, (dist - lo) / speed) for lo, hi in self.clear_ranges(speed, kind)]
+
+    def blocks_ground(self, kind):
+        """True nếu dino đứng trên ground va chạm obstacle kind (phải nhảy qua)."""
+        return self._blocked_prefix(kind)[1]
+
+    def pair_clearable(self, dist1, kind1, dist2, kind2, speed):
+        """2 obstacle liên tiếp (cùng tốc độ) có qua được bằng nhảy không: 1 cú nhảy
+        qua cả 2, hoặc nhảy qua obstacle 1 rồi nhảy lại ngay khi chạm đất.
+        Obstacle đi dưới được (bird cao) coi như không cần nhảy; không xét cúi."""
+        w1 = [(max(lo, 0.0), hi) for lo, hi in self.jump_windows(dist1, speed, kind1) if hi > 0]
+        w2 = [(max(lo, 0.0), hi) for lo, hi in self.jump_windows(dist2, speed, kind2) if hi > 0]
+        if not self.blocks_ground(kind1):
+            return bool(w2) or not self.blocks_ground(kind2)
+        if not self.blocks_ground(kind2):
+            return bool(w1)
+        # Thời điểm nhảy là số frame nguyên t với lo <= t < hi
+        for lo1, hi1 in w1:
+            t1 = math.ceil(lo1)
+            if t1 >= hi1:
+                continue
+            for lo2, hi2 in w2:
+                if math.ceil(max(lo1, lo2)) < min(hi1, hi2):
+                    return True
+                if max(math.ceil(lo2), t1 + self.airtime) < hi2:
+                    return True
+        return False
+
+
+_tables = {}
+
+
+def get_jump_table(gravity=JUMP_HOLD_GRAVITY, ground_y=GROUND_Y,
+                   dino_margin=DINO_MARGIN, obstacle_margin=OBSTACLE_MARGIN):
+    """JumpTable cho settings hiện tại, cache theo physics config."""
+    key = (JUMP_VELOCITY, gravity, DINO_WIDTH, DINO_HEIGHT, ground_y, dino_margin, obstacle_margin)
+    table = _tables.get(key)
+    if table is None:
+        table = JumpTable(JUMP_VELOCITY, gravity, DINO_WIDTH, DINO_HEIGHT, ground_y,
+                          dino_margin, obstacle_margin)
+        _tables[key] = table
+    return table
+
+
+# ── Kiểm tra course ─────────────────────────────────────
+
+def _course_kinds():
+    """{tên: kind} của các loại obstacle mà spawner tạo ra."""
+    from src.obstacle import Cactus, Bird, BIRD_HEIGHTS
+    kinds = {'cactus_small': obstacle_kind(Cactus(0, 0, 0)),
+             'cactus_large': obstacle_kind(Cactus(0, 0, 1))}
+    for i in range(len(BIRD_HEIGHTS)):
+        kinds[f'bird_{i}'] = obstacle_kind(Bird(0, 0, i))
+    return kinds
+
+
+def check_course(seed, speed, count=200, table=None):
+    """Số cặp obstacle liên tiếp (trong count obstacle do spawner sinh với seed,
+    tốc độ cố định) không qua được bằng nhảy. Trả về (số cặp lỗi, số cặp)."""
+    from src.obstacle import Cactus, Bird, roll_obstacle
+    table = table or get_jump_table()
+    rng = random.Random(seed)
+    # Spawner (GameManager / DinoEnv): obstacle mới ở SCREEN_WIDTH + 50 ngay khi
+    # obstacle trước qua SCREEN_WIDTH - MIN_OBSTACLE_SPAWN_DISTANCE
+    travel = 50 + MIN_OBSTACLE_SPAWN_DISTANCE
+    gap = (math.floor(travel / speed) + 1) * speed
+    # Obstacle đầu đặt đủ xa để mọi thời điểm nhảy đều ở phía trước
+    dist1 = table.airtime * speed + 200
+    prev_kind = None
+    bad = 0
+    for _ in range(count):
+        is_bird, variant = roll_obstacle(rng)
+        kind = obstacle_kind(Bird(0, speed, variant) if is_bird else Cactus(0, speed, variant))
+        if prev_kind is not None and not table.pair_clearable(dist1, prev_kind, dist1 + gap, kind, speed):
+            bad += 1
+        prev_kind = kind
+    return bad, count - 1
+
+
+def main(argv=None):
+    for name, gravity in (('giữ phím', JUMP_HOLD_GRAVITY), ('thả phím', GRAVITY)):
+        t = get_jump_table(gravity)
+        print(f"Nhảy ({name}, gravity {gravity}): airtime {t.airtime} frame, "
+              f"apex frame {t.apex_frame}, cao {t.apex_height:.1f}px")
+
+    table = get_jump_table()
+    kinds = _course_kinds()
+    print("\nKhoảng cách nhảy qua được (obs.x - dino.x, px):")
+    for speed in (SPEED_LEVELS[0], SPEED_LEVELS[len(SPEED_LEVELS) // 2], SPEED_LEVELS[-1]):
+        print(f"  speed {speed:g}")
+        for name, kind in kinds.items():
+            ranges = ', '.join(f"[{lo:.0f}, {hi:.0f})" for lo, hi in table.clear_ranges(speed, kind))
+            print(f"    {name:13s} {ranges or '-'}")
+
+    print("\nCặp obstacle không nhảy qua được (spawner mặc định, 200 obstacle x 20 seed):")
+    for speed in (SPEED_LEVELS[0], SPEED_LEVELS[len(SPEED_LEVELS) // 2], SPEED_LEVELS[-1]):
+        bad = total = 0
+        for seed in range(20):
+            b, n = check_course(seed, speed, table=table)
+            bad += b
+            total += n
+        print(f"  speed {speed:g}: {bad}/{total} ({bad / total:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Policy Table - Chưng cất policy AI thành bảng tra quyết định O(1) mỗi frame
+
+AI trong game (network NEAT của PVE, MLP supervised qua predict_action) chạy
+cả forward pass mỗi frame. Policy table lấy mẫu policy trên lưới đều các
+feature quyết định (khoảng cách, loại/độ cao obstacle, tốc độ, độ cao dino,
+đang nhảy/cúi), lưu action bitmask (bit 0 = nhảy, bit 1 = cúi) vào 1 mảng
+uint8. Khi chơi, mỗi feature được làm tròn về điểm lưới gần nhất rồi tra mảng:
+vài phép nhân cộng, không phụ thuộc kích thước network.
+
+Feature không thuộc lưới (dist2 của neat_v1...) cố định ở giá trị mặc định.
+Độ khớp với policy gốc được đo trên các frame thật của DinoEnv do policy gốc
+điều khiển và lưu kèm bảng.
+
+Chạy:
+    python -m src.policy_table build --policy neat
+    python -m src.policy_table build --policy supervised --episodes 5
+    python -m src.policy_table eval --policy neat --episodes 50
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from config.settings import POLICY_TABLE_FILE, POLICY_TABLE_EPISODES, NEAT_SCHEMA
+from src.features import FEATURE_SCHEMAS, NEAT_V1, NEAT_V2, COLLECTOR_V1
+
+POLICIES = ('neat', 'supervised')
+
+# Trục lưới mỗi schema: (feature, số điểm lưới trên [0, 1]). Điểm lưới gồm cả
+# 2 đầu mút nên giá trị rời rạc 0 / 0.5 / 1 (không có obstacle, đang nhảy...)
+# nằm đúng trên lưới.
+GRID_AXES = {
+    NEAT_V1: (('dist1', 51), ('type1', 21), ('dist2', 5), ('speed', 6),
+              ('height', 11), ('jumping', 2), ('ducking', 2)),
+    # land gần như xác định bởi height + jumping nên cố định; dist2 thưa hơn để bảng không quá lớn
+    NEAT_V2: (('dist1', 51), ('type1', 21), ('dist2', 3), ('speed', 6),
+              ('height', 11), ('jumping', 2), ('ducking', 2), ('clear1', 2)),
+    COLLECTOR_V1: (('dist1', 51), ('is_bird', 2), ('speed', 6),
+                   ('height', 11), ('jumping', 2), ('ducking', 2)),
+}
+
+# Giá trị của feature không thuộc lưới khi lấy mẫu policy
+_FIXED = {'dist2': 1.0, 'bias': 0.5}
+
+# Activation / aggregation của neat-python dạng numpy (khớp bản scalar)
+_NP_ACTIVATIONS = {
+    'tanh_activation': lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    'sigmoid_activation': lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    'relu_activation': lambda z: np.maximum(z, 0.0),
+    'identity_activation': lambda z: z,
+}
+_NP_AGGREGATIONS = {
+    'sum_aggregation': lambda xs, n: np.sum(xs, axis=0) if xs else np.zeros(n),
+    'product_aggregation': lambda xs, n: np.prod(xs, axis=0) if xs else np.ones(n),
+}
+
+
+def get_table_path(policy):
+    return os.path.join(os.path.dirname(__file__), '..', POLICY_TABLE_FILE.format(policy=policy))
+
+
+class PolicyTable:
+    """Bảng action trên lưới, cùng API activate() với network NEAT."""
+
+    def __init__(self, schema, axes, actions, meta=None):
+        self.schema = schema
+        self.axes = tuple((name, int(n)) for name, n in axes)
+        self.actions = np.ascontiguousarray(actions, dtype=np.uint8).reshape(-1)
+        self.meta = meta or {}
+        names = FEATURE_SCHEMAS[schema]
+        # (chỉ số feature, số điểm - 1, stride) cho lookup()
+        strides = np.cumprod([1] + [n for _, n in self.axes[::-1]])[-2::-1]
+        self._index = [(names.index(name), n - 1, int(stride))
+                       for (name, n), stride in zip(self.axes, strides)]
+        self._flat = self.actions.tobytes()
+
+    def __len__(self):
+        return len(self.actions)
+
+    def lookup(self, features):
+        """Action bitmask cho 1 vector feature (list theo schema)."""
+        idx = 0
+        for i, last, stride in self._index:
+            k = int(features[i] * last + 0.5)
+            idx += (0 if k < 0 else last if k > last else k) * stride
+        return self._flat[idx]
+
+    def lookup_batch(self, X):
+        """Action bitmask cho mảng (N, n_features)."""
+        idx = np.zeros(len(X), dtype=np.int64)
+        for i, last, stride in self._index:
+            idx += np.clip(np.floor(X[:, i] * last + 0.5), 0, last).astype(np.int64) * stride
+        return self.actions[idx]
+
+    def activate(self, features):
+        """Output dạng network (jump, duck, nothing) để thay thế net.activate()."""
+        bits = self.lookup(features)
+        return (1.0 if bits & 1 else 0.0, 1.0 if bits & 2 else 0.0, 0.0)
+
+    def save(self, path):
+        try:
+            np.savez_compressed(path, actions=self.actions,
+                                info=json.dumps({'schema': self.schema, 'axes': self.axes,
+                                                 'meta': self.meta}))
+            return True
+        except IOError as e:
+            print(f"Không lưu được policy table: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as data:
+                info = json.loads(str(data['info']))
+                return cls(info['schema'], info['axes'], data['actions'], info.get('meta'))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Không load được policy table {path}: {e}")
+            return None
+
+
+def grid_points(schema, axes):
+    """Mảng (số ô, n_features) giá trị feature tại mọi điểm lưới, theo thứ tự của PolicyTable."""
+    names = FEATURE_SCHEMAS[schema]
+    sizes = [n for _, n in axes]
+    X = np.empty((int(np.prod(sizes)), len(names)))
+    for j, name in enumerate(names):
+        X[:, j] = _FIXED.get(name, 0.0)
+    mesh = np.meshgrid(*[np.linspace(0.0, 1.0, n) for n in sizes], indexing='ij')
+    for (name, _), values in zip(axes, mesh):
+        X[:, names.index(name)] = values.reshape(-1)
+    return X
+
+
+def _bits(jump, duck):
+    return (np.asarray(jump) > 0.5).astype(np.uint8) | ((np.asarray(duck) > 0.5).astype(np.uint8) << 1)
+
+
+# ── Policy gốc ──────────────────────────────────────────
+
+def _network_batch(net, X):
+    """Output (N, n_outputs) của neat FeedForwardNetwork cho N input cùng lúc."""
+    n = len(X)
+    values = {k: X[:, j] for j, k in enumerate(net.input_nodes)}
+    for node, act, agg, bias, response, links in net.node_evals:
+        act_np = _NP_ACTIVATIONS.get(act.__name__)
+        agg_np = _NP_AGGREGATIONS.get(agg.__name__)
+        if act_np is None or agg_np is None:
+            # Activation chưa có bản numpy: chạy từng dòng
+            return np.array([net.activate(list(x)) for x in X])
+        s = agg_np([values[i] * w for i, w in links], n)
+        values[node] = act_np(bias + response * s)
+    return np.stack([values.get(k, np.zeros(n)) for k in net.output_nodes], axis=1)
+
+
+def load_policy(policy):
+    """(schema, hàm batch X -> bitmask, hàm 1 vector -> bitmask) của policy gốc, hoặc None."""
+    if policy == 'neat':
+        import neat
+        from src.ai_handler import load_genome
+        genome, config = load_genome()
+        if genome is None:
+            return None
+        net = neat.nn.FeedForwardNetwork.create(genome, config)
+
+        def batch(X):
+            out = _network_batch(net, X)
+            return _bits(out[:, 0], out[:, 1])
+
+        def single(x):
+            out = net.activate(x)
+            return (1 if out[0] > 0.5 else 0) | (2 if out[1] > 0.5 else 0)
+        return NEAT_SCHEMA, batch, single
+
+    from src.supervised_trainer import load_models
+    jump_data, duck_data = load_models()
+    if jump_data is None or duck_data is None:
+        return None
+
+    def batch(X):
+        jump = jump_data['model'].predict_proba(jump_data['scaler'].transform(X))[:, 1]
+        duck = duck_data['model'].predict_proba(duck_data['scaler'].transform(X))[:, 1]
+        return _bits(jump, duck)
+    return COLLECTOR_V1, batch, lambda x: int(batch(np.asarray([x], dtype=float))[0])
+
+
+def distill(schema, policy_batch, axes=None, chunk=1 << 16):
+    """Lấy mẫu policy trên toàn bộ lưới của schema, trả về PolicyTable."""
+    axes = axes or GRID_AXES[schema]
+    X = grid_points(schema, axes)
+    actions = np.empty(len(X), dtype=np.uint8)
+    for start in range(0, len(X), chunk):
+        actions[start:start + chunk] = policy_batch(X[start:start + chunk])
+    return PolicyTable(schema, axes, actions)
+
+
+def measure_agreement(table, policy_single, episodes=POLICY_TABLE_EPISODES, seed=0):
+    """Chạy DinoEnv với policy gốc, đếm tỉ lệ frame bảng ra cùng quyết định.
+    Trả về dict: agreement, frames, policy_score, table_score (điểm trung bình
+    khi chính bảng điều khiển trên cùng các seed)."""
+    from src.dino_env import DinoEnv
+    same = frames = 0
+    scores = {'policy': [], 'table': []}
+    for ep in range(episodes):
+        for driver in scores:
+            env = DinoEnv(seed=seed + ep, auto_reset=False, schema=table.schema)
+            obs = env.observe()
+            done = False
+            while not done:
+                table_bits = table.lookup(obs)
+                if driver == 'policy':
+                    bits = policy_single(obs)
+                    same += bits == table_bits
+                    frames += 1
+                else:
+                    bits = table_bits
+                obs, _, done, _ = env.step(bits)
+            scores[driver].append(env.score)
+    return {'agreement': same / max(frames, 1), 'frames': frames,
+            'policy_score': float(np.mean(scores['policy'])),
+            'table_score': float(np.mean(scores['table']))}
+
+
+def build_table(policy, episodes=POLICY_TABLE_EPISODES, path=None):
+    """Chưng cất policy đã lưu ('neat' / 'supervised'), đo độ khớp và lưu bảng."""
+    loaded = load_policy(policy)
+    if loaded is None:
+        print(f"Chưa có AI {policy} đã train")
+        return None
+    schema, batch, single = loaded
+    start = time.perf_counter()
+    table = distill(schema, batch)
+    build_s = time.perf_counter() - start
+    table.meta = {'policy': policy, 'build_s': build_s,
+                  **measure_agreement(table, single, episodes)}
+    print(f"Policy table {policy}: {len(table)} ô ({table.actions.nbytes / 1024:.0f} KB), "
+          f"lấy mẫu {build_s:.1f}s")
+    _print_agreement(table.meta)
+    table.save(path or get_table_path(policy))
+    _tables.pop(policy, None)
+    return table
+
+
+def _print_agreement(meta):
+    print(f"  khớp policy gốc {meta['agreement'] * 100:.2f}% trên {meta['frames']} frame, "
+          f"điểm trung bình: gốc {meta['policy_score']:.1f}, bảng {meta['table_score']:.1f}")
+
+
+# Cache bảng đã load theo policy
+_tables = {}
+
+
+def load_table(policy):
+    """PolicyTable đã build của policy, hoặc None."""
+    if policy not in _tables:
+        path = get_table_path(policy)
+        _tables[policy] = PolicyTable.load(path) if os.path.exists(path) else None
+    return _tables[policy]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chưng cất AI thành bảng tra quyết định")
+    parser.add_argument('command', choices=('build', 'eval'))
+    parser.add_argument('--policy', choices=POLICIES, default='neat')
+    parser.add_argument('--episodes', type=int, default=POLICY_TABLE_EPISODES,
+                        help="Số episode DinoEnv để đo độ khớp")
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build_table(args.policy, args.episodes)
+        return
+    table, loaded = load_table(args.policy), load_policy(args.policy)
+    if table is None or loaded is None:
+        print("Chưa có policy table hoặc AI gốc")
+        return
+    _print_agreement(measure_agreement(table, loaded[2], args.episodes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Profiler - Đo thời gian từng phần của frame và hiển thị overlay p50/p99
+
+Bật/tắt bằng phím F3 hoặc biến môi trường DINO_PROFILE=1.
+F4 (hoặc DINO_PROFILE_CSV=<file>, ghi khi thoát) dump trace ra CSV để phân tích offline.
+
+Cách dùng trong vòng lặp game:
+    prof = get_profiler()
+    prof.begin('events') ... prof.end('events')
+    with prof.section('collision'): ...
+    profiler.flip()          # thay cho pygame.display.flip()
+    prof.next_frame()        # sau clock.tick()
+
+Khi tắt, mọi lời gọi chỉ tốn 1 phép kiểm tra cờ enabled.
+"""
+import atexit
+import csv
+import os
+from collections import deque
+from time import perf_counter
+
+import pygame
+
+from src.utils import get_cached_font
+
+HISTORY_FRAMES = 240          # số frame giữ lại cho graph và percentile
+MAX_TRACE_ROWS = 200000       # giới hạn số dòng CSV giữ trong RAM
+STATS_REFRESH_FRAMES = 15     # tính lại percentile mỗi N frame
+GRAPH_MAX_MS = 50.0
+TARGET_FRAME_MS = 1000.0 / 60
+
+TOGGLE_KEY = pygame.K_F3
+DUMP_KEY = pygame.K_F4
+
+# Thứ tự hiển thị các section chuẩn
+SECTIONS = ('events', 'update', 'physics', 'collision', 'persistence', 'assets',
+            'draw-bg', 'draw-sprites', 'hud', 'flip')
+
+
+def get_trace_path():
+    return os.path.join(os.path.dirname(__file__), '..', 'profile_trace.csv')
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+
+class _NullSection:
+    """Context manager rỗng khi profiler tắt."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Section:
+    """Context manager đo 1 section, tạo 1 lần cho mỗi tên rồi dùng lại."""
+    __slots__ = ('profiler', 'name')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.begin(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.end(self.name)
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class FrameProfiler:
+    """Đo thời gian các section theo từng frame."""
+
+    def __init__(self):
+        self.enabled = os.environ.get('DINO_PROFILE', '') not in ('', '0', 'false')
+        self.trace_path = os.environ.get('DINO_PROFILE_CSV') or None
+        self.frame_index = 0
+        self.frame_times = deque(maxlen=HISTORY_FRAMES)
+        self.section_times = {}
+        self.trace = []
+        self._sections = {}
+        self._starts = {}
+        self._accum = {}
+        self._last_frame = None
+        self._stats = None
+        self._stats_age = 0
+        if self.trace_path:
+            self.enabled = True
+            atexit.register(self.dump_csv, self.trace_path)
+
+    # ── Đo ──────────────────────────────────────────────
+
+    def begin(self, name):
+        if self.enabled:
+            self._starts[name] = perf_counter()
+
+    def end(self, name):
+        if self.enabled:
+            start = self._starts.pop(name, None)
+            if start is not None:
+                self._accum[name] = self._accum.get(name, 0.0) + (perf_counter() - start) * 1000
+
+    def section(self, name):
+        if not self.enabled:
+            return _NULL_SECTION
+        sec = self._sections.get(name)
+        if sec is None:
+            sec = self._sections[name] = _Section(self, name)
+        return sec
+
+    def next_frame(self):
+        """Đánh dấu ranh giới frame (gọi sau clock.tick)."""
+        if not self.enabled:
+            return
+        now = perf_counter()
+        if self._last_frame is not None:
+            frame_ms = (now - self._last_frame) * 1000
+            self.frame_times.append(frame_ms)
+            for name in self._accum:
+                if name not in self.section_times:
+                    self.section_times[name] = deque([0.0] * (len(self.frame_times) - 1),
+                                                     maxlen=HISTORY_FRAMES)
+            for name, times in self.section_times.items():
+                times.append(self._accum.get(name, 0.0))
+            if len(self.trace) < MAX_TRACE_ROWS:
+                self.trace.append((self.frame_index, frame_ms, dict(self._accum)))
+            self._stats_age += 1
+        self._accum.clear()
+        self._last_frame = now
+        self.frame_index += 1
+
+    # ── Điều khiển ──────────────────────────────────────
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self._last_frame = None
+        self._accum.clear()
+        self._starts.clear()
+
+    def handle_event(self, event):
+        """Xử lý F3/F4. Trả về True nếu event đã được dùng."""
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == TOGGLE_KEY:
+            self.toggle()
+            return True
+        if event.key == DUMP_KEY and self.trace:
+            self.dump_csv()
+            return True
+        return False
+
+    def dump_csv(self, path=None):
+        """Ghi trace (frame, frame_ms, từng section ms) ra CSV."""
+        path = path or self.trace_path or get_trace_path()
+        names = [s for s in SECTIONS if any(s in row[2] for row in self.trace)]
+        names += sorted({n for row in self.trace for n in row[2]} - set(names))
+        try:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame', 'frame_ms'] + names)
+                for frame, frame_ms, sections in self.trace:
+                    writer.writerow([frame, f"{frame_ms:.3f}"] +
+                                    [f"{sections.get(n, 0.0):.3f}" for n in names])
+            print(f"Profiler trace saved: {path} ({len(self.trace)} frames)")
+            return True
+        except IOError as e:
+            print(f"Error saving profiler trace: {e}")
+            return False
+
+    # ── Thống kê và overlay ─────────────────────────────
+
+    def stats(self):
+        """{'frame': (p50, p99), section: (p50, p99), ...} trên HISTORY_FRAMES frame gần nhất."""
+        if self._stats is None or self._stats_age >= STATS_REFRESH_FRAMES:
+            frames = sorted(self.frame_times)
+            result = {'frame': (_percentile(frames, 0.5), _percentile(frames, 0.99))}
+            for name, times in self.section_times.items():
+                values = sorted(times)
+                result[name] = (_percentile(values, 0.5), _percentile(values, 0.99))
+            self._stats = result
+            self._stats_age = 0
+        return self._stats
+
+    def draw_overlay(self, screen):
+        if not self.enabled or screen is None or not self.frame_times:
+            return
+        font = get_cached_font('Arial', 14)
+        stats = self.stats()
+        names = [s for s in SECTIONS if s in stats] + \
+                sorted(n for n in stats if n not in SECTIONS and n != 'frame')
+
+        w, graph_h = HISTORY_FRAMES + 20, 60
+        h = graph_h + 40 + 16 * len(names)
+        x0 = screen.get_width() - w - 10
+        y0 = 60
+        panel = pygame.Surface((w, h), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+
+        # Graph frame time
+        base = graph_h + 5
+        for i, ms in enumerate(self.frame_times):
+            bar = min(ms / GRAPH_MAX_MS, 1.0) * graph_h
+            col = (90, 220, 90) if ms <= TARGET_FRAME_MS * 1.1 else (240, 90, 70)
+            pygame.draw.line(panel, col, (10 + i, base), (10 + i, base - bar))
+        target_y = base - TARGET_FRAME_MS / GRAPH_MAX_MS * graph_h
+        pygame.draw.line(panel, (255, 255, 255, 120), (10, target_y), (w - 10, target_y))
+
+        p50, p99 = stats['frame']
+        fps = 1000.0 / p50 if p50 > 0 else 0
+        panel.blit(font.render(f"frame p50 {p50:.1f}ms  p99 {p99:.1f}ms  ~{fps:.0f} FPS",
+                               True, (255, 255, 255)), (10, base + 4))
+        for i, name in enumerate(names):
+            s50, s99 = stats[name]
+            panel.blit(font.render(f"{name:<13} {s50:6.2f} / {s99:6.2f} ms", True, (210, 210, 230)),
+                       (10, base + 22 + 16 * i))
+        screen.blit(panel, (x0, y0))
+
+
+_profiler = None
+
+
+def get_profiler():
+    """Singleton profiler dùng chung cho mọi mode."""
+    global _profiler
+    if _profiler is None:
+        _profiler = FrameProfiler()
+    return _profiler
+
+
+def flip():
+    """pygame.display.flip() kèm overlay profiler và đo section 'flip'."""
+    prof = get_profiler()
+    if prof.enabled:
+        prof.draw_overlay(pygame.display.get_surface())
+        prof.begin('flip')
+        pygame.display.flip()
+        prof.end('flip')
+    else:
+        pygame.display.flip()
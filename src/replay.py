@@ -0,0 +1,430 @@
+"""
+Replay - Ghi lại và phát lại lượt chơi từ input
+
+Một replay chỉ gồm seed của course, snapshot các settings ảnh hưởng đến
+physics và bit input của từng frame (mỗi lane một stream). Stream được
+run-length encode ngay khi ghi (input hầu như không đổi giữa các frame)
+rồi nén zlib, nên một lượt chơi vài phút chỉ tốn vài KB.
+
+Game được mô phỏng lại headless (không vẽ, không âm thanh, không lưu
+highscore/DB) bằng đúng code update của mode đó, nên điểm cuối phải khớp.
+
+Chạy:
+    python -m src.replay list
+    python -m src.replay verify replays/replay_human_20250101_120000_1234.drpl
+    python -m src.replay play replays/replay_human_20250101_120000_1234.drpl
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import pygame
+
+import config.settings as game_settings
+from config.settings import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+
+# ── Bit input mỗi frame ─────────────────────────────────
+INPUT_JUMP_PRESS   = 1 << 0   # KEYDOWN nhảy
+INPUT_JUMP_RELEASE = 1 << 1   # KEYUP nhảy
+INPUT_DUCK_PRESS   = 1 << 2   # KEYDOWN cúi
+INPUT_DUCK_RELEASE = 1 << 3   # KEYUP cúi
+INPUT_JUMP_DOWN    = 1 << 4   # phím nhảy đang giữ / AI muốn nhảy
+INPUT_DUCK_DOWN    = 1 << 5   # phím cúi đang giữ / AI muốn cúi
+INPUT_SLOW         = 1 << 6   # A: obstacle chậm 50%
+INPUT_FAST         = 1 << 7   # D: obstacle nhanh 150%
+INPUT_AI           = 1 << 8   # lane: JUMP_DOWN/DUCK_DOWN là action của AI
+INPUT_KEYS         = 1 << 9   # lane: JUMP_DOWN/DUCK_DOWN là player_action (PVP)
+
+MODE_HUMAN = 'human'
+MODE_PVE = 'pve'
+MODE_PVP = 'pvp'
+MODE_ENDLESS = 'endless'
+
+MAGIC = b'DRPL'
+VERSION = 1
+FILE_EXT = '.drpl'
+SEEK_FRAMES = 5 * FPS
+
+# Settings ảnh hưởng đến mô phỏng - lưu vào replay để phát hiện lệch version
+SIM_SETTINGS = (
+    'SCREEN_WIDTH', 'GROUND_Y', 'GROUND_Y_LANE', 'DINO_X', 'DINO_WIDTH', 'DINO_HEIGHT',
+    'GRAVITY', 'JUMP_VELOCITY', 'JUMP_HOLD_GRAVITY', 'JUMP_MIN_VELOCITY',
+    'COYOTE_TIME', 'JUMP_BUFFER', 'DUCK_HEIGHT_RATIO',
+    'CACTUS_WIDTH', 'CACTUS_HEIGHT_SMALL', 'CACTUS_HEIGHT_LARGE', 'BIRD_WIDTH', 'BIRD_HEIGHT',
+    'OBSTACLE_SPEED_MIN', 'OBSTACLE_SPEED_MAX', 'MIN_OBSTACLE_SPAWN_DISTANCE',
+    'SPEED_INCREASE_INTERVAL', 'SPEED_INCREASE_AMOUNT', 'COLLISION_MARGIN',
+    'COMBO_MAX_MULTIPLIER', 'COMBO_OBSTACLES_PER_LEVEL',
+)
+
+
+def get_replay_dir():
+    return os.path.join(os.path.dirname(__file__), '..', game_settings.REPLAY_DIR)
+
+
+def settings_snapshot():
+    return {name: getattr(game_settings, name, None) for name in SIM_SETTINGS}
+
+
+def apply_dino_inputs(dino, bits):
+    """Áp dụng các cạnh phím (press/release) của frame lên dino."""
+    if bits & INPUT_JUMP_PRESS:
+        dino.jump_press()
+    if bits & INPUT_JUMP_RELEASE:
+        dino.jump_release()
+    if bits & INPUT_DUCK_PRESS:
+        dino.duck(True)
+    if bits & INPUT_DUCK_RELEASE:
+        dino.duck(False)
+
+
+# ── Encode / decode ─────────────────────────────────────
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_streams(streams):
+    """streams: list các list run [bits, count] -> bytes đã nén."""
+    out = bytearray()
+    for runs in streams:
+        _write_varint(out, len(runs))
+        for bits, count in runs:
+            _write_varint(out, bits)
+            _write_varint(out, count)
+    return zlib.compress(bytes(out), 9)
+
+
+def decode_streams(blob, num_streams):
+    data = zlib.decompress(blob)
+    pos = 0
+    streams = []
+    for _ in range(num_streams):
+        n, pos = _read_varint(data, pos)
+        runs = []
+        for _ in range(n):
+            bits, pos = _read_varint(data, pos)
+            count, pos = _read_varint(data, pos)
+            runs.append([bits, count])
+        streams.append(runs)
+    return streams
+
+
+def expand_frames(streams):
+    """Danh sách tuple bit của từng frame (mỗi phần tử 1 stream)."""
+    expanded = []
+    for runs in streams:
+        frames = []
+        for bits, count in runs:
+            frames.extend([bits] * count)
+        expanded.append(frames)
+    return list(zip(*expanded))
+
+
+# ── Ghi ─────────────────────────────────────────────────
+
+class ReplayRecorder:
+    """Ghi bit input theo frame cho 1 lượt chơi (1 stream mỗi lane)."""
+
+    def __init__(self, mode, seeds):
+        self.mode = mode
+        self.seeds = list(seeds)
+        self.streams = [[] for _ in self.seeds]
+        self.frames = 0
+        self.started = time.strftime('%Y%m%d_%H%M%S')
+
+    def record(self, *bits):
+        for runs, b in zip(self.streams, bits):
+            if runs and runs[-1][0] == b:
+                runs[-1][1] += 1
+            else:
+                runs.append([b, 1])
+        self.frames += 1
+
+    def save(self, scores, end_reason='collision', path=None):
+        """Ghi file replay, trả về đường dẫn hoặc None."""
+        if self.frames == 0:
+            return None
+        header = {
+            'version': VERSION,
+            'mode': self.mode,
+            'seeds': self.seeds,
+            'frames': self.frames,
+            'scores': list(scores),
+            'end_reason': end_reason,
+            'created': self.started,
+            'settings': settings_snapshot(),
+        }
+        if path is None:
+            replay_dir = get_replay_dir()
+            name = f"replay_{self.mode}_{self.started}_{self.seeds[0]}{FILE_EXT}"
+            path = os.path.join(replay_dir, name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            header_bytes = json.dumps(header).encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+                f.write(struct.pack('<BI', VERSION, len(header_bytes)))
+                f.write(header_bytes)
+                f.write(encode_streams(self.streams))
+            _prune_replays(os.path.dirname(path))
+            return path
+        except (IOError, OSError) as e:
+            print(f"Error saving replay: {e}")
+            return None
+
+
+def start_recording(mode, seeds):
+    """Recorder mới nếu REPLAY_RECORDING bật, ngược lại None."""
+    if not getattr(game_settings, 'REPLAY_RECORDING', False):
+        return None
+    return ReplayRecorder(mode, seeds)
+
+
+def _prune_replays(replay_dir):
+    limit = getattr(game_settings, 'REPLAY_MAX_FILES', 0)
+    if not limit:
+        return
+    files = sorted((os.path.join(replay_dir, f) for f in os.listdir(replay_dir)
+                    if f.endswith(FILE_EXT)), key=os.path.getmtime)
+    for path in files[:-limit]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ── Đọc ─────────────────────────────────────────────────
+
+def load_replay(path):
+    """Trả về (header, streams) hoặc (None, None) nếu file lỗi."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:4] != MAGIC:
+            raise ValueError("not a replay file")
+        version, header_len = struct.unpack_from('<BI', data, 4)
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        start = 4 + struct.calcsize('<BI')
+        header = json.loads(data[start:start + header_len].decode('utf-8'))
+        streams = decode_streams(data[start + header_len:], len(header['seeds']))
+        return header, streams
+    except (IOError, OSError, ValueError, KeyError, zlib.error) as e:
+        print(f"Error loading replay {path}: {e}")
+        return None, None
+
+
+def list_replays():
+    replay_dir = get_replay_dir()
+    if not os.path.isdir(replay_dir):
+        return []
+    return sorted(os.path.join(replay_dir, f) for f in os.listdir(replay_dir)
+                  if f.endswith(FILE_EXT))
+
+
+def settings_mismatch(header):
+    """Các settings khác với lúc ghi: {name: (lúc ghi, hiện tại)}."""
+    current = settings_snapshot()
+    return {name: (value, current.get(name)) for name, value in header.get('settings', {}).items()
+            if current.get(name) != value}
+
+
+# ── Mô phỏng lại ────────────────────────────────────────
+
+def build_session(header, screen=None):
+    """Tạo các game object headless cho replay, trả về list (1 hoặc 2 lane)."""
+    mode = header['mode']
+    seeds = header['seeds']
+    if mode == MODE_HUMAN:
+        from src.game_manager import GameManager
+        game = GameManager(screen, headless=True)
+        game.reset(seed=seeds[0])
+        return [game]
+    if mode == MODE_ENDLESS:
+        from src.endless import EndlessGame
+        game = EndlessGame(screen, headless=True)
+        game.reset(seed=seeds[0])
+        return [game]
+    if mode in (MODE_PVE, MODE_PVP):
+        from src.lane_game import LaneGame
+        lanes = []
+        for seed in seeds:
+            lane = LaneGame(headless=True)
+            lane.reset(seed=seed)
+            lanes.append(lane)
+        return lanes
+    raise ValueError(f"Unknown replay mode: {mode}")
+
+
+def simulate(header, frames, games, start=0, stop=None):
+    """Chạy frames[start:stop] trên các game đã build."""
+    steps = [g.step_inputs for g in games]
+    if len(steps) == 1:
+        step = steps[0]
+        for i in range(start, len(frames) if stop is None else stop):
+            step(frames[i][0])
+    else:
+        for i in range(start, len(frames) if stop is None else stop):
+            for s, bits in zip(steps, frames[i]):
+                s(bits)
+
+
+def verify_replay(path):
+    """Mô phỏng lại headless và so điểm cuối với điểm đã ghi.
+
+    Trả về dict {ok, expected, actual, frames, elapsed_ms, frames_per_ms} hoặc None.
+    """
+    header, streams = load_replay(path)
+    if header is None:
+        return None
+    mismatch = settings_mismatch(header)
+    if mismatch:
+        print(f"Warning: settings changed since recording: {mismatch}")
+    frames = expand_frames(streams)
+    games = build_session(header)
+    start = time.perf_counter()
+    simulate(header, frames, games)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    actual = [g.score for g in games]
+    return {
+        'ok': actual == header['scores'],
+        'expected': header['scores'],
+        'actual': actual,
+        'frames': len(frames),
+        'elapsed_ms': elapsed_ms,
+        'frames_per_ms': len(frames) / elapsed_ms if elapsed_ms > 0 else float('inf'),
+    }
+
+
+# ── Player ──────────────────────────────────────────────
+
+def play_replay(screen, path):
+    """Phát lại có hình.
+
+    SPACE pause, ←/→ tua 5 giây, 1-4 tốc độ x1/x2/x4/x8, ESC thoát.
+    Tua lùi = mô phỏng lại headless từ đầu đến frame đích.
+    """
+    header, streams = load_replay(path)
+    if header is None:
+        return
+    frames = expand_frames(streams)
+    total = len(frames)
+    clock = pygame.time.Clock()
+    font = pygame.font.SysFont('Arial', 18, bold=True)
+    lane_mode = header['mode'] in (MODE_PVE, MODE_PVP)
+
+    def rebuild(target):
+        games = build_session(header, screen)
+        simulate(header, frames, games, 0, target)
+        return games
+
+    games = rebuild(0)
+    frame = 0
+    speed = 1
+    paused = False
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key in (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4):
+                    speed = 1 << (event.key - pygame.K_1)
+                elif event.key == pygame.K_RIGHT:
+                    target = min(frame + SEEK_FRAMES, total)
+                    simulate(header, frames, games, frame, target)
+                    frame = target
+                elif event.key == pygame.K_LEFT:
+                    frame = max(frame - SEEK_FRAMES, 0)
+                    games = rebuild(frame)
+
+        if not paused and frame < total:
+            target = min(frame + speed, total)
+            simulate(header, frames, games, frame, target)
+            frame = target
+
+        status = f"REPLAY {header['mode']}  {frame}/{total}  x{speed}" + ("  PAUSED" if paused else "")
+        pygame.display.set_caption(status)
+        if lane_mode:
+            from src.lane_game import LANE_H
+            screen.fill((0, 0, 0))
+            for i, lane in enumerate(games):
+                lane.draw()
+                screen.blit(lane.surface, (0, i * (LANE_H + 4)))
+            bar_y = SCREEN_HEIGHT - 30
+            pygame.draw.rect(screen, (60, 60, 60), (20, bar_y, SCREEN_WIDTH - 40, 8))
+            pygame.draw.rect(screen, (255, 200, 50),
+                             (20, bar_y, int((SCREEN_WIDTH - 40) * frame / max(total, 1)), 8))
+            screen.blit(font.render(status, True, (255, 255, 255)), (20, bar_y - 26))
+            pygame.display.flip()
+        else:
+            games[0].draw()
+        clock.tick(FPS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DinoRacer replay tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="Liệt kê replay đã lưu")
+    p_verify = sub.add_parser('verify', help="Mô phỏng lại headless và kiểm tra điểm")
+    p_verify.add_argument('paths', nargs='*', help="Mặc định: tất cả replay đã lưu")
+    p_play = sub.add_parser('play', help="Phát lại có hình")
+    p_play.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for path in list_replays():
+            header, _ = load_replay(path)
+            if header:
+                print(f"{os.path.basename(path):<45} {header['mode']:<8} "
+                      f"{header['frames']:>7} frames  scores {header['scores']}  "
+                      f"{os.path.getsize(path)} bytes")
+        return 0
+
+    if args.command == 'verify':
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.init()
+        failed = 0
+        for path in args.paths or list_replays():
+            result = verify_replay(path)
+            if result is None or not result['ok']:
+                failed += 1
+            if result is not None:
+                status = 'OK  ' if result['ok'] else 'FAIL'
+                print(f"{status} {os.path.basename(path)}: expected {result['expected']} "
+                      f"got {result['actual']}  {result['frames']} frames in "
+                      f"{result['elapsed_ms']:.1f}ms ({result['frames_per_ms']:.0f} frames/ms)")
+        return 1 if failed else 0
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    play_replay(screen, args.path)
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Sample Log - File nhị phân append-only chứa mẫu training (schema collector_v1)
+
+training_data.json phải đọc/ghi lại toàn bộ mỗi lần lưu nên không chứa nổi hàng
+triệu mẫu. Sample log là chuỗi record cố định kích thước (SAMPLE_DTYPE) sau một
+header 16 byte; ghi thêm chỉ là append, đọc là np.memmap (không parse).
+
+Header: MAGIC (4 byte) + version, kích thước record, 0 (3 x uint32 little-endian).
+Record ghi dở ở cuối file (process bị kill) được bỏ qua khi đọc và bị cắt bỏ
+trước lần ghi thêm tiếp theo (để các record sau không bị lệch).
+
+SessionBuffer: mẫu của session đang chơi (DataCollector) dạng struct-of-arrays,
+mỗi cột 1 mảng liền cấp phát trước, tăng gấp đôi khi đầy. Ghi 1 mẫu chỉ gán vào
+các ô có sẵn; columns() trả về slice liền (không copy) của từng cột.
+to_records() đóng gói thành SAMPLE_DTYPE (1 lần copy khi lưu session) cho sample
+log. Database nhận dữ liệu qua COPY dạng text nên to_db_rows() luôn phải đổi
+giá trị sang Python, không zero-copy được.
+"""
+import os
+import struct
+
+import numpy as np
+
+from config.settings import SAMPLE_LOG_FILE, SESSION_BUFFER_CAPACITY
+
+MAGIC = b'DRSL'
+VERSION = 1
+_HEADER = struct.Struct('<4sIII')
+
+# Nguồn mẫu (cột source của training_data)
+SOURCES = ('human', 'ai')
+
+SAMPLE_DTYPE = np.dtype([
+    ('inputs', '<f4', (6,)),     # collector_v1
+    ('action_jump', 'u1'),
+    ('action_duck', 'u1'),
+    ('source', 'u1'),            # chỉ số trong SOURCES
+    ('score', '<i4'),
+    ('game_speed_raw', '<f4'),
+])
+
+
+def get_log_path():
+    return os.path.join(os.path.dirname(__file__), '..', SAMPLE_LOG_FILE)
+
+
+_SOURCE_IDS = {name: i for i, name in enumerate(SOURCES)}
+
+
+def source_id(source):
+    return _SOURCE_IDS[source]
+
+
+def append_samples(records, path=None):
+    """Ghi thêm mảng SAMPLE_DTYPE vào log (tạo file + header nếu chưa có). Trả về số mẫu đã ghi."""
+    path = path or get_log_path()
+    records = np.ascontiguousarray(records, dtype=SAMPLE_DTYPE)
+    if not len(records):
+        return 0
+    header = _HEADER.pack(MAGIC, VERSION, SAMPLE_DTYPE.itemsize, 0)
+    try:
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size < _HEADER.size:
+                # File mới (hoặc chết khi đang ghi header)
+                f.seek(0)
+                f.truncate()
+                f.write(header)
+            else:
+                f.seek(0)
+                if f.read(_HEADER.size) != header:
+                    print(f"Sample log {path} không đúng định dạng, không ghi thêm")
+                    return 0
+                # Cắt record ghi dở ở cuối để record mới thẳng hàng
+                end = size - (size - _HEADER.size) % SAMPLE_DTYPE.itemsize
+                if end != size:
+                    f.truncate(end)
+                f.seek(end)
+            f.write(records.view(np.uint8))
+        return len(records)
+    except IOError as e:
+        print(f"Không ghi được sample log: {e}")
+        return 0
+
+
+class SessionBuffer:
+    """Buffer mẫu growable, mỗi field của SAMPLE_DTYPE là 1 mảng riêng."""
+
+    def __init__(self, capacity=SESSION_BUFFER_CAPACITY):
+        self._size = 0
+        self._alloc(max(capacity, 1))
+
+    def _alloc(self, capacity):
+        # Cột mới, chép phần đã ghi của cột cũ (nếu có)
+        old = getattr(self, '_columns', None)
+        self._columns = {}
+        for name in SAMPLE_DTYPE.names:
+            dtype, shape = SAMPLE_DTYPE[name].base, SAMPLE_DTYPE[name].shape
+            column = np.zeros((capacity,) + shape, dtype=dtype)
+            if old is not None:
+                column[:self._size] = old[name][:self._size]
+            self._columns[name] = column
+        # Gán theo chỉ số không tạo object trung gian
+        (self._inputs, self._jump, self._duck, self._source,
+         self._score, self._speed) = (self._columns[name] for name in SAMPLE_DTYPE.names)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self._jump)
+
+    def append(self, inputs, jump, duck, source, score, game_speed):
+        """source: chỉ số trong SOURCES (source_id())."""
+        i = self._size
+        if i == len(self._jump):
+            self._alloc(2 * i)
+        self._inputs[i] = inputs
+        self._jump[i] = jump
+        self._duck[i] = duck
+        self._source[i] = source
+        self._score[i] = score
+        self._speed[i] = game_speed
+        self._size = i + 1
+
+    def columns(self):
+        """{tên field: slice liền của cột} cho các mẫu đã ghi (không copy).
+        Hết hiệu lực sau clear()/append()."""
+        return {name: column[:self._size] for name, column in self._columns.items()}
+
+    def to_records(self):
+        """Mảng SAMPLE_DTYPE (copy) của các mẫu đã ghi, cho append_samples()."""
+        records = np.empty(self._size, dtype=SAMPLE_DTYPE)
+        for name, column in self.columns().items():
+            records[name] = column
+        return records
+
+    def clear(self):
+        """Xóa mẫu, giữ nguyên bộ nhớ đã cấp phát cho session sau."""
+        self._size = 0
+
+
+def read_samples(path=None, offset=0):
+    """Mảng SAMPLE_DTYPE (memmap, read-only) từ mẫu thứ offset, None nếu chưa có log / sai định dạng."""
+    path = path or get_log_path()
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            magic, version, itemsize, _ = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC or version != VERSION or itemsize != SAMPLE_DTYPE.itemsize:
+        print(f"Sample log {path} không đúng định dạng")
+        return None
+    count = (size - _HEADER.size) // itemsize
+    if offset >= count:
+        return np.empty(0, dtype=SAMPLE_DTYPE)
+    return np.memmap(path, dtype=SAMPLE_DTYPE, mode='r',
+                     offset=_HEADER.size + offset * itemsize, shape=(count - offset,))
+
+
+def count_samples(path=None):
+    """(tổng, human, ai) trong log."""
+    records = read_samples(path)
+    if records is None:
+        return 0, 0, 0
+    counts = np.bincount(records['source'], minlength=len(SOURCES))
+    return len(records), int(counts[0]), int(counts[1])
+
+
+def to_arrays(records):
+    """(X, y_jump, y_duck) như load_training_data()."""
+    return (np.asarray(records['inputs'], dtype=np.float64),
+            np.asarray(records['action_jump'], dtype=np.int64),
+            np.asarray(records['action_duck'], dtype=np.int64))
+
+
+def to_db_rows(records):
+    """Tuple theo thứ tự cột của save_training_data_bulk(). records: mảng SAMPLE_DTYPE
+    hoặc SessionBuffer.columns()."""
+    for inputs, jump, duck, source, speed, score in zip(
+            records['inputs'].tolist(), records['action_jump'].tolist(),
+            records['action_duck'].tolist(), records['source'].tolist(),
+            records['game_speed_raw'].tolist(), records['score'].tolist()):
+        yield (*inputs, jump, duck, SOURCES[source], speed, score, 1.0)
@@ -0,0 +1,148 @@
+"""
+Shared Course - Course obstacle tính sẵn, chia sẻ zero-copy cho worker process
+
+Với DinoEnv, thứ tự spawn, loại obstacle và tốc độ chỉ phụ thuộc seed (dino
+không đổi x, điểm tăng khi obstacle đi qua x của dino, bất kể action). Nên
+course của 1 seed được tính 1 lần thành numpy structured array
+(COURSE_DTYPE: frame spawn, loại, y, height, width, speed) và DinoEnv(course=...)
+spawn theo bảng này thay vì roll rng, kết quả giống hệt DinoEnv(seed).
+
+Coordinator (src.distributed) đặt course vào multiprocessing.shared_memory và
+gửi descriptor (seed, max_steps, tên segment, số obstacle) 1 lần lúc worker
+kết nối; worker cùng máy attach thẳng vào segment (không copy), worker máy khác
+tự tính lại course. Mỗi batch chỉ còn gửi genome.
+
+Ví dụ:
+    shared = publish_course(0)              # process chính
+    course = attach_course(shared.descriptor)   # worker
+    env = DinoEnv(seed=0, course=get_course(0))
+"""
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from src.obstacle import BIRD_HEIGHTS
+
+COURSE_DTYPE = np.dtype([
+    ('step', '<i4'),        # frame spawn (env.steps trước frame đó)
+    ('is_bird', 'u1'),
+    ('variant', 'u1'),      # cactus: 1 = lớn; bird: chỉ số trong BIRD_HEIGHTS
+    ('y', '<f8'),
+    ('height', '<i4'),
+    ('width', '<i4'),
+    ('speed', '<f8'),
+])
+
+# Cache course theo (seed, max_steps): array thường hoặc view vào shared memory
+_courses = {}
+# Segment đang giữ (tránh bị GC khi còn view numpy trỏ vào)
+_segments = {}
+
+
+def _variant(obs):
+    if obs.is_bird:
+        return BIRD_HEIGHTS.index(obs.y)
+    return int(obs.is_large)
+
+
+def build_course(seed, max_steps=None):
+    """Course của DinoEnv(seed) trong max_steps frame (mô phỏng không có dino va chạm)."""
+    from src.dino_env import DinoEnv, MAX_STEPS, ACTION_NONE
+    max_steps = MAX_STEPS if max_steps is None else max_steps
+    env = DinoEnv(seed=seed, max_steps=max_steps, auto_reset=False)
+    rows, last = [], None
+    while env.steps < max_steps:
+        env._advance(ACTION_NONE)
+        obstacles = env.obstacles
+        if obstacles and obstacles[-1] is not last:
+            last = obstacles[-1]
+            rows.append((env.steps - 1, last.is_bird, _variant(last), last.y,
+                         last.height, last.width, last.speed))
+    return np.array(rows, dtype=COURSE_DTYPE)
+
+
+def get_course(seed, max_steps=None):
+    """Course đã cache của seed (None nếu seed None = course ngẫu nhiên)."""
+    if seed is None:
+        return None
+    from src.dino_env import MAX_STEPS
+    key = (seed, MAX_STEPS if max_steps is None else max_steps)
+    course = _courses.get(key)
+    if course is None:
+        course = _courses[key] = build_course(*key)
+    return course
+
+
+class SharedCourse:
+    """Course nằm trong 1 segment shared memory (process tạo ra là owner)."""
+
+    def __init__(self, seed, max_steps, shm, count, owner):
+        self.seed = seed
+        self.max_steps = max_steps
+        self.shm = shm
+        self.owner = owner
+        self.course = np.ndarray((count,), dtype=COURSE_DTYPE, buffer=shm.buf)
+
+    @property
+    def descriptor(self):
+        """Thông tin để process khác attach (picklable, vài chục byte)."""
+        return self.seed, self.max_steps, self.shm.name, len(self.course)
+
+    def close(self):
+        """Bỏ cache và đóng segment; owner xóa luôn segment."""
+        key = (self.seed, self.max_steps)
+        if _courses.get(key) is self.course:
+            del _courses[key]
+        _segments.pop(key, None)
+        self.course = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Còn view numpy trỏ vào (env đang chạy): để GC đóng sau
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def publish_course(seed, max_steps=None):
+    """Tính course, chép vào shared memory và dùng luôn bản đó trong process này."""
+    from src.dino_env import MAX_STEPS
+    max_steps = MAX_STEPS if max_steps is None else max_steps
+    course = build_course(seed, max_steps)
+    shm = shared_memory.SharedMemory(create=True, size=max(course.nbytes, 1))
+    shared = SharedCourse(seed, max_steps, shm, len(course), owner=True)
+    shared.course[:] = course
+    _courses[(seed, max_steps)] = shared.course
+    _segments[(seed, max_steps)] = shared
+    return shared
+
+
+def _open_segment(name):
+    """Attach segment có sẵn mà không để resource_tracker của process này xóa nó khi thoát."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: không có track=, tự bỏ đăng ký
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def attach_course(descriptor):
+    """Course từ descriptor của publish_course(): attach zero-copy nếu segment
+    có trên máy này, không thì tính lại. Kết quả được cache cho get_course()."""
+    seed, max_steps, name, count = descriptor
+    key = (seed, max_steps)
+    if key in _courses:
+        return _courses[key]
+    try:
+        shared = SharedCourse(seed, max_steps, _open_segment(name), count, owner=False)
+    except (FileNotFoundError, OSError, ValueError):
+        # Worker khác máy: segment không tồn tại
+        return get_course(seed, max_steps)
+    _courses[key] = shared.course
+    _segments[key] = shared
+    return shared.course
@@ -0,0 +1,172 @@
+"""
+Supervised Sweep - Tìm cấu hình MLP tốt nhất cho jump/duck model
+Chạy song song các cấu hình trên process pool, dữ liệu được chia sẻ qua
+file memory-mapped (.npy) để không phải pickle dataset cho từng worker.
+Xếp hạng theo validation accuracy, sau đó theo độ trễ inference.
+
+Chạy: python -m src.supervised_sweep --search random --n 20 --workers 4
+"""
+import argparse
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from src.supervised_trainer import (
+    load_training_data_since, build_mlp, class_sample_weight,
+    train_jump_model, train_duck_model, save_models, save_watermark, save_mlp_params,
+)
+
+# Không gian tìm kiếm
+SEARCH_SPACE = {
+    'hidden_layer_sizes': [(32,), (32, 16), (64, 32), (64, 32, 16), (128, 64, 32)],
+    'learning_rate_init': [0.0005, 0.001, 0.003, 0.01],
+    'alpha': [0.0001, 0.001, 0.01],
+    'class_weight': [None, 'balanced'],
+}
+
+# Hai cấu hình có accuracy chênh nhau ít hơn mức này được xem là ngang nhau
+ACCURACY_TOLERANCE = 0.002
+LATENCY_REPEATS = 200
+
+# Dataset dùng chung trong mỗi worker (memory-mapped, read-only)
+_worker_data = {}
+
+
+def build_candidates(search='grid', n=20, seed=42):
+    """Sinh danh sách cấu hình: toàn bộ grid hoặc n cấu hình ngẫu nhiên."""
+    keys = list(SEARCH_SPACE)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    if search == 'random' and n < len(grid):
+        return random.Random(seed).sample(grid, n)
+    return grid
+
+
+def _share_dataset(X, y_jump, y_duck):
+    """Ghi dataset ra thư mục tạm dưới dạng .npy để worker mmap."""
+    data_dir = tempfile.mkdtemp(prefix='dino_sweep_')
+    np.save(os.path.join(data_dir, 'X.npy'), np.ascontiguousarray(X, dtype=np.float64))
+    np.save(os.path.join(data_dir, 'y_jump.npy'), np.asarray(y_jump, dtype=np.int64))
+    np.save(os.path.join(data_dir, 'y_duck.npy'), np.asarray(y_duck, dtype=np.int64))
+    return data_dir
+
+
+def _init_worker(data_dir):
+    for name in ('X', 'y_jump', 'y_duck'):
+        _worker_data[name] = np.load(os.path.join(data_dir, name + '.npy'), mmap_mode='r')
+
+
+def _measure_latency(model, scaler, sample):
+    """Độ trễ trung bình (ms) của 1 lần predict như predict_action."""
+    start = time.perf_counter()
+    for _ in range(LATENCY_REPEATS):
+        model.predict_proba(scaler.transform(sample))
+    return (time.perf_counter() - start) * 1000 / LATENCY_REPEATS
+
+
+def _fit_and_score(X, y, params, test_size):
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=test_size, random_state=42
+    )
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    model = build_mlp(params)
+    sample_weight = class_sample_weight(y_train, params.get('class_weight'))
+    if sample_weight is None:
+        model.fit(X_train_scaled, y_train)
+    else:
+        model.fit(X_train_scaled, y_train, sample_weight=sample_weight)
+    val_acc = model.score(scaler.transform(X_val), y_val)
+    latency = _measure_latency(model, scaler, X_val[:1])
+    return val_acc, latency
+
+
+def evaluate_candidate(params, test_size=0.2):
+    """Train jump + duck model với một cấu hình, trả về metrics (chạy trong worker)."""
+    X = np.asarray(_worker_data['X'])
+    start = time.perf_counter()
+    jump_acc, jump_ms = _fit_and_score(X, _worker_data['y_jump'], params, test_size)
+    duck_acc, duck_ms = _fit_and_score(X, _worker_data['y_duck'], params, test_size)
+    return {
+        'params': params,
+        'jump_acc': jump_acc,
+        'duck_acc': duck_acc,
+        'val_acc': (jump_acc + duck_acc) / 2,
+        'latency_ms': jump_ms + duck_ms,
+        'train_s': time.perf_counter() - start,
+    }
+
+
+def rank_results(results):
+    """Sắp xếp: accuracy cao trước, accuracy ngang nhau thì latency thấp trước."""
+    return sorted(
+        results,
+        key=lambda r: (-round(r['val_acc'] / ACCURACY_TOLERANCE), r['latency_ms'])
+    )
+
+
+def run_sweep(search='grid', n=20, workers=None, save_winner=True):
+    """Chạy sweep, in bảng xếp hạng và lưu model tốt nhất bằng save_models
+    (kèm watermark và cấu hình thắng để train_supervised / train_incremental dùng tiếp)."""
+    X, y_jump, y_duck, watermark = load_training_data_since(None)
+    if X is None or len(X) < 10:
+        print("Not enough data to sweep!")
+        return None
+
+    candidates = build_candidates(search, n)
+    workers = workers or os.cpu_count()
+    print(f"Sweeping {len(candidates)} candidates on {workers} workers ({len(X)} samples)")
+
+    data_dir = _share_dataset(X, y_jump, y_duck)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data_dir,)) as pool:
+            futures = [pool.submit(evaluate_candidate, params) for params in candidates]
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Candidate failed: {e}")
+                    continue
+                results.append(result)
+                print(f"  [{len(results)}/{len(candidates)}] acc={result['val_acc']:.4f} "
+                      f"latency={result['latency_ms']:.3f}ms  {result['params']}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if not results:
+        return None
+
+    ranked = rank_results(results)
+    print("\nTop candidates:")
+    for i, r in enumerate(ranked[:5]):
+        print(f"  #{i + 1} acc={r['val_acc']:.4f} (jump {r['jump_acc']:.4f}, duck {r['duck_acc']:.4f}) "
+              f"latency={r['latency_ms']:.3f}ms  {r['params']}")
+
+    best = ranked[0]
+    if save_winner:
+        print("\nRetraining winner on full split...")
+        jump_model, jump_scaler = train_jump_model(X, y_jump, mlp_params=best['params'])
+        duck_model, duck_scaler = train_duck_model(X, y_duck, mlp_params=best['params'])
+        save_models(jump_model, jump_scaler, duck_model, duck_scaler)
+        save_watermark(watermark)
+        save_mlp_params(best['params'])
+    return ranked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep cho supervised models")
+    parser.add_argument('--search', choices=['grid', 'random'], default='random')
+    parser.add_argument('--n', type=int, default=20, help="Số cấu hình cho random search")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-save', action='store_true', help="Không lưu model tốt nhất")
+    args = parser.parse_args()
+    run_sweep(args.search, args.n, args.workers, save_winner=not args.no_save)
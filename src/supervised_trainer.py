@@ -2,6 +2,7 @@
 Supervised Trainer - Train AI từ dữ liệu đã thu thập
 Sử dụng Neural Network để học từ hành động của người chơi
 """
+import copy
 import numpy as np
 import json
 import os
@@ -17,17 +18,100 @@ try:
 except:
     DATABASE_AVAILABLE = False
 
+# Incremental training
+DRIFT_THRESHOLD = 0.5       # Độ lệch mean (tính theo std cũ) để train lại từ đầu
+INCREMENTAL_EPOCHS = 5      # Số lượt partial_fit trên dữ liệu mới + replay
+MIN_INCREMENTAL_SAMPLES = 10
+REPLAY_RATIO = 2            # Số mẫu replay (lấy từ tập compact) cho mỗi mẫu mới
+MIN_REPLAY_SAMPLES = 1000
+
 
 def get_data_path():
     """Lấy đường dẫn file training data"""
     return os.path.join(os.path.dirname(__file__), '..', 'training_data.json')
 
 
-def load_training_data():
-    """Load dữ liệu training từ database hoặc file"""
+def get_watermark_path():
+    """Đường dẫn file lưu watermark của lần train gần nhất"""
+    return os.path.join(os.path.dirname(__file__), '..', 'training_watermark.json')
+
+
+def get_mlp_params_path():
+    """Đường dẫn file lưu cấu hình MLP thắng sweep (src/supervised_sweep.py)"""
+    return os.path.join(os.path.dirname(__file__), '..', 'mlp_params.json')
+
+
+def save_mlp_params(params):
+    """Lưu cấu hình MLP để các lần train sau (kể cả train lại khi drift) dùng lại"""
+    try:
+        with open(get_mlp_params_path(), 'w') as f:
+            json.dump(params, f, indent=2)
+        return True
+    except (IOError, TypeError):
+        return False
+
+
+def load_mlp_params():
+    """Cấu hình MLP đã lưu bởi sweep, hoặc None (dùng DEFAULT_MLP_PARAMS)"""
+    try:
+        with open(get_mlp_params_path(), 'r') as f:
+            params = json.load(f)
+    except Exception:
+        return None
+    if 'hidden_layer_sizes' in params:
+        params['hidden_layer_sizes'] = tuple(params['hidden_layer_sizes'])
+    return params
+
+
+def load_watermark():
+    """
+    Load watermark: vị trí dữ liệu cuối cùng đã được train.
+    db_last_id : training_data.id lớn nhất đã dùng
+    file_offset: số mẫu đã dùng trong training_data.json
+    log_offset : số mẫu đã dùng trong sample log nhị phân (src/sample_log.py)
+    """
+    try:
+        with open(get_watermark_path(), 'r') as f:
+            data = json.load(f)
+        return {"db_last_id": int(data.get("db_last_id", 0)),
+                "file_offset": int(data.get("file_offset", 0)),
+                "log_offset": int(data.get("log_offset", 0))}
+    except Exception:
+        return None
+
+
+def save_watermark(watermark):
+    """Lưu watermark sau khi train xong"""
+    try:
+        with open(get_watermark_path(), 'w') as f:
+            json.dump(watermark, f, indent=2)
+        return True
+    except IOError:
+        return False
+
+
+def load_training_data_since(watermark=None):
+    """
+    Load dữ liệu training mới hơn watermark (None = toàn bộ dữ liệu).
+    Trả về (X, y_jump, y_duck, new_watermark).
+    """
+    X, y_jump, y_duck, _, new_watermark = load_training_samples_since(watermark)
+    return X, y_jump, y_duck, new_watermark
+
+
+def load_training_samples_since(watermark=None):
+    """
+    Như load_training_data_since, kèm nguồn mẫu (chỉ số trong sample_log.SOURCES).
+    Trả về (X, y_jump, y_duck, source, new_watermark).
+    """
+    from src.sample_log import source_id
+    if watermark is None:
+        watermark = {"db_last_id": 0, "file_offset": 0, "log_offset": 0}
+    new_watermark = dict(watermark)
     X = []
     y_jump = []
     y_duck = []
+    source = []
     
     # Thử load từ database trước
     if DATABASE_AVAILABLE:
@@ -37,10 +121,11 @@ def load_training_data():
             cursor.execute("""
                 SELECT distance_to_obstacle, obstacle_type, game_speed, 
                        dino_height, is_jumping, is_ducking,
-                       action_jump, action_duck
+                       action_jump, action_duck, id, source
                 FROM training_data
-                WHERE quality_score >= 0.7
-            """)
+                WHERE quality_score >= 0.7 AND id > %s
+                ORDER BY id
+            """, (watermark["db_last_id"],))
             rows = cursor.fetchall()
             cursor.close()
             conn.close()
@@ -51,90 +136,160 @@ def load_training_data():
                 ])
                 y_jump.append(row[6])
                 y_duck.append(row[7])
+                source.append(source_id(row[9]))
+            if rows:
+                new_watermark["db_last_id"] = rows[-1][8]
             
             print(f"Loaded {len(X)} samples from database")
-            return np.array(X), np.array(y_jump), np.array(y_duck)
+            return (np.array(X, dtype=float).reshape(-1, 6), np.array(y_jump, dtype=int),
+                    np.array(y_duck, dtype=int), np.array(source, dtype=np.uint8), new_watermark)
         except Exception as e:
             print(f"Database error: {e}")
     
-    # Fallback: load từ file JSON
+    # Fallback: load từ file JSON + sample log nhị phân (src/datagen.py)
+    from src.sample_log import read_samples, to_arrays
+    loaded = False
     try:
         with open(get_data_path(), 'r') as f:
             data = json.load(f)
         
-        for sample in data:
+        for sample in data[watermark["file_offset"]:]:
             X.append(sample['inputs'])
             y_jump.append(sample['outputs']['jump'])
             y_duck.append(sample['outputs']['duck'])
-        
+            source.append(source_id(sample.get('source', 'human')))
+        new_watermark["file_offset"] = len(data)
+        loaded = True
         print(f"Loaded {len(X)} samples from file")
-        return np.array(X), np.array(y_jump), np.array(y_duck)
     except Exception as e:
         print(f"Error loading data: {e}")
-        return None, None, None
 
+    X = np.array(X, dtype=float).reshape(-1, 6)
+    y_jump, y_duck = np.array(y_jump, dtype=int), np.array(y_duck, dtype=int)
+    source = np.array(source, dtype=np.uint8)
+    log_offset = watermark.get("log_offset", 0)
+    records = read_samples(offset=log_offset)
+    if records is not None and len(records):
+        log_X, log_jump, log_duck = to_arrays(records)
+        X = np.concatenate([X, log_X])
+        y_jump = np.concatenate([y_jump, log_jump])
+        y_duck = np.concatenate([y_duck, log_duck])
+        source = np.concatenate([source, records['source']])
+        new_watermark["log_offset"] = log_offset + len(records)
+        loaded = True
+        print(f"Loaded {len(records)} samples from sample log")
+    if not loaded:
+        return None, None, None, None, watermark
+    return X, y_jump, y_duck, source, new_watermark
 
-def train_jump_model(X, y, test_size=0.2):
-    """Train model cho action nhảy"""
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=42
-    )
-    
-    # Scale dữ liệu
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    # Train MLP
-    model = MLPClassifier(
-        hidden_layer_sizes=(64, 32, 16),
-        activation='relu',
-        max_iter=500,
+
+def load_training_data():
+    """Load dữ liệu training từ database hoặc file"""
+    X, y_jump, y_duck, _ = load_training_data_since(None)
+    return X, y_jump, y_duck
+
+
+# Cấu hình MLP mặc định (có thể tìm cấu hình tốt hơn bằng src/supervised_sweep.py)
+DEFAULT_MLP_PARAMS = {
+    'hidden_layer_sizes': (64, 32, 16),
+    'activation': 'relu',
+    'learning_rate_init': 0.001,
+    'alpha': 0.0001,
+    'max_iter': 500,
+}
+
+# Tập compact (src/data_compaction.py) chỉ vài nghìn dòng có weight: L-BFGS full-batch
+# hội tụ trong vài giây, adam theo mini-batch dừng sớm khi số bước quá ít
+COMPACT_MLP_PARAMS = {
+    'solver': 'lbfgs',
+    'max_iter': 2000,
+}
+
+
+def class_sample_weight(y, class_weight=None, sample_weight=None):
+    """
+    Tính sample_weight theo class_weight (None, 'balanced' hoặc dict {class: weight}),
+    nhân với sample_weight có sẵn (weight của dữ liệu compact, src/data_compaction.py).
+    Trả về None nếu không cần weight.
+    """
+    if class_weight is None:
+        return sample_weight
+    y = np.asarray(y)
+    base = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    classes, inverse = np.unique(y, return_inverse=True)
+    if class_weight == 'balanced':
+        # Số mẫu mỗi class tính theo weight
+        counts = np.bincount(inverse.reshape(-1), weights=base)
+        weights = {c: base.sum() / (len(classes) * n) for c, n in zip(classes, counts)}
+    else:
+        weights = class_weight
+    return base * np.array([weights.get(c, 1.0) for c in y], dtype=float)
+
+
+def build_mlp(mlp_params=None):
+    """Tạo MLPClassifier với cấu hình mặc định, ghi đè bởi mlp_params"""
+    params = dict(DEFAULT_MLP_PARAMS)
+    if mlp_params:
+        params.update(mlp_params)
+    params.pop('class_weight', None)
+    return MLPClassifier(
         random_state=42,
         early_stopping=True,
-        validation_fraction=0.1
+        validation_fraction=0.1,
+        **params
     )
-    
-    model.fit(X_train_scaled, y_train)
-    
-    # Evaluate
-    train_score = model.score(X_train_scaled, y_train)
-    test_score = model.score(X_test_scaled, y_test)
-    
-    print(f"Jump Model - Train: {train_score:.4f}, Test: {test_score:.4f}")
-    
-    return model, scaler
 
 
-def train_duck_model(X, y, test_size=0.2):
-    """Train model cho action cúi"""
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=42
-    )
-    
+def fit_model(X, y, mlp_params=None, sample_weight=None):
+    """Fit scaler + MLP trên toàn bộ X, y. Trả về (model, scaler)."""
     scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    if sample_weight is None:
+        X_scaled = scaler.fit_transform(X)
+    else:
+        X_scaled = scaler.fit(X, sample_weight=sample_weight).transform(X)
     
-    model = MLPClassifier(
-        hidden_layer_sizes=(64, 32, 16),
-        activation='relu',
-        max_iter=500,
-        random_state=42,
-        early_stopping=True,
-        validation_fraction=0.1
-    )
+    model = build_mlp(mlp_params)
+    sample_weight = class_sample_weight(y, (mlp_params or {}).get('class_weight'), sample_weight)
+    if sample_weight is None:
+        model.fit(X_scaled, y)
+    else:
+        # sample_weight cho MLPClassifier cần scikit-learn >= 1.7
+        model.fit(X_scaled, y, sample_weight=sample_weight)
+    return model, scaler
+
+
+def _train_model(name, X, y, test_size=0.2, mlp_params=None, sample_weight=None):
+    if sample_weight is None:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=42
+        )
+        w_train = w_test = None
+    else:
+        X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+            X, y, sample_weight, test_size=test_size, random_state=42
+        )
     
-    model.fit(X_train_scaled, y_train)
+    model, scaler = fit_model(X_train, y_train, mlp_params, w_train)
     
-    train_score = model.score(X_train_scaled, y_train)
-    test_score = model.score(X_test_scaled, y_test)
+    # Evaluate (dữ liệu compact: accuracy theo weight = accuracy trên mẫu gốc)
+    train_score = model.score(scaler.transform(X_train), y_train, sample_weight=w_train)
+    test_score = model.score(scaler.transform(X_test), y_test, sample_weight=w_test)
     
-    print(f"Duck Model - Train: {train_score:.4f}, Test: {test_score:.4f}")
+    print(f"{name} Model - Train: {train_score:.4f}, Test: {test_score:.4f}")
     
     return model, scaler
 
 
+def train_jump_model(X, y, test_size=0.2, mlp_params=None, sample_weight=None):
+    """Train model cho action nhảy"""
+    return _train_model("Jump", X, y, test_size, mlp_params, sample_weight)
+
+
+def train_duck_model(X, y, test_size=0.2, mlp_params=None, sample_weight=None):
+    """Train model cho action cúi"""
+    return _train_model("Duck", X, y, test_size, mlp_params, sample_weight)
+
+
 def save_models(jump_model, jump_scaler, duck_model, duck_scaler):
     """Lưu models vào file"""
     models_dir = os.path.join(os.path.dirname(__file__), '..')
@@ -181,35 +336,59 @@ def predict_action(jump_model, jump_scaler, duck_model, duck_scaler, inputs):
     return (1 if jump_prob > 0.5 else 0, 1 if duck_prob > 0.5 else 0, jump_prob, duck_prob)
 
 
-def train_supervised():
-    """Train AI từ dữ liệu đã thu thập"""
+def train_supervised(compact=False):
+    """
+    Train AI từ dữ liệu đã thu thập.
+    compact=True: train trên tập compact có trọng số (src/data_compaction.py),
+    cập nhật tập này với dữ liệu mới trước khi train.
+    """
     print("=" * 50)
     print("SUPERVISED LEARNING TRAINING")
     print("=" * 50)
     
     # Load data
     print("\nLoading training data...")
-    X, y_jump, y_duck = load_training_data()
+    weight = None
+    if compact:
+        from src.data_compaction import compact as compact_data
+        data = compact_data()
+        if data is None:
+            print("Not enough data to train!")
+            return False
+        X, y_jump, y_duck, weight, watermark = (data.X, data.y_jump, data.y_duck,
+                                                data.weight, data.watermark)
+    else:
+        X, y_jump, y_duck, watermark = load_training_data_since(None)
     
     if X is None or len(X) < 10:
         print("Not enough data to train!")
         return False
     
-    print(f"Total samples: {len(X)}")
-    print(f"Jump samples: {sum(y_jump)} ({sum(y_jump)/len(y_jump)*100:.1f}%)")
-    print(f"Duck samples: {sum(y_duck)} ({sum(y_duck)/len(y_duck)*100:.1f}%)")
+    w = np.ones(len(X)) if weight is None else weight
+    total = w.sum()
+    print(f"Total samples: {total:.0f}" + (f" ({len(X)} compact rows)" if compact else ""))
+    print(f"Jump samples: {w[y_jump == 1].sum():.0f} ({w[y_jump == 1].sum()/total*100:.1f}%)")
+    print(f"Duck samples: {w[y_duck == 1].sum():.0f} ({w[y_duck == 1].sum()/total*100:.1f}%)")
+    
+    # Cấu hình thắng sweep (nếu có); tập compact luôn dùng solver của COMPACT_MLP_PARAMS
+    mlp_params = load_mlp_params()
+    if compact:
+        mlp_params = {**(mlp_params or {}), **COMPACT_MLP_PARAMS}
     
     # Train jump model
     print("\nTraining Jump Model...")
-    jump_model, jump_scaler = train_jump_model(X, y_jump)
+    jump_model, jump_scaler = train_jump_model(X, y_jump, mlp_params=mlp_params,
+                                               sample_weight=weight)
     
     # Train duck model
     print("\nTraining Duck Model...")
-    duck_model, duck_scaler = train_duck_model(X, y_duck)
+    duck_model, duck_scaler = train_duck_model(X, y_duck, mlp_params=mlp_params,
+                                               sample_weight=weight)
     
     # Save models
     print("\nSaving models...")
     save_models(jump_model, jump_scaler, duck_model, duck_scaler)
+    save_watermark(watermark)
     
     print("\n" + "=" * 50)
     print("TRAINING COMPLETE!")
@@ -218,6 +397,116 @@ def train_supervised():
     return True
 
 
+def compute_drift(scaler, X_new):
+    """
+    Đo độ lệch phân phối giữa dữ liệu mới và thống kê đã lưu trong scaler.
+    Trả về độ lệch mean lớn nhất, tính theo đơn vị std cũ.
+    """
+    scale = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+    return float(np.max(np.abs(X_new.mean(axis=0) - scaler.mean_) / scale))
+
+
+def sample_replay(n, seed=0):
+    """
+    n mẫu replay từ tập compact (src/data_compaction.py, đã gộp cả dữ liệu mới),
+    lấy theo weight nên phân phối giống toàn bộ dữ liệu đã thu thập.
+    Trả về (X, y_jump, y_duck) hoặc None nếu chưa có tập compact.
+    """
+    from src.data_compaction import compact
+    data = compact()
+    if data is None or not len(data):
+        return None
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(data), size=n, p=data.weight / data.weight.sum())
+    return data.X[idx], data.y_jump[idx], data.y_duck[idx]
+
+
+def _update_model(model, scaler, X_new, X_train, y_train):
+    """
+    Warm-start bản sao của model trên X_train (dữ liệu mới + replay).
+    Scaler được cập nhật bằng running mean/variance của X_new.
+    Trả về (model, scaler) mới.
+    """
+    model, scaler = copy.deepcopy(model), copy.deepcopy(scaler)
+    scaler.partial_fit(X_new)
+    X_scaled = scaler.transform(X_train)
+    classes = getattr(model, 'classes_', np.array([0, 1]))
+    # partial_fit không hỗ trợ early_stopping; ở chế độ không early_stopping
+    # MLPClassifier theo dõi best_loss_ (None khi model train với early_stopping)
+    model.set_params(early_stopping=False)
+    if getattr(model, 'best_loss_', None) is None:
+        model.best_loss_ = min(model.loss_curve_, default=np.inf)
+    rng = np.random.default_rng(0)
+    for _ in range(INCREMENTAL_EPOCHS):
+        order = rng.permutation(len(X_scaled))
+        model.partial_fit(X_scaled[order], y_train[order], classes=classes)
+    return model, scaler
+
+
+def train_incremental(drift_threshold=DRIFT_THRESHOLD):
+    """
+    Train tiếp từ models đã lưu với dữ liệu mới hơn watermark, trộn thêm mẫu
+    replay từ tập compact (REPLAY_RATIO mẫu cũ mỗi mẫu mới) để model không quên
+    dữ liệu đã học. Accuracy được đo trên phần held-out gồm cả mẫu mới lẫn replay,
+    trước và sau khi cập nhật; model nào kém đi thì giữ bản cũ.
+    Scaler được cập nhật bằng running mean/variance (partial_fit).
+    Train lại từ đầu khi chưa có model/watermark hoặc khi dữ liệu drift quá ngưỡng.
+    Model train trên tập compact (solver lbfgs, không có partial_fit) được train
+    lại trên tập compact đã cập nhật (vài giây).
+    """
+    jump_data, duck_data = load_models()
+    watermark = load_watermark()
+    if jump_data is None or duck_data is None or watermark is None:
+        print("No saved models/watermark - running full training")
+        return train_supervised()
+    if not (hasattr(jump_data['model'], 'partial_fit') and hasattr(duck_data['model'], 'partial_fit')):
+        print("Saved models were trained on compact data - retraining on compact data")
+        return train_supervised(compact=True)
+
+    X, y_jump, y_duck, new_watermark = load_training_data_since(watermark)
+    if X is None:
+        return False
+    if len(X) < MIN_INCREMENTAL_SAMPLES:
+        print(f"Only {len(X)} new samples - models are up to date")
+        return True
+
+    drift = compute_drift(jump_data['scaler'], X)
+    print(f"New samples: {len(X)}, drift: {drift:.3f} (threshold {drift_threshold})")
+    if drift > drift_threshold:
+        print("Drift exceeds threshold - running full training")
+        return train_supervised()
+
+    replay = sample_replay(max(REPLAY_RATIO * len(X), MIN_REPLAY_SAMPLES))
+    if replay is None:
+        print("No compact data for replay - running full training")
+        return train_supervised()
+    X_all = np.concatenate([X, replay[0]])
+    y_all = {'jump': np.concatenate([y_jump, replay[1]]),
+             'duck': np.concatenate([y_duck, replay[2]])}
+    is_new = np.arange(len(X_all)) < len(X)
+    idx_train, idx_test = train_test_split(np.arange(len(X_all)), test_size=0.2,
+                                           random_state=42)
+    print(f"Replay samples: {len(replay[0])}, held-out: {len(idx_test)} "
+          f"({is_new[idx_test].sum()} new)")
+
+    result = {}
+    for name, data in (('jump', jump_data), ('duck', duck_data)):
+        y = y_all[name]
+        model, scaler = data['model'], data['scaler']
+        before = model.score(scaler.transform(X_all[idx_test]), y[idx_test])
+        new_model, new_scaler = _update_model(model, scaler, X, X_all[idx_train], y[idx_train])
+        after = new_model.score(new_scaler.transform(X_all[idx_test]), y[idx_test])
+        print(f"{name.capitalize()} Model - Held-out (old + new): {before:.4f} -> {after:.4f}")
+        if after < before:
+            print(f"{name.capitalize()} Model - update is worse, keeping previous model")
+            new_model, new_scaler = model, scaler
+        result[name] = (new_model, new_scaler)
+
+    save_models(*result['jump'], *result['duck'])
+    save_watermark(new_watermark)
+    return True
+
+
 def get_data_stats():
     """Lấy thống kê dữ liệu training"""
     if DATABASE_AVAILABLE:
@@ -229,7 +518,9 @@ def get_data_stats():
         except:
             pass
     
-    # Fallback to file
+    # Fallback to file (+ sample log nhị phân)
+    from src.sample_log import count_samples
+    log_total, log_human, log_ai = count_samples()
     try:
         with open(get_data_path(), 'r') as f:
             data = json.load(f)
@@ -237,14 +528,20 @@ def get_data_stats():
         human = sum(1 for d in data if d.get("source") == "human")
         ai = sum(1 for d in data if d.get("source") == "ai")
         
-        return {"total": len(data), "human": human, "ai": ai, "source": "file"}
+        return {"total": len(data) + log_total, "human": human + log_human,
+                "ai": ai + log_ai, "source": "file"}
     except:
-        return {"total": 0, "human": 0, "ai": 0}
+        return {"total": log_total, "human": log_human, "ai": log_ai}
 
 
 if __name__ == "__main__":
-    # Test training
-    train_supervised()
+    import sys
+
+    # Test training (--incremental: chỉ train trên dữ liệu mới, --compact: train trên tập compact)
+    if "--incremental" in sys.argv:
+        train_incremental()
+    else:
+        train_supervised(compact="--compact" in sys.argv)
     
     # Test prediction
     print("\nTesting prediction...")
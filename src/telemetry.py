@@ -0,0 +1,309 @@
+"""
+Telemetry - Ghi metric từng generation của NEAT training và xem dạng đồ thị
+
+TelemetryReporter ghi mỗi generation 1 dòng JSON vào runs/<run_id>.jsonl
+(append-only, flush ngay nên có thể xem trực tiếp khi đang train):
+  best/mean/stdev fitness, số species, kích thước genome (node, connection),
+  thời gian eval, ms/genome và số step mô phỏng/giây.
+
+Step = 1 genome x 1 frame mô phỏng; vòng lặp eval báo số step qua add_steps().
+Các bộ đếm khác (vd cache_hits) báo qua add_count(), giá trị đơn (vd novelty_mean)
+qua set_metric(); cả hai được ghi kèm record.
+
+Chạy:
+    python -m src.telemetry list
+    python -m src.telemetry summary [run ...]
+    python -m src.telemetry view [run ...]      # mặc định run mới nhất, tự reload
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from time import perf_counter
+
+import neat
+
+from config.settings import TELEMETRY_DIR, TELEMETRY_ENABLED
+
+RUN_EXT = '.jsonl'
+
+# Bộ đếm của generation đang eval (reset mỗi start_generation)
+_steps = 0
+_counters = {}
+
+
+def add_steps(n):
+    global _steps
+    _steps += n
+
+
+def add_count(name, n=1):
+    _counters[name] = _counters.get(name, 0) + n
+
+
+def set_metric(name, value):
+    _counters[name] = value
+
+
+def get_steps():
+    """Số step đã báo trong generation hiện tại (worker dùng để gửi về coordinator)."""
+    return _steps
+
+
+def get_telemetry_dir():
+    return os.path.join(os.path.dirname(__file__), '..', TELEMETRY_DIR)
+
+
+class TelemetryReporter(neat.reporting.BaseReporter):
+    """Reporter NEAT: ghi metric mỗi generation ra file JSONL."""
+
+    def __init__(self, trainer='neat', path=None, info=None):
+        self.run_id = f"{trainer}_{time.strftime('%Y%m%d_%H%M%S')}"
+        self.path = path or os.path.join(get_telemetry_dir(), self.run_id + RUN_EXT)
+        self.generation = 0
+        self.start = perf_counter()
+        self._file = None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        except (IOError, OSError) as e:
+            print(f"Telemetry tắt, không mở được {self.path}: {e}")
+            return
+        header = {'type': 'run', 'run_id': self.run_id, 'trainer': trainer,
+                  'started': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        header.update(info or {})
+        self._write(header)
+
+    def _write(self, record):
+        if self._file is None:
+            return
+        try:
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+        except (IOError, OSError, ValueError) as e:
+            print(f"Telemetry error: {e}")
+            self._file = None
+
+    def start_generation(self, generation):
+        global _steps
+        self.generation = generation
+        _steps = 0
+        _counters.clear()
+        self.start = perf_counter()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        eval_s = perf_counter() - self.start
+        fitnesses = [g.fitness for g in population.values() if g.fitness is not None]
+        sizes = [g.size() for g in population.values()]
+        n = len(population)
+        record = {
+            'type': 'generation',
+            'generation': self.generation,
+            'time': time.time(),
+            'best_fitness': best_genome.fitness,
+            'mean_fitness': statistics.fmean(fitnesses) if fitnesses else None,
+            'stdev_fitness': statistics.pstdev(fitnesses) if fitnesses else None,
+            'species': len(species.species),
+            'population': n,
+            'mean_nodes': sum(s[0] for s in sizes) / n,
+            'mean_connections': sum(s[1] for s in sizes) / n,
+            'best_nodes': best_genome.size()[0],
+            'best_connections': best_genome.size()[1],
+            'eval_s': eval_s,
+            'eval_ms_per_genome': eval_s * 1000 / n,
+            'steps': _steps,
+            'steps_per_s': _steps / eval_s if eval_s > 0 else None,
+        }
+        record.update(_counters)
+        self._write(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def create_reporter(trainer, config, **info):
+    """TelemetryReporter cho trainer, hoặc None nếu TELEMETRY_ENABLED tắt."""
+    if not TELEMETRY_ENABLED:
+        return None
+    info.setdefault('pop_size', config.pop_size)
+    return TelemetryReporter(trainer, info=info)
+
+
+# ── Đọc ─────────────────────────────────────────────────
+
+def list_runs():
+    """Các file run, cũ nhất trước."""
+    return sorted(glob.glob(os.path.join(get_telemetry_dir(), '*' + RUN_EXT)), key=os.path.getmtime)
+
+
+def resolve_run(name):
+    """Tên run (có/không đuôi .jsonl) hoặc đường dẫn -> đường dẫn file."""
+    if os.path.exists(name):
+        return name
+    base = name if name.endswith(RUN_EXT) else name + RUN_EXT
+    return os.path.join(get_telemetry_dir(), base)
+
+
+def load_run(path):
+    """Trả về (header, [record generation]). Bỏ qua dòng hỏng (vd đang ghi dở)."""
+    header, records = {}, []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get('type') == 'run':
+                    header = rec
+                elif rec.get('type') == 'generation':
+                    records.append(rec)
+    except (IOError, OSError) as e:
+        print(f"Error loading {path}: {e}")
+    return header, records
+
+
+def summarize(path):
+    header, records = load_run(path)
+    name = header.get('run_id') or os.path.basename(path)
+    if not records:
+        return f"{name}: (chưa có generation)"
+    best = max(r['best_fitness'] for r in records)
+    sps = [r['steps_per_s'] for r in records if r.get('steps_per_s')]
+    ms = [r['eval_ms_per_genome'] for r in records]
+    text = (f"{name}: {len(records)} gen, best {best:.1f}, "
+            f"species {records[-1]['species']}, "
+            f"conn {records[-1]['mean_connections']:.1f}, "
+            f"{statistics.median(ms):.2f} ms/genome, "
+            f"{statistics.median(sps) if sps else 0:.0f} steps/s")
+    hits = sum(r.get('cache_hits', 0) for r in records)
+    total = hits + sum(r.get('cache_misses', 0) for r in records)
+    if total:
+        text += f", cache hit {hits / total:.0%}"
+    return text
+
+
+# ── Viewer ──────────────────────────────────────────────
+
+RUN_COLORS = ((90, 200, 255), (255, 170, 60), (120, 230, 120), (240, 100, 160), (200, 200, 90))
+PANELS = (
+    ('Fitness (best / mean)', 'best_fitness', 'mean_fitness'),
+    ('Steps/s', 'steps_per_s', None),
+    ('Eval ms/genome', 'eval_ms_per_genome', None),
+    ('Species / mean connections', 'species', 'mean_connections'),
+)
+RELOAD_MS = 1000
+
+
+def _draw_panel(screen, font, rect, title, runs, key, key2):
+    import pygame
+    pygame.draw.rect(screen, (28, 28, 40), rect)
+    pygame.draw.rect(screen, (70, 70, 100), rect, 1)
+    screen.blit(font.render(title, True, (220, 220, 240)), (rect.x + 6, rect.y + 4))
+    values = [r[k] for _, records in runs for r in records for k in (key, key2)
+              if k and r.get(k) is not None]
+    max_gen = max((len(records) for _, records in runs), default=0)
+    if not values or max_gen < 1:
+        return
+    lo, hi = min(values + [0]), max(values)
+    hi = hi if hi > lo else lo + 1
+    plot = pygame.Rect(rect.x + 50, rect.y + 26, rect.width - 60, rect.height - 36)
+    screen.blit(font.render(f"{hi:.4g}", True, (150, 150, 170)), (rect.x + 4, plot.y))
+    screen.blit(font.render(f"{lo:.4g}", True, (150, 150, 170)), (rect.x + 4, plot.bottom - 14))
+
+    def point(i, v):
+        x = plot.x + plot.width * i / max(max_gen - 1, 1)
+        return (x, plot.bottom - plot.height * (v - lo) / (hi - lo))
+
+    for idx, (_, records) in enumerate(runs):
+        color = RUN_COLORS[idx % len(RUN_COLORS)]
+        for k, col in ((key, color), (key2, tuple(c // 2 for c in color))):
+            if not k:
+                continue
+            pts = [point(i, r[k]) for i, r in enumerate(records) if r.get(k) is not None]
+            if len(pts) > 1:
+                pygame.draw.lines(screen, col, False, pts, 2)
+            elif pts:
+                pygame.draw.circle(screen, col, [int(v) for v in pts[0]], 3)
+
+
+def view(paths):
+    """Cửa sổ pygame vẽ metric của 1 hoặc nhiều run, reload mỗi giây."""
+    import pygame
+    from config.settings import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("DinoRacer - NEAT telemetry")
+    font = pygame.font.SysFont('Arial', 14)
+    clock = pygame.time.Clock()
+
+    runs, last_load, mtimes = [], -RELOAD_MS, None
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                running = False
+
+        now = pygame.time.get_ticks()
+        if now - last_load >= RELOAD_MS:
+            last_load = now
+            current = [os.path.getmtime(p) if os.path.exists(p) else None for p in paths]
+            if current != mtimes:
+                mtimes = current
+                runs = [load_run(p) for p in paths]
+
+        screen.fill((16, 16, 24))
+        legend_y = 8
+        for idx, (header, records) in enumerate(runs):
+            name = header.get('run_id') or os.path.basename(paths[idx])
+            text = f"{name}  gen {records[-1]['generation'] if records else '-'}"
+            screen.blit(font.render(text, True, RUN_COLORS[idx % len(RUN_COLORS)]), (10, legend_y))
+            legend_y += 18
+
+        top = legend_y + 6
+        w, h = (SCREEN_WIDTH - 30) // 2, (SCREEN_HEIGHT - top - 30) // 2
+        for i, (title, key, key2) in enumerate(PANELS):
+            rect = pygame.Rect(10 + (i % 2) * (w + 10), top + (i // 2) * (h + 10), w, h)
+            _draw_panel(screen, font, rect, title, runs, key, key2)
+        pygame.display.flip()
+        clock.tick(FPS // 2)
+
+    pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NEAT training telemetry")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list')
+    for name in ('summary', 'view'):
+        p = sub.add_parser(name)
+        p.add_argument('runs', nargs='*', help="Tên run hoặc file .jsonl (mặc định run mới nhất)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for path in list_runs():
+            print(summarize(path))
+        return 0
+
+    paths = [resolve_run(r) for r in args.runs] or list_runs()[-1:]
+    if not paths:
+        print(f"Chưa có run nào trong {get_telemetry_dir()}")
+        return 1
+    if args.command == 'summary':
+        for path in paths:
+            print(summarize(path))
+        return 0
+    view(paths)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,10 +7,12 @@ from config.settings import (
     SCREEN_WIDTH, SCREEN_HEIGHT, FPS, GROUND_Y,
     INITIAL_SCORE, SPEED_INCREASE_INTERVAL, SPEED_INCREASE_AMOUNT,
     MIN_OBSTACLE_SPAWN_DISTANCE, OBSTACLE_SPEED_MIN, OBSTACLE_SPEED_MAX,
-    COLLISION_MARGIN, TIME_ATTACK_LIMITS,
+    TIME_ATTACK_LIMITS,
 )
 from src.dino import Dino
-from src.obstacle import create_obstacle
+from src.obstacle import ObstacleQueue
+from src.collision import find_collision
+from src import profiler
 from src.assets_loader import play_sound
 from src.data_collector import get_collector
 from src.utils import get_cached_font, get_gradient_bg
@@ -28,6 +30,7 @@ class TimeAttackGame:
     def __init__(self, screen, difficulty='normal'):
         self.screen = screen
         self.clock = pygame.time.Clock()
+        self.prof = profiler.get_profiler()
         self.difficulty = difficulty
         self.time_limit = self.TIME_LIMITS.get(difficulty, 90)  # seconds
 
@@ -40,10 +43,9 @@ class TimeAttackGame:
     
     def reset(self):
         self.dino = Dino()
-        self.obstacles = []
+        self.obstacles = ObstacleQueue()
         self.score = 0  # Số obstacle đã vượt qua
         self.game_speed = OBSTACLE_SPEED_MIN
-        self.last_obstacle_x = 0
         
         self.game_over = False
         self.time_remaining = self.time_limit
@@ -54,21 +56,12 @@ class TimeAttackGame:
         self.frame_count = 0
     
     def spawn_obstacle(self):
-        if self.last_obstacle_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
+        if self.obstacles.last_x - SCREEN_WIDTH < -MIN_OBSTACLE_SPAWN_DISTANCE:
             speed = min(self.game_speed, OBSTACLE_SPEED_MAX)
-            obs = create_obstacle(SCREEN_WIDTH + 50, speed)
-            self.obstacles.append(obs)
-            self.last_obstacle_x = obs.x
+            self.obstacles.spawn(SCREEN_WIDTH + 50, speed)
     
     def check_collision(self):
-        dino_rect = self.dino.get_rect()
-        # Sử dụng margin từ settings
-        margin = COLLISION_MARGIN
-        shrunk = dino_rect.inflate(-margin * 2, -margin * 2)
-        for obs in self.obstacles:
-            if shrunk.colliderect(obs.get_rect().inflate(-margin, -margin)):
-                return True
-        return False
+        return find_collision(self.dino, self.obstacles) is not None
     
     def update(self, keys=None, jump_held=False):
         if self.game_over:
@@ -93,6 +86,8 @@ class TimeAttackGame:
             else:
                 self.dino.duck(False)
 
+        prof = self.prof
+        prof.begin('physics')
         self.dino.update(jump_held=jump_held)
         self.spawn_obstacle()
         
@@ -103,9 +98,8 @@ class TimeAttackGame:
                 obs.passed = True
                 self.score += 1
         
-        self.obstacles = [o for o in self.obstacles if not o.is_off_screen()]
-        if self.obstacles:
-            self.last_obstacle_x = max(o.x for o in self.obstacles)
+        self.obstacles.retire_offscreen()
+        prof.end('physics')
         
         # Increase speed over time
         self.game_speed = OBSTACLE_SPEED_MIN + (self.score // 10) * SPEED_INCREASE_AMOUNT
@@ -122,7 +116,10 @@ class TimeAttackGame:
                     action, source="human", score=self.score
                 )
         
-        if self.check_collision():
+        prof.begin('collision')
+        collided = self.check_collision()
+        prof.end('collision')
+        if collided:
             self.game_over = True
             play_sound("gameover")
     
@@ -135,22 +132,29 @@ class TimeAttackGame:
         pygame.draw.line(self.screen, GROUND_LINE, (0, GROUND_Y), (SCREEN_WIDTH, GROUND_Y), 3)
     
     def draw(self):
+        prof = self.prof
+        prof.begin('draw-bg')
         self.draw_background()
+        prof.end('draw-bg')
         
         # Draw dino
+        prof.begin('draw-sprites')
         self.dino.draw(self.screen)
         
         # Draw obstacles
         for obs in self.obstacles:
             obs.draw(self.screen)
+        prof.end('draw-sprites')
         
         # Draw HUD
+        prof.begin('hud')
         self._draw_hud()
         
         if self.game_over:
             self._draw_game_over()
+        prof.end('hud')
         
-        pygame.display.flip()
+        profiler.flip()
     
     def _draw_hud(self):
         # Timer
@@ -204,6 +208,7 @@ class TimeAttackGame:
         """Chạy game Time Attack"""
         running = True
 
+        prof = self.prof
         while running:
             self.draw()
             self.clock.tick(FPS)
@@ -211,7 +216,10 @@ class TimeAttackGame:
             keys = pygame.key.get_pressed()
             jump_held = False
 
+            prof.begin('events')
             for event in pygame.event.get():
+                if prof.handle_event(event):
+                    continue
                 if event.type == pygame.QUIT:
                     running = False
 
@@ -219,7 +227,8 @@ class TimeAttackGame:
                     if event.key == pygame.K_ESCAPE:
                         # Save collected data before exit
                         if self.collect_data:
-                            self.collector.save_session_data()
+                            with prof.section('persistence'):
+                                self.collector.save_session_data()
                         running = False
                     elif event.key == pygame.K_r and self.game_over:
                         self.reset()
@@ -231,9 +240,13 @@ class TimeAttackGame:
                         self.dino.jump_release()
                     if event.key == pygame.K_DOWN:
                         self.dino.duck(False)
+            prof.end('events')
 
             if not self.game_over:
+                prof.begin('update')
                 self.update(keys, jump_held=jump_held)
+                prof.end('update')
+            prof.next_frame()
 
         return self.score
 